@@ -0,0 +1,35 @@
+"""Add user_taste_profiles table
+
+Revision ID: 0b6e3d7a91f5
+Revises: f42b8d915c6e
+Create Date: 2026-10-19 13:58:30.742118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e3d7a91f5'
+down_revision: Union[str, Sequence[str], None] = 'f42b8d915c6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Profiles are built lazily from movie_history the first time a user asks for recommendations.
+    op.create_table('user_taste_profiles',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('weights', postgresql.ARRAY(sa.Float()), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_taste_profiles')
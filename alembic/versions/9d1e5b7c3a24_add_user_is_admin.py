@@ -0,0 +1,29 @@
+"""Add is_admin to users
+
+Revision ID: 9d1e5b7c3a24
+Revises: 0b6e3d7a91f5
+Create Date: 2026-10-19 19:02:11.408213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1e5b7c3a24'
+down_revision: Union[str, Sequence[str], None] = '0b6e3d7a91f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Granted by hand (UPDATE users SET is_admin = true ...); nothing in the API sets it.
+    op.add_column('users', sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'is_admin')
@@ -0,0 +1,65 @@
+"""Add user_stats and user_category_stats tables
+
+Revision ID: a3c91e0b7d24
+Revises: 5fdf10da1c7d
+Create Date: 2026-10-19 09:12:41.208311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91e0b7d24'
+down_revision: Union[str, Sequence[str], None] = '5fdf10da1c7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('answered_total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('correct_total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('current_streak', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('best_streak', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_stats_correct_total', 'user_stats', [sa.text('correct_total DESC'), 'user_id'], unique=False)
+    op.create_table('user_category_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_key', sa.String(), nullable=False),
+    sa.Column('correct_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'category_key')
+    )
+    op.create_index('ix_user_category_stats_leaderboard', 'user_category_stats', ['category_key', sa.text('correct_count DESC'), 'user_id'], unique=False)
+
+    # Backfill from existing answers. Streaks cannot be reconstructed reliably, so they start at zero.
+    op.execute("""
+        INSERT INTO user_stats (user_id, answered_total, correct_total)
+        SELECT user_id, count(*), count(*) FILTER (WHERE was_correct)
+        FROM user_answers
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    """)
+    op.execute("""
+        INSERT INTO user_category_stats (user_id, category_key, correct_count)
+        SELECT a.user_id, lower(regexp_replace(trim(q.category), '\\s+', ' ', 'g')), count(*)
+        FROM user_answers a
+        JOIN trivia_questions q ON q.id = a.question_id
+        WHERE a.was_correct AND a.user_id IS NOT NULL AND q.category IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_category_stats_leaderboard', table_name='user_category_stats')
+    op.drop_table('user_category_stats')
+    op.drop_index('ix_user_stats_correct_total', table_name='user_stats')
+    op.drop_table('user_stats')
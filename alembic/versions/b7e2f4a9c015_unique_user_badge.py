@@ -0,0 +1,34 @@
+"""Make user_badge unique per (user_id, badge_id)
+
+Revision ID: b7e2f4a9c015
+Revises: 9d1e5b7c3a24
+Create Date: 2026-10-19 20:14:37.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f4a9c015'
+down_revision: Union[str, Sequence[str], None] = '9d1e5b7c3a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # user_badge has no key column; drop all but one physical row of any duplicated pair.
+    op.execute("""
+        DELETE FROM user_badge a
+        USING user_badge b
+        WHERE a.user_id = b.user_id AND a.badge_id = b.badge_id AND a.ctid > b.ctid
+    """)
+    op.create_unique_constraint('uq_user_badge_user_badge', 'user_badge', ['user_id', 'badge_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_user_badge_user_badge', 'user_badge', type_='unique')
@@ -0,0 +1,33 @@
+"""Add normalized category_key to trivia questions
+
+Revision ID: c58d02f4e9a1
+Revises: a3c91e0b7d24
+Create Date: 2026-10-19 10:03:17.554920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58d02f4e9a1'
+down_revision: Union[str, Sequence[str], None] = 'a3c91e0b7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trivia_questions', sa.Column('category_key', sa.String(), nullable=True))
+    op.execute("UPDATE trivia_questions SET category_key = lower(regexp_replace(trim(category), '\\s+', ' ', 'g'))")
+    op.create_index('ix_trivia_questions_category_key_id', 'trivia_questions', ['category_key', 'id'], unique=False)
+    op.create_index('ix_user_answers_user_question', 'user_answers', ['user_id', 'question_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_answers_user_question', table_name='user_answers')
+    op.drop_index('ix_trivia_questions_category_key_id', table_name='trivia_questions')
+    op.drop_column('trivia_questions', 'category_key')
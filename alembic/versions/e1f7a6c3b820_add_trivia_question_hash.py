@@ -0,0 +1,52 @@
+"""Add normalized question_hash to trivia questions
+
+Revision ID: e1f7a6c3b820
+Revises: c58d02f4e9a1
+Create Date: 2026-10-19 11:26:05.871034
+
+"""
+import hashlib
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f7a6c3b820'
+down_revision: Union[str, Sequence[str], None] = 'c58d02f4e9a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _normalize_question_text(question_text: str) -> str:
+    # Must match firepulse.crud.trivia.normalize_question_text. Postgres has no casefold() and its regex
+    # classes depend on the database locale, so hashes are computed here rather than in SQL.
+    text = unicodedata.normalize("NFKC", question_text).casefold()
+    kept = "".join(ch for ch in text if ch.isalnum() or ch.isspace() or unicodedata.category(ch).startswith("M"))
+    return " ".join(kept.split())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trivia_questions', sa.Column('question_hash', sa.String(length=32), nullable=True))
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, question_text FROM trivia_questions ORDER BY id")).all()
+    # Older near-duplicates are kept (answers reference them) but only the first keeps its hash.
+    seen = set()
+    updates = []
+    for question_id, question_text in rows:
+        digest = hashlib.md5(_normalize_question_text(question_text or "").encode("utf-8")).hexdigest()
+        if digest not in seen:
+            seen.add(digest)
+            updates.append({"id": question_id, "question_hash": digest})
+    if updates:
+        conn.execute(sa.text("UPDATE trivia_questions SET question_hash = :question_hash WHERE id = :id"), updates)
+    op.create_index('uq_trivia_questions_question_hash', 'trivia_questions', ['question_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_trivia_questions_question_hash', table_name='trivia_questions')
+    op.drop_column('trivia_questions', 'question_hash')
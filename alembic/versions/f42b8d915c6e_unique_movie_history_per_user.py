@@ -0,0 +1,44 @@
+"""Make movie_history unique per (user_id, tmdb_id) and index recent history
+
+Revision ID: f42b8d915c6e
+Revises: e1f7a6c3b820
+Create Date: 2026-10-19 12:40:52.316487
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f42b8d915c6e'
+down_revision: Union[str, Sequence[str], None] = 'e1f7a6c3b820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep only the most recently watched row of any duplicated (user_id, tmdb_id) pair.
+    op.execute("""
+        DELETE FROM movie_history
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, tmdb_id
+                    ORDER BY watched_at DESC NULLS LAST, id DESC
+                ) AS position
+                FROM movie_history
+            ) ranked
+            WHERE position > 1
+        )
+    """)
+    op.create_index('uq_movie_history_user_tmdb', 'movie_history', ['user_id', 'tmdb_id'], unique=True)
+    op.create_index('ix_movie_history_user_watched_at', 'movie_history', ['user_id', sa.text('watched_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_movie_history_user_watched_at', table_name='movie_history')
+    op.drop_index('uq_movie_history_user_tmdb', table_name='movie_history')
@@ -0,0 +1,138 @@
+"""
+Cold-start benchmark for the Lambda entry point (firepulse.main.handler).
+
+Every measurement runs in a fresh interpreter, like a new Lambda container:
+  - import:   `python -X importtime -c "import firepulse.main"`, the total and the slowest modules
+  - handler:  import + the first handler() call for each path, with an API Gateway (HTTP API) event
+  - heavy:    optional libraries that must NOT be loaded by the import (they are imported on first use)
+
+Usage (from the repository root, with the backend's .env available):
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 5 --path / --path /api/v1/trivia/score --token <jwt>
+    python benchmarks/cold_start.py --output cold_start.json --budget-ms 1500
+
+Target: the first `/` or `/api/v1/trivia/score` response from a new container (import + lifespan
+startup + request) within COLD_START_TARGET_MS, and the import alone within IMPORT_TARGET_MS,
+on a 1024 MB function. With --budget-ms the script exits with status 1 when the median exceeds it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TARGET_MS = 1000
+COLD_START_TARGET_MS = 1500
+DEFAULT_PATHS = ["/", "/api/v1/trivia/score"]
+# Loaded lazily by movie_bot, voice and google_auth; importing any of them at startup is a regression.
+HEAVY_MODULES = ["transformers", "torch", "gtts", "googleapiclient", "google_auth_oauthlib", "google.oauth2"]
+
+HANDLER_SCRIPT = r"""
+import json, sys, time
+started = time.perf_counter()
+from firepulse.main import handler
+imported = time.perf_counter()
+path, token = sys.argv[1], sys.argv[2]
+headers = {"host": "localhost", "user-agent": "cold-start-benchmark"}
+if token:
+    headers["authorization"] = f"Bearer {token}"
+event = {
+    "version": "2.0", "routeKey": "$default", "rawPath": path, "rawQueryString": "", "headers": headers,
+    "requestContext": {
+        "http": {"method": "GET", "path": path, "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1", "userAgent": "cold-start-benchmark"},
+        "accountId": "local", "apiId": "local", "domainName": "localhost", "requestId": "cold-start", "stage": "$default",
+        "time": "01/Jan/2025:00:00:00 +0000", "timeEpoch": 0,
+    },
+    "isBase64Encoded": False,
+}
+response = handler(event, None)
+finished = time.perf_counter()
+heavy = [name for name in HEAVY if name in sys.modules]
+# On stderr: the app logs to stdout from a background thread, which could interleave with this line.
+print(json.dumps({
+    "status": response["statusCode"], "import_ms": (imported - started) * 1000,
+    "first_request_ms": (finished - imported) * 1000, "total_ms": (finished - started) * 1000, "heavy_modules_loaded": heavy,
+}), file=sys.stderr)
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))}
+    return subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of `-X importtime` output as {"module", "self_us", "cumulative_us"}."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append({"module": module.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return rows
+
+
+def measure_import(top: int) -> Dict:
+    rows = parse_importtime(_run(["-X", "importtime", "-c", "import firepulse.main"]).stderr)
+    total = next(row["cumulative_us"] for row in rows if row["module"] == "firepulse.main")
+    slowest = sorted(rows, key=lambda row: row["self_us"], reverse=True)[:top]
+    return {"total_ms": total / 1000, "slowest_modules": [{**row, "self_ms": row["self_us"] / 1000} for row in slowest]}
+
+
+def measure_handler(path: str, token: Optional[str]) -> Dict:
+    script = "HEAVY = " + repr(HEAVY_MODULES) + "\n" + HANDLER_SCRIPT
+    lines = _run(["-c", script, path, token or ""]).stderr.strip().splitlines()
+    return json.loads(next(line for line in reversed(lines) if line.startswith("{")))
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {"median": round(statistics.median(values), 1), "min": round(min(values), 1), "max": round(max(values), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--path", action="append", help=f"paths to request (default: {' '.join(DEFAULT_PATHS)})")
+    parser.add_argument("--token", default=os.getenv("FIREPULSE_BENCH_TOKEN"), help="bearer token for authenticated paths")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to report")
+    parser.add_argument("--output", help="write the JSON results to this file as well")
+    parser.add_argument("--budget-ms", type=float, help="fail if a path's median cold start exceeds this")
+    args = parser.parse_args()
+
+    imports = [measure_import(args.top) for _ in range(args.runs)]
+    results = {
+        "python": sys.version.split()[0],
+        "targets_ms": {"import": IMPORT_TARGET_MS, "cold_start": COLD_START_TARGET_MS},
+        "import": {"total_ms": summarize([run["total_ms"] for run in imports]), "slowest_modules": imports[-1]["slowest_modules"]},
+        "handler": {},
+    }
+
+    failed = False
+    for path in args.path or DEFAULT_PATHS:
+        runs = [measure_handler(path, args.token) for _ in range(args.runs)]
+        results["handler"][path] = {
+            "status": runs[-1]["status"],
+            "import_ms": summarize([run["import_ms"] for run in runs]),
+            "first_request_ms": summarize([run["first_request_ms"] for run in runs]),
+            "total_ms": summarize([run["total_ms"] for run in runs]),
+            "heavy_modules_loaded": runs[-1]["heavy_modules_loaded"],
+        }
+        if runs[-1]["heavy_modules_loaded"]:
+            failed = True
+        if args.budget_ms is not None and results["handler"][path]["total_ms"]["median"] > args.budget_ms:
+            failed = True
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Runs the FirePulse app under uvicorn with every upstream pointed at the stub server (see stub_upstreams.py).
+Started by suite.py; prints one JSON line per event on stdout:
+  {"event": "started", "import_ms": ..., "lifespan_startup_ms": ...}
+  {"event": "warm", "warmup_ms": ..., "catalog_movies": ..., "graph_edges": ...}
+"warm" is printed once the background catalog and movie graph builds have finished (or --warm-timeout passed).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+from contextlib import asynccontextmanager
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from stub_upstreams import StubTTS, StubTransport  # noqa: E402
+
+
+def emit(event: str, **fields):
+    print(json.dumps({"event": event, **fields}), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--stub-port", type=int, required=True)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the production per-host rate limits")
+    parser.add_argument("--warm-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    # Catalog, graph and audio go to a scratch directory; the shared cache and shared rate limit store are off.
+    scratch = tempfile.mkdtemp(prefix="firepulse-bench-")
+    os.environ["FIREPULSE_CATALOG_PATH"] = os.path.join(scratch, "catalog.npz")
+    os.environ["FIREPULSE_MOVIE_GRAPH_PATH"] = os.path.join(scratch, "movie-graph.npz")
+    os.environ.pop("FIREPULSE_CACHE_URL", None)
+    os.environ.pop("FIREPULSE_RATE_LIMIT_DB", None)
+    sys.modules["gtts"] = types.SimpleNamespace(gTTS=StubTTS)
+
+    started = time.perf_counter()
+    import httpx
+    import uvicorn
+    from firepulse import main as app_main
+    from firepulse.services import catalog, movie_graph, rate_limit, upstream, voice
+    import_ms = (time.perf_counter() - started) * 1000
+
+    voice.AUDIO_DIR = os.path.join(scratch, "audio")
+    if not args.keep_rate_limits:
+        # Otherwise the suite measures the token buckets (Gemini allows one call every 4 s), not the app.
+        for host in rate_limit.RATE_LIMITS:
+            rate_limit.RATE_LIMITS[host] = rate_limit.RateLimit(rate=1e6, burst=10 ** 6)
+
+    def create_stubbed_client() -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=upstream.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=upstream.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=upstream.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        return httpx.AsyncClient(transport=StubTransport(args.stub_port, limits=limits), timeout=upstream.DEFAULT_POLICY.timeout)
+
+    app_main.create_http_client = create_stubbed_client
+
+    app = app_main.app
+    lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def timed_lifespan(application):
+        lifespan_started = time.perf_counter()
+        async with lifespan(application):
+            emit("started", import_ms=round(import_ms, 1), lifespan_startup_ms=round((time.perf_counter() - lifespan_started) * 1000, 1))
+            warm_task = asyncio.create_task(wait_until_warm())
+            yield
+            warm_task.cancel()
+
+    async def wait_until_warm():
+        warm_started = time.perf_counter()
+        while time.perf_counter() - warm_started < args.warm_timeout:
+            if catalog.get_catalog() is not None and movie_graph.get_graph() is not None:
+                break
+            await asyncio.sleep(0.1)
+        graph = movie_graph.get_graph()
+        movies = catalog.get_catalog()
+        emit(
+            "warm", warmup_ms=round((time.perf_counter() - warm_started) * 1000, 1),
+            catalog_movies=len(movies) if movies is not None else 0, graph_edges=graph.edge_count if graph is not None else 0,
+        )
+
+    app.router.lifespan_context = timed_lifespan
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
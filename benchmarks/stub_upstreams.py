@@ -0,0 +1,191 @@
+"""
+Local stand-ins for TMDB, Spotify, Gemini and Google TTS, so benchmarks run offline and repeatably.
+
+A single Starlette app serves every upstream under its own path prefix, with a fixed per-request latency
+to mimic a network round trip. StubTransport rewrites the app's real upstream URLs (https://api.themoviedb.org/...)
+to that server, so requests still go through UpstreamClient, its pool, limits and retries.
+"""
+import asyncio
+import json
+import random
+from datetime import date, timedelta
+from typing import Dict, List
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+HOST_PREFIXES: Dict[str, str] = {
+    "api.themoviedb.org": "/tmdb",
+    "api.spotify.com": "/spotify",
+    "accounts.spotify.com": "/spotify-accounts",
+    "generativelanguage.googleapis.com": "/gemini",
+}
+
+STUB_GENRES = [28, 12, 16, 35, 80, 18, 10751, 14, 27, 10402, 9648, 10749, 878, 53]
+STUB_MOVIE_COUNT = 500
+PAGE_SIZE = 20
+
+
+def _movie(index: int) -> Dict:
+    rng = random.Random(index)
+    return {
+        "id": 1000 + index,
+        "title": f"Stub Movie {index}",
+        "original_title": f"Stub Movie {index}",
+        "genre_ids": rng.sample(STUB_GENRES, 2),
+        "original_language": "hi" if index % 3 == 0 else "en",
+        "overview": f"Overview of stub movie {index}. " * 8,
+        "release_date": (date.today() - timedelta(days=index * 7)).isoformat(),
+        "popularity": round(rng.uniform(1, 500), 3),
+        "vote_average": round(rng.uniform(4, 9), 1),
+        "vote_count": rng.randint(100, 20000),
+        "poster_path": f"/stub{index}.jpg",
+        "backdrop_path": f"/stub{index}-backdrop.jpg",
+        "adult": False,
+        "video": False,
+    }
+
+
+MOVIES: List[Dict] = [_movie(index) for index in range(STUB_MOVIE_COUNT)]
+MOVIES_BY_ID = {movie["id"]: movie for movie in MOVIES}
+MOVIES_BY_TITLE = {movie["title"].lower(): movie for movie in MOVIES}
+
+
+def _page(movies: List[Dict], page: int) -> Dict:
+    start = (page - 1) * PAGE_SIZE
+    return {"page": page, "results": movies[start:start + PAGE_SIZE], "total_pages": max(len(movies) // PAGE_SIZE, 1)}
+
+
+def create_stub_app(latency_ms: float = 20.0) -> Starlette:
+    delay = latency_ms / 1000
+
+    async def discover(request: Request):
+        await asyncio.sleep(delay)
+        params = request.query_params
+        movies = MOVIES
+        if params.get("with_original_language"):
+            movies = [movie for movie in movies if movie["original_language"] == params["with_original_language"]]
+        if params.get("with_genres"):
+            wanted = {int(genre) for genre in params["with_genres"].replace(",", "|").split("|") if genre.isdigit()}
+            movies = [movie for movie in movies if wanted & set(movie["genre_ids"])]
+        return JSONResponse(_page(movies, int(params.get("page", 1))))
+
+    async def movie_list(request: Request):
+        await asyncio.sleep(delay)
+        return JSONResponse(_page(MOVIES, int(request.query_params.get("page", 1))))
+
+    async def search_movie(request: Request):
+        await asyncio.sleep(delay)
+        query = request.query_params.get("query", "").lower()
+        movie = MOVIES_BY_TITLE.get(query)
+        return JSONResponse({"page": 1, "results": [movie] if movie else [m for m in MOVIES if query in m["title"].lower()][:PAGE_SIZE]})
+
+    async def search_person(request: Request):
+        await asyncio.sleep(delay)
+        query = request.query_params.get("query", "")
+        results = [{"id": 1, "name": query}] if query.lower().startswith("actor") else []
+        return JSONResponse({"page": 1, "results": results})
+
+    async def movie_details(request: Request):
+        await asyncio.sleep(delay)
+        movie = MOVIES_BY_ID.get(request.path_params["movie_id"])
+        if movie is None:
+            return JSONResponse({"status_message": "Not found."}, status_code=404)
+        return JSONResponse({**movie, "genres": [{"id": genre_id} for genre_id in movie["genre_ids"]]})
+
+    async def recommendations(request: Request):
+        await asyncio.sleep(delay)
+        rng = random.Random(request.path_params["movie_id"])
+        return JSONResponse({"page": 1, "results": rng.sample(MOVIES, PAGE_SIZE)})
+
+    async def spotify_token(request: Request):
+        await asyncio.sleep(delay)
+        return JSONResponse({"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600})
+
+    async def spotify_search(request: Request):
+        await asyncio.sleep(delay)
+        query = request.query_params.get("q", "")
+        limit = int(request.query_params.get("limit", 10))
+        if query.lower().startswith("artist:") and not query.lower().startswith("artist:stub"):
+            return JSONResponse({"tracks": {"items": []}})
+        items = [{"name": f"{query} song {index}", "artists": [{"name": f"Stub Artist {index % 4}"}]} for index in range(limit)]
+        return JSONResponse({"tracks": {"items": items}})
+
+    async def gemini(request: Request):
+        # Generation takes far longer than a lookup.
+        await asyncio.sleep(delay * 10)
+        prompt = (await request.json())["contents"][0]["parts"][0]["text"]
+        count = int(prompt.split("Generate ", 1)[1].split(" ", 1)[0])
+        questions = [
+            {
+                "question_text": f"Stub question {random.getrandbits(48):x}?",
+                "answers": [
+                    {"text": "Right", "is_correct": True}, {"text": "Wrong 1", "is_correct": False},
+                    {"text": "Wrong 2", "is_correct": False}, {"text": "Wrong 3", "is_correct": False},
+                ],
+            }
+            for _ in range(count)
+        ]
+        return JSONResponse({"candidates": [{"content": {"parts": [{"text": json.dumps(questions)}]}}]})
+
+    return Starlette(routes=[
+        Route("/tmdb/3/discover/movie", discover),
+        Route("/tmdb/3/movie/now_playing", movie_list),
+        Route("/tmdb/3/movie/popular", movie_list),
+        Route("/tmdb/3/movie/top_rated", movie_list),
+        Route("/tmdb/3/movie/{movie_id:int}/recommendations", recommendations),
+        Route("/tmdb/3/movie/{movie_id:int}", movie_details),
+        Route("/tmdb/3/search/movie", search_movie),
+        Route("/tmdb/3/search/person", search_person),
+        Route("/spotify-accounts/api/token", spotify_token, methods=["POST"]),
+        Route("/spotify/v1/search", spotify_search),
+        Route("/gemini/v1beta/models/{model:path}", gemini, methods=["POST"]),
+    ])
+
+
+class StubTransport(httpx.AsyncBaseTransport):
+    """Sends requests for the stubbed hosts to the local stub server; any other host fails as if offline."""
+
+    def __init__(self, port: int, **transport_kwargs):
+        self.port = port
+        self.inner = httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        prefix = HOST_PREFIXES.get(request.url.host)
+        if prefix is None:
+            raise httpx.ConnectError(f"{request.url.host} is not stubbed", request=request)
+        request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port=self.port, path=prefix + request.url.path)
+        request.headers["host"] = f"127.0.0.1:{self.port}"
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class StubTTS:
+    """Replaces gTTS, which talks to Google Translate through its own blocking client: writes a small fake MP3."""
+
+    def __init__(self, text: str, lang: str = "en", **kwargs):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        fp.write(b"ID3" + self.text.encode("utf-8")[:256])
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            self.write_to_fp(f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the stub upstreams.")
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(args.latency_ms), host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
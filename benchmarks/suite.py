@@ -0,0 +1,325 @@
+"""
+Offline benchmark suite for the hot API paths, against local stub upstreams (see stub_upstreams.py).
+
+Runs, in order:
+  - import:    `import firepulse.main` in a fresh interpreter (cold_start.measure_import)
+  - startup:   the stub server and the app (serve_app.py) as subprocesses; import, lifespan startup and the
+               time until the catalog and movie graph are built
+  - endpoints: --requests requests per scenario at --concurrency, recording p50/p90/p99 latency and throughput for
+               /movies, /songs, /time-based-suggestions, /history/* and /trivia/*; latency and throughput count
+               2xx responses only, failures are counted and timed separately, and a scenario that breaks is
+               recorded as {"error": ...} while the others still run
+
+The /history and /trivia scenarios need the database from the backend's .env; they log in as a fresh
+benchmark user and are skipped (with the error recorded) if it cannot be created.
+
+Usage (from the repository root):
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --scenario movies_mood --scenario time_based --requests 500 --concurrency 50
+    python benchmarks/suite.py --baseline bench.json --max-regression 0.25
+
+With --baseline the script exits with status 1 when a scenario's p99 latency grew, or its throughput fell, by more
+than --max-regression (a fraction) compared with an earlier --output file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from cold_start import REPO_ROOT, measure_import
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+API = "/api/v1"
+STARTUP_TIMEOUT_SECONDS = 60
+WARM_TIMEOUT_SECONDS = 120
+TRIVIA_TOPIC = "benchmarks"
+
+Scenario = Callable[["Session", int], Any]
+
+
+class Session:
+    """The HTTP client used by the scenarios, logged in as the benchmark user when the database is available."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.headers: Dict[str, str] = {}
+        self.question_ids: List[int] = []
+
+    async def login(self):
+        email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        password = uuid.uuid4().hex
+        response = await self.client.post(f"{API}/users/", json={"email": email, "password": password})
+        response.raise_for_status()
+        response = await self.client.post(f"{API}/token", data={"username": email, "password": password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def request(self, method: str, path: str, **kwargs):
+        return self.client.request(method, API + path, headers=self.headers, **kwargs)
+
+
+async def trivia_start(session: Session, i: int):
+    response = await session.request("POST", "/trivia/start", json={"topic": TRIVIA_TOPIC})
+    if response.status_code == 200:
+        session.question_ids.append(response.json()["id"])
+    return response
+
+
+async def trivia_submit(session: Session, i: int):
+    question_id = session.question_ids[i % len(session.question_ids)] if session.question_ids else 0
+    return await session.request("POST", "/trivia/submit", json={"question_id": question_id, "selected_answer_text": "Right"})
+
+
+# Mood queries use genre keywords, so the emotion model is never loaded; "Actor ..." names match the stub person search.
+SCENARIOS: Dict[str, Scenario] = {
+    "movies_mood": lambda s, i: s.request("POST", "/movies", json={"query": "something funny"}),
+    "movies_person": lambda s, i: s.request("POST", "/movies", json={"query": f"actor stub {i % 10}"}),
+    "songs_artist": lambda s, i: s.request("POST", "/songs", json={"query": f"stub artist {i % 10}"}),
+    "songs_mood": lambda s, i: s.request("POST", "/songs", json={"query": "happy party songs"}),
+    "time_based": lambda s, i: s.request("GET", "/time-based-suggestions"),
+    "history_log": lambda s, i: s.request("POST", "/history/log-watch", json={"movie_name": f"Stub Movie {i % 100}"}),
+    "history_page": lambda s, i: s.request("GET", "/history"),
+    "history_recommendations": lambda s, i: s.request("GET", "/history/recommendations"),
+    "history_import": lambda s, i: s.request("POST", "/history/import", json={"movie_names": [f"Stub Movie {(i + n) % 200}" for n in range(10)]}),
+    "trivia_start": trivia_start,
+    "trivia_submit": trivia_submit,
+    "trivia_score": lambda s, i: s.request("GET", "/trivia/score"),
+    "trivia_leaderboard": lambda s, i: s.request("GET", "/trivia/leaderboard"),
+}
+AUTHENTICATED_PREFIXES = ("history_", "trivia_")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn(script: str, *args: str) -> subprocess.Popen:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))}
+    return subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARK_DIR, script), *args],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, text=True,
+    )
+
+
+def read_event(process: subprocess.Popen, event: str, timeout: float) -> Dict:
+    """Waits for serve_app.py to print the given event; anything else it prints is passed through."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"The app exited (status {process.wait()}) before '{event}'.")
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            print(line, end="", file=sys.stderr)
+            continue
+        if isinstance(message, dict) and message.get("event") == event:
+            return message
+    raise TimeoutError(f"No '{event}' from the app within {timeout:.0f}s.")
+
+
+def drain(process: subprocess.Popen):
+    """Keeps reading the app's output after startup, so its logging never blocks on a full pipe."""
+    def forward():
+        for line in process.stdout:
+            print(line, end="", file=sys.stderr)
+    threading.Thread(target=forward, daemon=True).start()
+
+
+def wait_for_port(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout:.0f}s.")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {}
+    values = sorted(latencies)
+    return {
+        "p50": round(percentile(values, 0.50), 2),
+        "p90": round(percentile(values, 0.90), 2),
+        "p99": round(percentile(values, 0.99), 2),
+        "max": round(values[-1], 2),
+        "mean": round(sum(values) / len(values), 2),
+    }
+
+
+async def run_scenario(session: Session, scenario: Scenario, requests: int, concurrency: int) -> Dict:
+    """
+    Timed requests against one scenario. Only 2xx responses count toward latency_ms, so a fast error cannot
+    pass for a speedup; failed requests and non-2xx responses are summarized apart in error_latency_ms.
+    """
+    latencies: List[float] = []
+    error_latencies: List[float] = []
+    status_counts: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                response = await scenario(session, i)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            (latencies if status.startswith("2") else error_latencies).append(elapsed_ms)
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(error_latencies),
+        "status_counts": status_counts,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": summarize(latencies),
+        "error_latency_ms": summarize(error_latencies),
+    }
+
+
+async def warm_up(session: Session, scenario: Scenario, requests: int) -> int:
+    """Untimed requests that fill the caches a long-running instance would already have; returns how many failed."""
+    failures = 0
+    for i in range(requests):
+        try:
+            response = await scenario(session, i)
+            failures += not 200 <= response.status_code < 300
+        except httpx.HTTPError:
+            failures += 1
+    return failures
+
+
+async def run_endpoints(port: int, names: List[str], requests: int, concurrency: int, warmup: int) -> Dict[str, Dict]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        session = Session(client)
+        login_error: Optional[str] = None
+        try:
+            await session.login()
+        except httpx.HTTPError as e:
+            login_error = f"could not create the benchmark user: {e}"
+
+        results: Dict[str, Dict] = {}
+        for name in names:
+            if login_error and name.startswith(AUTHENTICATED_PREFIXES):
+                results[name] = {"skipped": login_error}
+                continue
+            scenario = SCENARIOS[name]
+            try:
+                warmup_errors = await warm_up(session, scenario, warmup)
+                results[name] = {**await run_scenario(session, scenario, requests, concurrency), "warmup_errors": warmup_errors}
+            except Exception as e:
+                # One broken scenario should not cost the results of the others.
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+                print(f"{name}: failed: {results[name]['error']}", file=sys.stderr)
+                continue
+            print(
+                f"{name}: {results[name]['throughput_rps']} req/s, p99 {results[name]['latency_ms'].get('p99')} ms, "
+                f"{results[name]['errors']} errors", file=sys.stderr,
+            )
+        return results
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Scenarios whose p99 latency or throughput regressed by more than max_regression against the baseline."""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous or not previous.get("latency_ms") or not current.get("latency_ms"):
+            continue
+        if current["latency_ms"]["p99"] > previous["latency_ms"]["p99"] * (1 + max_regression):
+            regressions.append(f"{name}: p99 {previous['latency_ms']['p99']} -> {current['latency_ms']['p99']} ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="scenarios to run (default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each scenario")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0, help="delay the stub upstreams add to every call")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the production per-host rate limits")
+    parser.add_argument("--output", help="write the JSON results to this file as well")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "rate_limits": "production" if args.keep_rate_limits else "disabled",
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "import": measure_import(top=10),
+    }
+
+    stub_port, app_port = free_port(), free_port()
+    stub = spawn("stub_upstreams.py", "--port", str(stub_port), "--latency-ms", str(args.upstream_latency_ms))
+    app = None
+    try:
+        wait_for_port(stub_port, STARTUP_TIMEOUT_SECONDS)
+        app_args = ["--port", str(app_port), "--stub-port", str(stub_port), "--warm-timeout", str(WARM_TIMEOUT_SECONDS)]
+        app = spawn("serve_app.py", *app_args, *(["--keep-rate-limits"] if args.keep_rate_limits else []))
+        started = read_event(app, "started", STARTUP_TIMEOUT_SECONDS)
+        warm = read_event(app, "warm", WARM_TIMEOUT_SECONDS + 5)
+        results["startup"] = {key: value for key, value in {**started, **warm}.items() if key != "event"}
+        drain(app)
+        wait_for_port(app_port, STARTUP_TIMEOUT_SECONDS)
+        results["endpoints"] = asyncio.run(run_endpoints(app_port, args.scenario or list(SCENARIOS), args.requests, args.concurrency, args.warmup))
+    finally:
+        for process in (app, stub):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        results["regressions"] = regressions
+        failed = bool(regressions)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
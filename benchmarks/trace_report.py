@@ -0,0 +1,167 @@
+"""
+Summarizes traces written with FIREPULSE_TRACING=file:<path> (one JSON span per line).
+
+For each of the slowest requests it prints the span tree with start offsets and durations, marks the spans on
+the critical path (the chain of children that decided when their parent could finish), and lists sibling spans
+that ran one after another, i.e. work that might have been done concurrently.
+
+Usage (from the repository root):
+    FIREPULSE_TRACING=file:traces.jsonl python benchmarks/suite.py --scenario movies_mood --requests 50
+    python benchmarks/trace_report.py traces.jsonl
+    python benchmarks/trace_report.py traces.jsonl --route "POST /api/v1/movies" --top 3 --json
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Siblings separated by less than this count as overlapping rather than serial.
+OVERLAP_TOLERANCE_MS = 0.5
+
+
+def _timestamp_ms(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000
+
+
+class Span:
+    def __init__(self, raw: Dict):
+        self.name = raw["name"]
+        self.span_id = raw["context"]["span_id"]
+        self.trace_id = raw["context"]["trace_id"]
+        self.parent_id = raw.get("parent_id")
+        self.start = _timestamp_ms(raw["start_time"])
+        self.end = _timestamp_ms(raw["end_time"])
+        self.attributes = raw.get("attributes") or {}
+        self.error = (raw.get("status") or {}).get("status_code") == "ERROR"
+        self.children: List["Span"] = []
+        self.critical = False
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def load(path: str) -> Dict[str, List[Span]]:
+    traces = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                span = Span(json.loads(line))
+                traces[span.trace_id].append(span)
+    return traces
+
+
+def build_tree(spans: List[Span]) -> Optional[Span]:
+    """Links children to parents and returns the root (the span whose parent is not in this file)."""
+    by_id = {span.span_id: span for span in spans}
+    roots = []
+    for span in spans:
+        parent = by_id.get(span.parent_id)
+        if parent is None:
+            roots.append(span)
+        else:
+            parent.children.append(span)
+    for span in spans:
+        span.children.sort(key=lambda child: child.start)
+    return max(roots, key=lambda root: root.duration) if roots else None
+
+
+def mark_critical_path(span: Span):
+    """
+    Walks back from the span's end: the child that finished last is what the span waited for, then whichever
+    child finished last before that one started, and so on.
+    """
+    span.critical = True
+    cutoff = span.end
+    for child in sorted(span.children, key=lambda child: child.end, reverse=True):
+        if child.end <= cutoff + OVERLAP_TOLERANCE_MS:
+            mark_critical_path(child)
+            cutoff = child.start
+
+
+def serial_runs(span: Span) -> List[List[Span]]:
+    """Runs of two or more sibling spans where each started only after every earlier sibling had finished."""
+    runs, current, finished = [], [], float("-inf")
+    for child in span.children:
+        if current and child.start >= finished - OVERLAP_TOLERANCE_MS:
+            current.append(child)
+        else:
+            if len(current) > 1:
+                runs.append(current)
+            current = [child]
+        finished = max(finished, child.end)
+    if len(current) > 1:
+        runs.append(current)
+    return runs
+
+
+def describe(span: Span, origin: float) -> Dict:
+    return {
+        "name": span.name,
+        "start_ms": round(span.start - origin, 2),
+        "duration_ms": round(span.duration, 2),
+        "self_ms": round(span.duration - _covered(span.children), 2),
+        "critical": span.critical,
+        "error": span.error,
+        "attributes": span.attributes,
+        "serial": [[child.name for child in run] for run in serial_runs(span)],
+        "children": [describe(child, origin) for child in span.children],
+    }
+
+
+def _covered(children: List[Span]) -> float:
+    """Time covered by at least one child, so overlapping children are not counted twice."""
+    total, end = 0.0, float("-inf")
+    for child in sorted(children, key=lambda child: child.start):
+        if child.end > end:
+            total += child.end - max(child.start, end)
+            end = child.end
+    return total
+
+
+def print_tree(node: Dict, depth: int = 0):
+    marker = "*" if node["critical"] else " "
+    error = "  ERROR" if node["error"] else ""
+    print(f"{marker} {node['start_ms']:9.2f} {node['duration_ms']:9.2f} {node['self_ms']:9.2f}  {'  ' * depth}{node['name']}{error}")
+    for run in node["serial"]:
+        print(f"  {'':29}  {'  ' * (depth + 1)}serial: {' -> '.join(run)}")
+    for child in node["children"]:
+        print_tree(child, depth + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSON-lines span file written by FIREPULSE_TRACING=file:<path>")
+    parser.add_argument("--route", help="only requests whose root span has this name, e.g. \"POST /api/v1/movies\"")
+    parser.add_argument("--top", type=int, default=5, help="slowest requests to show")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of trees")
+    args = parser.parse_args()
+
+    roots = []
+    for spans in load(args.path).values():
+        root = build_tree(spans)
+        if root is not None and (args.route is None or root.name == args.route):
+            roots.append(root)
+    if not roots:
+        sys.exit("No matching traces.")
+
+    roots.sort(key=lambda root: root.duration, reverse=True)
+    reports = []
+    for root in roots[:args.top]:
+        mark_critical_path(root)
+        reports.append({"trace_id": root.trace_id, **describe(root, root.start)})
+
+    if args.json:
+        print(json.dumps({"traces": len(roots), "slowest": reports}, indent=2))
+        return
+    print(f"{len(roots)} traces; {len(reports)} slowest below. * = critical path")
+    for report in reports:
+        print(f"\ntrace {report['trace_id']}")
+        print(f"  {'start':>9} {'total':>9} {'self':>9}  span (ms)")
+        print_tree(report)
+
+
+if __name__ == "__main__":
+    main()
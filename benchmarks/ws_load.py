@@ -0,0 +1,337 @@
+"""
+Load generator for watch parties: many simulated members across many parties on /api/v1/ws/{party_id}/{user_id}.
+
+Phases:
+  - join:      --parties x --members connections (at most --connect-concurrency at a time); join latency is the time
+               from opening the connection until the member receives its own "has joined the party" broadcast
+  - memory:    the server's RSS before and after everyone joined, as KB per connection (and after everyone left)
+  - broadcast: for --duration seconds each party sends --rate chat messages per second from a random member; every
+               delivery's fan-out latency (send -> receive), each message's completion latency (send -> last
+               member), messages sent and delivered per second, and deliveries still missing after --drain seconds
+  - slow consumers: in --slow-parties of the parties, --slow-members members read one message every --slow-delay-ms;
+               the fan-out latency of the other members is reported separately for parties with and without them,
+               since one member the server cannot write to holds up the whole party's broadcast
+
+By default the app is started locally (serve_app.py, against the stub upstreams) so its memory can be measured; use
+--url to load an already running server instead (and --server-pid to sample its memory on this host).
+
+Usage (from the repository root):
+    python benchmarks/ws_load.py --parties 200 --members 10 --duration 30
+    python benchmarks/ws_load.py --parties 50 --members 20 --slow-parties 0.2 --slow-members 1 --output ws.json
+    python benchmarks/ws_load.py --url ws://localhost:8000 --server-pid 4242 --parties 500 --members 8
+
+All members live in this one process; past a few thousand connections its own event loop becomes the bottleneck
+(see "client_loop_lag_ms"), so run several copies with different --party-prefix values instead.
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import ConnectionClosed
+
+from suite import STARTUP_TIMEOUT_SECONDS, drain, free_port, read_event, spawn, summarize, wait_for_port
+
+WS_PATH = "/api/v1/ws"
+BENCH_MARKER = "bench|"
+MEMORY_SETTLE_SECONDS = 1.0
+
+
+@dataclass
+class Member:
+    party_id: str
+    user_id: str
+    slow: bool
+    connection: Optional[ClientConnection] = None
+    reader: Optional[asyncio.Task] = None
+
+
+@dataclass
+class Stats:
+    handshake_ms: List[float] = field(default_factory=list)
+    join_ms: List[float] = field(default_factory=list)
+    connect_errors: Dict[str, int] = field(default_factory=dict)
+    sent: int = 0
+    send_errors: int = 0
+    expected_deliveries: int = 0
+    delivered: int = 0
+    # Fan-out latency of each delivery, by receiver.
+    fast_in_slow_parties: List[float] = field(default_factory=list)
+    fast_in_other_parties: List[float] = field(default_factory=list)
+    slow_members: List[float] = field(default_factory=list)
+    # Per message: (party_id, seq) -> [deliveries still expected, latency of the latest one].
+    pending: Dict[tuple, list] = field(default_factory=dict)
+    completion_ms: List[float] = field(default_factory=list)
+    disconnected_during_run: int = 0
+
+    def error(self, e: BaseException):
+        name = type(e).__name__
+        self.connect_errors[name] = self.connect_errors.get(name, 0) + 1
+
+
+def rss_kb(pid: Optional[int]) -> Optional[int]:
+    """Resident set size of a process in KB, from /proc (Linux only)."""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def raise_open_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def read_messages(member: Member, stats: Stats, slow_party: bool, slow_delay: float):
+    try:
+        async for message in member.connection:
+            marker = message.find(BENCH_MARKER)
+            if marker == -1:
+                continue
+            _, party_id, seq, sent_ns = message[marker:].split("|")
+            latency = (time.time_ns() - int(sent_ns)) / 1e6
+            stats.delivered += 1
+            if member.slow:
+                stats.slow_members.append(latency)
+            elif slow_party:
+                stats.fast_in_slow_parties.append(latency)
+            else:
+                stats.fast_in_other_parties.append(latency)
+            pending = stats.pending.get((party_id, int(seq)))
+            if pending is not None:
+                pending[0] -= 1
+                pending[1] = latency
+                if pending[0] == 0:
+                    stats.completion_ms.append(latency)
+                    del stats.pending[(party_id, int(seq))]
+            if member.slow:
+                await asyncio.sleep(slow_delay)
+    except ConnectionClosed:
+        stats.disconnected_during_run += 1
+
+
+async def join(base_url: str, member: Member, stats: Stats, semaphore: asyncio.Semaphore, slow_party: bool, args):
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            member.connection = await connect(
+                f"{base_url}{WS_PATH}/{member.party_id}/{member.user_id}",
+                open_timeout=args.timeout, ping_interval=None, proxy=None,
+                # A slow member stops reading from the socket once a couple of messages are queued.
+                max_queue=2 if member.slow else 64,
+            )
+            stats.handshake_ms.append((time.perf_counter() - started) * 1000)
+            joined = f"User '{member.user_id}' has joined the party."
+            async with asyncio.timeout(args.timeout):
+                while await member.connection.recv() != joined:
+                    pass
+            stats.join_ms.append((time.perf_counter() - started) * 1000)
+        except (OSError, asyncio.TimeoutError, ConnectionClosed) as e:
+            stats.error(e)
+            if member.connection is not None:
+                await member.connection.close()
+            member.connection = None
+            return
+    member.reader = asyncio.create_task(read_messages(member, stats, slow_party, args.slow_delay_ms / 1000))
+
+
+async def send_messages(party_id: str, members: List[Member], stats: Stats, args, deadline: float):
+    connected = [member for member in members if member.connection is not None]
+    senders = [member for member in connected if not member.slow]
+    if not senders:
+        return
+    interval = 1 / args.rate
+    seq = 0
+    # Stagger the parties so they do not all send on the same tick.
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.monotonic() < deadline:
+        sender = random.choice(senders)
+        seq += 1
+        stats.pending[(party_id, seq)] = [len(connected), None]
+        try:
+            await sender.connection.send(f"{BENCH_MARKER}{party_id}|{seq}|{time.time_ns()}")
+            stats.sent += 1
+            stats.expected_deliveries += len(connected)
+        except ConnectionClosed:
+            stats.send_errors += 1
+            del stats.pending[(party_id, seq)]
+        await asyncio.sleep(interval)
+
+
+async def measure_loop_lag(samples: List[float], stop: asyncio.Event):
+    """How late this process's event loop wakes up: if it is high, the generator rather than the server is saturated."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.05)
+        samples.append((time.perf_counter() - started - 0.05) * 1000)
+
+
+async def run(base_url: str, server_pid: Optional[int], args) -> Dict:
+    stats = Stats()
+    parties: Dict[str, List[Member]] = {}
+    slow_parties = set()
+    party_count_slow = round(args.parties * args.slow_parties)
+    for index in range(args.parties):
+        party_id = f"{args.party_prefix}{index}"
+        slow = index < party_count_slow
+        if slow:
+            slow_parties.add(party_id)
+        parties[party_id] = [
+            Member(party_id, f"{party_id}-member{number}", slow=slow and number < args.slow_members)
+            for number in range(args.members)
+        ]
+
+    rss_before = rss_kb(server_pid)
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    join_started = time.perf_counter()
+    # Every party gains its first member before any gains a second, like parties filling up side by side.
+    await asyncio.gather(*(
+        join(base_url, member, stats, semaphore, party_id in slow_parties, args)
+        for member_index in range(args.members)
+        for party_id, members in parties.items()
+        for member in [members[member_index]]
+    ))
+    join_seconds = time.perf_counter() - join_started
+    connected = sum(1 for members in parties.values() for member in members if member.connection is not None)
+
+    await asyncio.sleep(MEMORY_SETTLE_SECONDS)
+    rss_connected = rss_kb(server_pid)
+
+    loop_lag: List[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(loop_lag, stop))
+    broadcast_started = time.monotonic()
+    deadline = broadcast_started + args.duration
+    await asyncio.gather(*(send_messages(party_id, members, stats, args, deadline) for party_id, members in parties.items()))
+    sending_seconds = time.monotonic() - broadcast_started
+    delivered_on_time = stats.delivered
+    await asyncio.sleep(args.drain)
+    stop.set()
+    await lag_task
+
+    all_members = [member for members in parties.values() for member in members]
+    readers = [member.reader for member in all_members if member.reader is not None]
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    await asyncio.gather(*(member.connection.close() for member in all_members if member.connection is not None))
+    await asyncio.sleep(MEMORY_SETTLE_SECONDS)
+    rss_after = rss_kb(server_pid)
+
+    memory = {"server_pid": server_pid, "rss_before_kb": rss_before, "rss_connected_kb": rss_connected, "rss_after_close_kb": rss_after}
+    if rss_before is not None and rss_connected is not None and connected:
+        memory["kb_per_connection"] = round((rss_connected - rss_before) / connected, 1)
+
+    fast = stats.fast_in_slow_parties + stats.fast_in_other_parties
+    return {
+        "meta": {
+            "url": base_url,
+            "parties": args.parties,
+            "members_per_party": args.members,
+            "rate_per_party": args.rate,
+            "duration_s": args.duration,
+            "slow_parties": len(slow_parties),
+            "slow_members_per_party": args.slow_members if slow_parties else 0,
+            "slow_delay_ms": args.slow_delay_ms,
+        },
+        "join": {
+            "connected": connected,
+            "errors": stats.connect_errors,
+            "connections_per_s": round(connected / join_seconds, 1),
+            "handshake_ms": summarize(stats.handshake_ms),
+            "join_ms": summarize(stats.join_ms),
+        },
+        "memory": memory,
+        "broadcast": {
+            "sent": stats.sent,
+            "send_errors": stats.send_errors,
+            "sent_per_s": round(stats.sent / sending_seconds, 1),
+            "delivered": stats.delivered,
+            "delivered_per_s": round(delivered_on_time / sending_seconds, 1),
+            "expected_deliveries": stats.expected_deliveries,
+            "missing_after_drain": stats.expected_deliveries - stats.delivered,
+            "disconnected": stats.disconnected_during_run,
+            "fanout_ms": summarize(fast),
+            "completion_ms": summarize(stats.completion_ms),
+        },
+        "slow_consumers": {
+            "fast_members_in_slow_parties_ms": summarize(stats.fast_in_slow_parties),
+            "fast_members_in_other_parties_ms": summarize(stats.fast_in_other_parties),
+            "slow_members_ms": summarize(stats.slow_members),
+        },
+        "client_loop_lag_ms": summarize(loop_lag),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parties", type=int, default=100)
+    parser.add_argument("--members", type=int, default=10, help="members per party")
+    parser.add_argument("--rate", type=float, default=1.0, help="messages per second per party")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of broadcasting")
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for late deliveries")
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds allowed for one member to join")
+    parser.add_argument("--slow-parties", type=float, default=0.0, help="fraction of parties with slow consumers")
+    parser.add_argument("--slow-members", type=int, default=1, help="slow consumers in each of those parties")
+    parser.add_argument("--slow-delay-ms", type=float, default=1000.0, help="how long a slow consumer takes per message")
+    parser.add_argument("--party-prefix", default="bench-party-")
+    parser.add_argument("--url", help="ws:// base URL of a running server (default: start the app locally)")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, to sample its memory")
+    parser.add_argument("--output", help="write the JSON results to this file as well")
+    parser.add_argument("--max-join-p99-ms", type=float, help="fail if the p99 join latency exceeds this")
+    parser.add_argument("--max-fanout-p99-ms", type=float, help="fail if the p99 fan-out latency of fast members exceeds this")
+    args = parser.parse_args()
+
+    raise_open_file_limit()
+    stub = app = None
+    try:
+        if args.url:
+            base_url, server_pid = args.url.rstrip("/"), args.server_pid
+        else:
+            stub_port, app_port = free_port(), free_port()
+            stub = spawn("stub_upstreams.py", "--port", str(stub_port))
+            wait_for_port(stub_port, STARTUP_TIMEOUT_SECONDS)
+            app = spawn("serve_app.py", "--port", str(app_port), "--stub-port", str(stub_port))
+            read_event(app, "started", STARTUP_TIMEOUT_SECONDS)
+            drain(app)
+            wait_for_port(app_port, STARTUP_TIMEOUT_SECONDS)
+            base_url, server_pid = f"ws://127.0.0.1:{app_port}", app.pid
+        results = asyncio.run(run(base_url, server_pid, args))
+    finally:
+        for process in (app, stub):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    failed = False
+    if args.max_join_p99_ms is not None and results["join"]["join_ms"].get("p99", 0) > args.max_join_p99_ms:
+        failed = True
+    if args.max_fanout_p99_ms is not None and results["broadcast"]["fanout_ms"].get("p99", 0) > args.max_fanout_p99_ms:
+        failed = True
+    if results["join"]["connected"] < args.parties * args.members:
+        failed = True
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
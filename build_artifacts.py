@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import sys
+import time
+
+from firepulse.services import catalog, movie_graph
+from firepulse.services.upstream import UpstreamClient, create_http_client
+
+
+async def build_artifacts(skip_graph: bool) -> bool:
+    """Builds the movie catalog and graph and saves them to FIREPULSE_CATALOG_PATH / FIREPULSE_MOVIE_GRAPH_PATH."""
+    client = UpstreamClient(create_http_client())
+    try:
+        started = time.perf_counter()
+        movie_catalog = await catalog.refresh_catalog(client)
+        if movie_catalog is None:
+            print("Catalog build returned no movies.")
+            return False
+        print(f"{catalog.CATALOG_PATH}: {len(movie_catalog)} movies in {time.perf_counter() - started:.1f}s")
+        if skip_graph:
+            return True
+
+        started = time.perf_counter()
+        graph = await movie_graph.refresh_graph(client)
+        if graph is None:
+            print("Movie graph build produced no edges.")
+            return False
+        print(f"{movie_graph.GRAPH_PATH}: {len(graph)} movies, {graph.edge_count} edges in {time.perf_counter() - started:.1f}s")
+        return True
+    finally:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the movie catalog and graph files the API loads at startup. Run it on a schedule "
+        "for deployments that do not refresh them in process (Lambda, or FIREPULSE_BACKGROUND_TASKS=0)."
+    )
+    parser.add_argument("--skip-graph", action="store_true", help="only build the catalog")
+    args = parser.parse_args()
+    if not asyncio.run(build_artifacts(args.skip_graph)):
+        sys.exit(1)
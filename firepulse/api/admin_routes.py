@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.responses import ORJSONResponse
+
+from ..api.auth_routes import get_current_user
+from ..core import profiling
+from ..models.user import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def get_admin_user(current_user: UserModel = Depends(get_current_user)) -> UserModel:
+    """The current user, if their account is flagged is_admin; emails are self-registered, so they are not checked."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required.")
+    return current_user
+
+
+def _with_download(profile: dict) -> dict:
+    return {**profile, "download": f"/api/v1/admin/profiles/{profile['id']}"}
+
+
+@router.post("/admin/profiles", status_code=status.HTTP_201_CREATED, tags=["Admin"])
+async def record_profile(
+    seconds: float = Query(10, gt=0, le=profiling.MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(profiling.DEFAULT_INTERVAL_MS, ge=profiling.MIN_INTERVAL_MS, le=1000),
+    admin: UserModel = Depends(get_admin_user),
+):
+    """
+    Samples every thread of this worker for `seconds` and stores the profile. The response comes back when
+    sampling ends; send the traffic to look at meanwhile.
+    """
+    logger.info("Recording a %.1f s profile.", seconds, extra={"admin": admin.email})
+    try:
+        profile = await profiling.record_profile(seconds, interval_ms)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return _with_download(profile)
+
+
+@router.get("/admin/profiles", tags=["Admin"])
+async def list_profiles(admin: UserModel = Depends(get_admin_user)):
+    """Profiles stored on this host by any worker, on-demand and slow-request ones, newest first."""
+    profiles = await asyncio.to_thread(profiling.list_profiles)
+    return {"slow_request_ms": profiling.SLOW_REQUEST_MS or None, "profiles": [_with_download(profile) for profile in profiles]}
+
+
+@router.get("/admin/profiles/{profile_id}", tags=["Admin"])
+async def download_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    admin: UserModel = Depends(get_admin_user),
+):
+    """
+    A stored profile as a file: the JSON artifact, or with format=collapsed its stacks alone, one
+    "frame;frame;... count" line each, for flamegraph.pl or speedscope.
+    """
+    profile = await asyncio.to_thread(profiling.get_profile, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found.")
+    if format == "collapsed":
+        return Response(
+            profiling.collapsed(profile), media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+        )
+    return ORJSONResponse(profile, headers={"Content-Disposition": f'attachment; filename="{profile_id}.json"'})
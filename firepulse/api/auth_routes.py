@@ -1,5 +1,6 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status,Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta, datetime, timezone
@@ -17,6 +18,8 @@ from ..models.user import User as UserModel
 
 from ..services import google_auth
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -30,6 +33,18 @@ def get_db():
     finally:
         db.close()
 
+def user_payload(user: UserModel) -> dict:
+    """The user_schema.User response built straight from the ORM object, without validating it again."""
+    return {
+        "email": user.email,
+        "id": user.id,
+        "is_active": user.is_active,
+        "created_at": user.created_at,
+        "google_creds_json": user.google_creds_json,
+        "total_points": user.total_points or 0,
+        "badges": [{"id": badge.id, "name": badge.name, "description": badge.description} for badge in user.badges],
+    }
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserModel:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -150,7 +165,7 @@ def get_calendar_events(current_user: UserModel = Depends(get_current_user)):
         return formatted_events
 
     except Exception as e:
-        print(f"Error fetching calendar events: {e}")
+        logger.exception("Error fetching calendar events: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while fetching calendar events."
@@ -162,7 +177,7 @@ def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
     db_user = user_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return user_crud.create_user(db=db, user=user)
+    return ORJSONResponse(user_payload(user_crud.create_user(db=db, user=user)))
 
 
 @router.post("/token", response_model=user_schema.Token, tags=["Authentication"])
@@ -186,7 +201,7 @@ def read_users_me(current_user: UserModel = Depends(get_current_user)):
     """
     Fetch the currently logged-in user.
     """
-    return current_user
+    return ORJSONResponse(user_payload(current_user))
 
 
 
@@ -195,4 +210,4 @@ def read_user_badges(current_user: UserModel = Depends(get_current_user)):
     """
     Fetch all badges for the currently logged-in user.
     """
-    return current_user.badges
\ No newline at end of file
+    return ORJSONResponse([{"id": badge.id, "name": badge.name, "description": badge.description} for badge in current_user.badges])
\ No newline at end of file
@@ -1,18 +1,31 @@
-from fastapi import APIRouter, HTTPException, Body, Request, Depends
+import logging
+from fastapi import APIRouter, HTTPException, Body, Request, Depends, Query, UploadFile, File
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import httpx
 import re
-from thefuzz import fuzz
+from rapidfuzz import fuzz, process
 from sqlalchemy.orm import Session
-import random
 import asyncio
+import base64
+import binascii
+import csv
+import io
+from datetime import datetime
 
 from ..core.config import settings
 from ..core.db import SessionLocal
 from ..api.auth_routes import get_current_user
 from ..models.user import User as UserModel
+from ..schemas import movies as movie_schema
 from ..crud import history as history_crud
+from ..services import catalog, movie_graph, taste
+from ..services.cache import TwoTierCache
+from ..services.tmdb import MovieRecord, parse_results
+from ..services.upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -28,61 +41,154 @@ class WatchedMovie(BaseModel):
     movie_name: str
 
 
+class WatchHistoryImport(BaseModel):
+    movie_names: List[str]
+
+
+MOVIE_MATCH_THRESHOLD = 85
+# History rows used to build a taste profile for users who logged movies before profiles existed.
+TASTE_BOOTSTRAP_HISTORY = 200
+RECOMMENDATION_COUNT = 10
+# Recent watches whose movie-graph neighbors are considered, and how many neighbors are re-ranked by taste.
+GRAPH_SEED_HISTORY = 20
+GRAPH_CANDIDATES = 50
+HISTORY_IMPORT_MAX_TITLES = 1000
+# Larger CSV uploads are rejected before parsing; 1000 titles fit well within this.
+HISTORY_IMPORT_MAX_CSV_BYTES = 1024 * 1024
+# Titles resolved against TMDB at once during an import.
+HISTORY_IMPORT_CONCURRENCY = 10
+
+# normalized movie name -> {"id", "title", "genres"}; TMDB ids and genres for a title rarely change.
+movie_resolution_cache = TwoTierCache("tmdb", ttl=24 * 60 * 60, maxsize=10_000, name="movie_resolution")
+
+
 def normalize(text: str) -> str:
     return re.sub(r"[^\w\s]", "", text.lower()).strip()
 
-async def search_for_movie_id(client: httpx.AsyncClient, movie_name: str) -> int:
-    """Searches for a movie and returns its ID. Raises HTTPException on failure."""
+async def search_for_movie(client: UpstreamClient, movie_name: str) -> MovieRecord:
+    """Searches for a movie and returns the best confident match from the search results. Raises HTTPException on failure."""
     url = "https://api.themoviedb.org/3/search/movie"
     params = {"api_key": settings.TMDB_API_KEY, "query": movie_name}
 
-    for attempt in range(3):
-        try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            results = response.json().get("results", [])
-            if not results:
-                raise HTTPException(status_code=404, detail=f"No results found for '{movie_name}'.")
-
-            best_match = max(results, key=lambda m: fuzz.ratio(normalize(movie_name), normalize(m.get("title", ""))))
+    try:
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        results = parse_results(response.json())
+    except httpx.HTTPError as e:
+        logger.warning("Error searching for movie '%s': %s", movie_name, e)
+        raise HTTPException(status_code=504, detail="Could not connect to movie search service.")
 
-            if fuzz.ratio(normalize(movie_name), normalize(best_match.get("title", ""))) >= 85:
-                return best_match["id"]
-            else:
-                raise HTTPException(status_code=404, detail=f"Could not find a confident match for '{movie_name}'.")
-        except httpx.ConnectError as e:
-            print(f"Attempt {attempt + 1} failed for search_for_movie_id: {e}")
-            await asyncio.sleep(1)
+    if not results:
+        raise HTTPException(status_code=404, detail=f"No results found for '{movie_name}'.")
 
-    raise HTTPException(status_code=504, detail="Could not connect to movie search service.")
+    titles = [normalize(movie.title) for movie in results]
+    best_match = process.extractOne(normalize(movie_name), titles, scorer=fuzz.ratio, score_cutoff=MOVIE_MATCH_THRESHOLD)
+    if best_match is None:
+        raise HTTPException(status_code=404, detail=f"Could not find a confident match for '{movie_name}'.")
+    return results[best_match[2]]
 
 
-async def get_movie_details(client: httpx.AsyncClient, movie_id: int) -> Dict[str, Any]:
+async def get_movie_details(client: UpstreamClient, movie_id: int) -> Dict[str, Any]:
     """Fetches movie details. Raises HTTPException on failure or if genres are missing."""
     url = f"https://api.themoviedb.org/3/movie/{movie_id}"
     params = {"api_key": settings.TMDB_API_KEY}
 
-    for attempt in range(3):
-        try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            movie_data = response.json()
-
-            
-            if not movie_data.get("genres"):
-                raise ValueError(f"Movie details response for ID {movie_id} is missing 'genres' field or it is empty.")
+    try:
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        movie_data = response.json()
+    except httpx.HTTPError as e:
+        logger.warning("Error fetching details for movie ID %s: %s", movie_id, e)
+        raise HTTPException(status_code=504, detail="Could not fetch valid details from the movie service.")
+
+    if not movie_data.get("genres"):
+        raise HTTPException(status_code=504, detail="Could not fetch valid details from the movie service.")
+
+    return {
+        "id": movie_data.get("id"),
+        "title": movie_data.get("title"),
+        "genres": [genre['id'] for genre in movie_data.get("genres", [])]
+    }
 
-            return {
-                "id": movie_data.get("id"),
-                "title": movie_data.get("title"),
-                "genres": [genre['id'] for genre in movie_data.get("genres", [])]
-            }
-        except (httpx.ConnectError, ValueError) as e:
-            print(f"Attempt {attempt + 1} failed for get_movie_details: {e}")
-            await asyncio.sleep(1)
 
-    raise HTTPException(status_code=504, detail="Could not fetch valid details from the movie service.")
 
+async def resolve_movie(client: UpstreamClient, movie_name: str) -> Dict[str, Any]:
+    """
+    Resolves a movie name to {"id", "title", "genres"}, serving repeat titles from the cache.
+    The search payload already carries genre_ids, so the details call is only made when they are missing.
+    """
+    cache_key = f"resolve:{normalize(movie_name)}"
+    cached = await movie_resolution_cache.get(cache_key)
+    if cached:
+        return cached
+
+    movie = await search_for_movie(client, movie_name)
+    if movie.genre_ids:
+        movie_details = {"id": movie.id, "title": movie.title, "genres": list(movie.genre_ids)}
+    else:
+        movie_details = await get_movie_details(client, movie.id)
+
+    await movie_resolution_cache.set(cache_key, movie_details)
+    return movie_details
+
+
+
+async def import_watch_history(client: UpstreamClient, db: Session, user_id: int, movie_names: List[str]) -> Dict[str, Any]:
+    """
+    Resolves many movie names concurrently and writes every match to the user's history in one batch.
+    Returns a per-title status report.
+    """
+    movie_names = [name.strip() for name in movie_names if name and name.strip()]
+    if not movie_names:
+        raise HTTPException(status_code=400, detail="No movie names to import.")
+    if len(movie_names) > HISTORY_IMPORT_MAX_TITLES:
+        raise HTTPException(status_code=400, detail=f"Imports are limited to {HISTORY_IMPORT_MAX_TITLES} titles.")
+
+    semaphore = asyncio.Semaphore(HISTORY_IMPORT_CONCURRENCY)
+
+    async def resolve_one(movie_name: str):
+        async with semaphore:
+            try:
+                return movie_name, await resolve_movie(client, movie_name), None
+            except HTTPException as e:
+                return movie_name, None, e
+            except Exception as e:
+                logger.warning("Error resolving '%s' during history import: %s", movie_name, e)
+                return movie_name, None, HTTPException(status_code=502, detail="Movie service error.")
+
+    resolutions = await asyncio.gather(*(resolve_one(name) for name in movie_names))
+
+    resolved_movies = [movie_details for _, movie_details, _ in resolutions if movie_details]
+    history_crud.bulk_add_movies_to_history(db=db, user_id=user_id, movies=resolved_movies)
+    # Keyed by id so a title listed twice counts once, as in the history itself.
+    genres_by_id = {movie['id']: movie['genres'] for movie in resolved_movies}
+    taste.add_watches_to_profile(db, user_id=user_id, genre_lists=list(genres_by_id.values()))
+
+    items = []
+    for movie_name, movie_details, error in resolutions:
+        if movie_details:
+            items.append({"movie_name": movie_name, "status": "logged", "tmdb_id": movie_details["id"], "title": movie_details["title"]})
+        else:
+            items.append({"movie_name": movie_name, "status": "not_found" if error.status_code == 404 else "error", "detail": error.detail})
+
+    return {"logged": len(resolved_movies), "failed": len(items) - len(resolved_movies), "items": items}
+
+
+def read_movie_names_from_csv(content: bytes) -> List[str]:
+    """
+    Reads movie names from a CSV file, using a title/movie_name/name column if present or else the first column.
+    The first row is always taken as the header, whether or not it names a known column.
+    """
+    rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    for column in ("movie_name", "title", "movie", "name"):
+        if column in header:
+            index = header.index(column)
+            return [row[index] for row in rows[1:] if len(row) > index]
+    return [row[0] for row in rows[1:] if row]
 
 
 @router.post("/history/log-watch", tags=["User History & Recommendations"])
@@ -93,61 +199,128 @@ async def log_watch_history(
     current_user: UserModel = Depends(get_current_user)
 ):
     """Logs a movie to the current authenticated user's watch history."""
-    client: httpx.AsyncClient = request.app.state.httpx_client
+    client: UpstreamClient = request.app.state.upstream
 
     try:
-        movie_id = await search_for_movie_id(client, watched_movie.movie_name)
-        movie_details = await get_movie_details(client, movie_id)
+        movie_details = await resolve_movie(client, watched_movie.movie_name)
 
         history_crud.add_movie_to_history(db=db, user_id=current_user.id, movie_details=movie_details)
+        taste.add_watches_to_profile(db, user_id=current_user.id, genre_lists=[movie_details['genres']])
 
         return {"message": f"Successfully logged '{movie_details['title']}' to your watch history."}
     except HTTPException as e:
         
         raise e
 
-@router.get("/history/recommendations", tags=["User History & Recommendations"])
-async def get_history_based_recommendations(
+@router.post("/history/import", tags=["User History & Recommendations"])
+async def import_watch_history_json(
+    watch_history: WatchHistoryImport,
     request: Request,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Gets movie recommendations based on the current user's watch history."""
-    client: httpx.AsyncClient = request.app.state.httpx_client
-
-    user_history = history_crud.get_user_movie_history(db, user_id=current_user.id)
-    if not user_history:
-        raise HTTPException(status_code=404, detail="No watch history found. Log some movies first!")
-
-    last_watched_movie = user_history[0]
-    genre_ids = last_watched_movie.genres
-    if not genre_ids:
-        raise HTTPException(status_code=404, detail="Last watched movie has no genre information.")
-
-    genre_id_string = "|".join(map(str, genre_ids))
-    recommendations_url = "https://api.themoviedb.org/3/discover/movie"
-    params = {
-        "api_key": settings.TMDB_API_KEY,
-        "with_genres": genre_id_string,
-        "sort_by": "popularity.desc",
-        "page": random.randint(1, 5)
-    }
+    """Logs a list of movie names to the current user's watch history and reports the status of each."""
+    client: UpstreamClient = request.app.state.upstream
+    return await import_watch_history(client, db, current_user.id, watch_history.movie_names)
 
-    for attempt in range(3):
+@router.post("/history/import/csv", tags=["User History & Recommendations"])
+async def import_watch_history_csv(
+    request: Request,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Logs the movies in an uploaded CSV export to the current user's watch history."""
+    client: UpstreamClient = request.app.state.upstream
+    content = await file.read(HISTORY_IMPORT_MAX_CSV_BYTES + 1)
+    if len(content) > HISTORY_IMPORT_MAX_CSV_BYTES:
+        raise HTTPException(status_code=413, detail=f"CSV files are limited to {HISTORY_IMPORT_MAX_CSV_BYTES // 1024} KB.")
+    try:
+        movie_names = read_movie_names_from_csv(content)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded.")
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Could not read the CSV file: {e}")
+    return await import_watch_history(client, db, current_user.id, movie_names)
+
+@router.get("/history", response_model=movie_schema.WatchHistoryPage, tags=["User History & Recommendations"])
+def read_watch_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    Returns one page of the current user's watch history, newest first.
+    Pass the returned `next_cursor` back as `cursor` to fetch the following page.
+    """
+    before = None
+    if cursor:
         try:
-            response = await client.get(recommendations_url, params=params)
-            response.raise_for_status()
-            results = response.json().get("results", [])
-
-            watched_ids = {h.tmdb_id for h in user_history}
-            suggestions = [movie for movie in results if movie.get("id") not in watched_ids]
-
-            return {
-                "recommending_based_on": f"your last watched movie: '{last_watched_movie.movie_title}'",
-                "suggestions": suggestions[:10]
-            }
-        except httpx.ConnectError as e:
-            print(f"Attempt {attempt + 1} failed: Connection error. Retrying...")
-            await asyncio.sleep(1)
-
-    raise HTTPException(status_code=504, detail="Could not connect to the movie service after multiple attempts.")
\ No newline at end of file
+            watched_at, history_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("_", 1)
+            before = (datetime.fromisoformat(watched_at), int(history_id))
+        except (ValueError, binascii.Error):
+            raise HTTPException(status_code=400, detail="Invalid history cursor.")
+
+    rows = history_crud.get_user_movie_history_page(db, user_id=current_user.id, limit=limit, before=before)
+    items = [
+        {"tmdb_id": row.tmdb_id, "title": row.movie_title, "genres": row.genres, "watched_at": row.watched_at}
+        for row in rows
+    ]
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = base64.urlsafe_b64encode(f"{rows[-1].watched_at.isoformat()}_{rows[-1].id}".encode()).decode()
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
+@router.get("/history/recommendations", response_model=movie_schema.HistoryRecommendations, tags=["User History & Recommendations"])
+async def get_history_based_recommendations(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    Gets movie recommendations from the movie graph neighbors of the user's recent watches,
+    ranked by the user's taste profile (recency-weighted genre preferences), topped up
+    by scoring the catalog (or a cached pool of popular movies) against the same profile.
+    """
+    client: UpstreamClient = request.app.state.upstream
+
+    profile = history_crud.get_taste_profile(db, user_id=current_user.id)
+    if profile:
+        user_taste = taste.updated_taste(profile.weights, profile.updated_at, [], taste.utcnow())
+    else:
+        recent_history = history_crud.get_latest_movie_history(db, user_id=current_user.id, limit=TASTE_BOOTSTRAP_HISTORY)
+        if not recent_history:
+            raise HTTPException(status_code=404, detail="No watch history found. Log some movies first!")
+        now = taste.utcnow()
+        user_taste = taste.taste_from_history(recent_history, now)
+        history_crud.save_taste_profile(db, user_id=current_user.id, weights=user_taste, updated_at=now)
+
+    if not user_taste.any():
+        raise HTTPException(status_code=404, detail="Your watched movies have no genre information yet.")
+
+    watched_ids = history_crud.get_watched_tmdb_ids(db, user_ids=[current_user.id])
+    suggestions = []
+
+    graph = movie_graph.get_graph()
+    if graph is not None:
+        recent_ids = [row.tmdb_id for row in history_crud.get_latest_movie_history(db, user_id=current_user.id, limit=GRAPH_SEED_HISTORY)]
+        neighbors = graph.recommend(recent_ids, exclude_ids=watched_ids, limit=GRAPH_CANDIDATES)
+        suggestions = taste.rank_neighbors(user_taste, neighbors, limit=RECOMMENDATION_COUNT)
+
+    if len(suggestions) < RECOMMENDATION_COUNT:
+        exclude_ids = set(watched_ids) | {movie.id for movie in suggestions}
+        remaining = RECOMMENDATION_COUNT - len(suggestions)
+        movie_catalog = catalog.get_catalog()
+        if movie_catalog is not None:
+            suggestions += taste.rank_catalog(user_taste, movie_catalog, exclude_ids=exclude_ids, limit=remaining)
+        else:
+            candidates = await taste.get_candidate_pool(client)
+            if not candidates and not suggestions:
+                raise HTTPException(status_code=504, detail="Could not connect to the movie service.")
+            suggestions += taste.rank_candidates(user_taste, candidates, exclude_ids=exclude_ids, limit=remaining)
+
+    return ORJSONResponse({
+        "recommending_based_on": f"your taste for {' and '.join(taste.top_genre_names(user_taste))} movies",
+        "suggestions": [movie.to_dict() for movie in suggestions]
+    })
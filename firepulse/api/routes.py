@@ -1,9 +1,12 @@
+import logging
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import httpx
 
 
 from ..services import movie_bot, song_bot, voice
+from ..services.upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -16,7 +19,7 @@ async def get_movie_suggestions(query_request: QueryRequest, request: Request):
     Handles ONLY movie recommendation requests.
     It first tries to find a person (actor/director) and falls back to a movie mood.
     """
-    client: httpx.AsyncClient = request.app.state.httpx_client
+    client: UpstreamClient = request.app.state.upstream
     query_text = query_request.query.strip()
     
    
@@ -35,7 +38,7 @@ async def get_movie_suggestions(query_request: QueryRequest, request: Request):
         return {"text": message, "voice_url": voice_url}
 
     
-    movie_mood = movie_bot.extract_mood(query_text)
+    movie_mood = await movie_bot.detect_mood(query_text)
     if not movie_mood:
         raise HTTPException(status_code=404, detail="Sorry, I couldn't find an actor/director by that name or understand the mood.")
     
@@ -60,13 +63,10 @@ async def get_song_suggestions(query_request: QueryRequest, request: Request):
     song_results: list[str] = await song_bot.get_songs_by_artist(request, artist_name)
     
     if song_results and "Failed" not in song_results[0]:
-       
-        print("\n--- DEBUG MARKER: CONSTRUCTING SONG MESSAGE ---")
         message = f"Here are some songs by {artist_name}: " + ", ".join(song_results)
-        print(f"--- DEBUG MARKER: FINAL MESSAGE BEING SENT: '{message}' ---\n")
-        
+        logger.debug("Song message for '%s': %s", artist_name, message)
 
-        voice_url: str | None = await voice.text_to_speech(request.app.state.httpx_client, message)
+        voice_url: str | None = await voice.text_to_speech(request.app.state.upstream, message)
         return {"text": message, "voice_url": voice_url}
     
     
@@ -85,5 +85,5 @@ async def get_song_suggestions(query_request: QueryRequest, request: Request):
 
     message = f"Here are some {song_mood}-based song recommendations: " + ", ".join(mood_songs)
     
-    voice_url: str | None = await voice.text_to_speech(request.app.state.httpx_client, message)
+    voice_url: str | None = await voice.text_to_speech(request.app.state.upstream, message)
     return {"text": message, "voice_url": voice_url}
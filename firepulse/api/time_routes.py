@@ -1,13 +1,35 @@
+import logging
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
-import httpx
+from typing import Dict, List, Optional
 import asyncio
 import random
-import pytz
 from ..core.config import settings
+from ..schemas import movies as movie_schema
+from ..services import catalog
+from ..services.swr_cache import SWRCache
+from ..services.tmdb import MovieRecord, parse_results, records_from_dicts
+from ..services.upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Movies drawn per pool when suggestions come from the local catalog.
+CATALOG_POOL_SIZE = 30
+# A catalog movie counts as "latest" if it was released within this many days.
+LATEST_RELEASE_WINDOW_DAYS = 45
+# Without a catalog, TMDB pools per time slot are served stale-while-revalidate.
+THEME_POOLS_SOFT_TTL_SECONDS = 10 * 60
+THEME_POOLS_HARD_TTL_SECONDS = 2 * 60 * 60
+THEME_POOLS_STALE_IF_ERROR_SECONDS = 24 * 60 * 60
+theme_pools_cache = SWRCache(
+    "time-based pools", soft_ttl=THEME_POOLS_SOFT_TTL_SECONDS, hard_ttl=THEME_POOLS_HARD_TTL_SECONDS,
+    stale_if_error_ttl=THEME_POOLS_STALE_IF_ERROR_SECONDS, namespace="tmdb",
+    decode=lambda pools: {name: records_from_dicts(movies) for name, movies in pools.items()},
+)
+
 time_greetings = {
     "morning": [
         "☀️ Good Morning! Kickstart your day with these picks.",
@@ -36,7 +58,7 @@ time_greetings = {
     ],
 }
 
-async def get_movies_async(client: httpx.AsyncClient, original_lang: str, page: int, genres: str = None, keywords: str = None):
+async def get_movies_async(client: UpstreamClient, original_lang: str, page: int, genres: str = None, keywords: str = None):
     url = "https://api.themoviedb.org/3/discover/movie"
     params = {
         "api_key": settings.TMDB_API_KEY,
@@ -54,28 +76,54 @@ async def get_movies_async(client: httpx.AsyncClient, original_lang: str, page:
     try:
         response = await client.get(url, params=params)
         response.raise_for_status()
-        return {"type": original_lang, "data": response.json().get("results", [])}
+        return {"type": original_lang, "data": parse_results(response.json())}
     except Exception as e:
-        print(f"Error fetching themed movies: {e}")
+        logger.warning("Error fetching themed movies: %s", e)
         return {"type": original_lang, "data": []}
 
-async def get_latest_movies_async(client: httpx.AsyncClient):
+async def get_latest_movies_async(client: UpstreamClient):
     url = "https://api.themoviedb.org/3/movie/now_playing"
     params = {"api_key": settings.TMDB_API_KEY, "language": "en-US", "page": 1, "region": "IN"}
     try:
         response = await client.get(url, params=params)
         response.raise_for_status()
-        return {"type": "latest", "data": response.json().get("results", [])}
+        return {"type": "latest", "data": parse_results(response.json())}
     except Exception as e:
-        print(f"Error fetching latest movies: {e}")
+        logger.warning("Error fetching latest movies: %s", e)
         return {"type": "latest", "data": []}
 
-@router.get("/time-based-suggestions")
+async def fetch_theme_pools(client: UpstreamClient, theme: Optional[dict]) -> Dict[str, List[MovieRecord]]:
+    """Fetches themed Hindi and English movies plus now-playing ones from TMDB, split into pools."""
+    tasks = []
+    if theme:
+        random_page = random.randint(1, 5)
+        for lang in ["en", "hi"]:
+            tasks.append(get_movies_async(client, lang, random_page, genres=theme["genres"]))
+            tasks.append(get_movies_async(client, lang, random_page, keywords=theme["keywords"]))
+    tasks.append(get_latest_movies_async(client))
+
+    all_results = await asyncio.gather(*tasks)
+
+    all_suggestions = [movie for result in all_results if result.get("data") for movie in result["data"]]
+    latest_movies = [m for r in all_results if r.get("type") == "latest" for m in r.get("data", [])]
+    unique_suggestions = list({movie.id: movie for movie in all_suggestions}.values())
+    latest_ids = {m.id for m in latest_movies}
+
+    return {
+        "hi": [m for m in unique_suggestions if m.original_language == "hi"],
+        "en": [m for m in unique_suggestions if m.original_language == "en"],
+        "latest": [m for m in unique_suggestions if m.id in latest_ids],
+    }
+
+@router.get("/time-based-suggestions", response_model=movie_schema.TimeBasedSuggestions)
 async def time_based_suggestions(request: Request, user_timezone: str = "Asia/Kolkata"):
-    client: httpx.AsyncClient = request.app.state.httpx_client
+    client: UpstreamClient = request.app.state.upstream
     if not settings.TMDB_API_KEY:
         raise HTTPException(status_code=500, detail="TMDB_API_KEY not configured.")
 
+    # Imported here rather than at module load, which happens on every cold start.
+    import pytz
+
     try:
         tz = pytz.timezone(user_timezone)
         current_hour = datetime.now(tz).hour
@@ -92,65 +140,60 @@ async def time_based_suggestions(request: Request, user_timezone: str = "Asia/Ko
     }
 
     greeting = "Here are some great picks for you!"
-    tasks = []
-    
+    theme = None
     for slot, info in time_theme_map.items():
         if current_hour in info["hours"]:
             greeting = random.choice(time_greetings.get(slot, [greeting]))
-            random_page = random.randint(1, 5)
-            for lang in ["en", "hi"]:
-                tasks.append(get_movies_async(client, lang, random_page, genres=info["genres"]))
-                tasks.append(get_movies_async(client, lang, random_page, keywords=info["keywords"]))
-            tasks.append(get_latest_movies_async(client))
+            theme = info
             break
-    
-    if not tasks:
-        tasks.append(get_latest_movies_async(client))
 
-    all_results = await asyncio.gather(*tasks)
-    
-    all_suggestions = [movie for result in all_results if result.get("data") for movie in result["data"]]
-    latest_movies = [m for r in all_results if r.get("type") == "latest" for m in r.get("data", [])]
-    unique_suggestions = list({movie['id']: movie for movie in all_suggestions}.values())
-    latest_ids = {m['id'] for m in latest_movies}
-    
-    hindi_pool = [m for m in unique_suggestions if m.get("original_language") == "hi"]
-    english_pool = [m for m in unique_suggestions if m.get("original_language") == "en"]
-    latest_pool = [m for m in unique_suggestions if m.get("id") in latest_ids]
-    
+    movie_catalog = catalog.get_catalog()
+    if movie_catalog is not None:
+        genre_ids = [int(genre_id) for genre_id in theme["genres"].split("|")] if theme else None
+        hindi_pool = movie_catalog.sample(CATALOG_POOL_SIZE, genre_ids=genre_ids, language="hi", min_votes=100)
+        english_pool = movie_catalog.sample(CATALOG_POOL_SIZE, genre_ids=genre_ids, language="en", min_votes=100)
+        latest_pool = movie_catalog.sample(CATALOG_POOL_SIZE, released_within_days=LATEST_RELEASE_WINDOW_DAYS)
+    else:
+        pools = await theme_pools_cache.get(
+            theme["genres"] if theme else None,
+            lambda: fetch_theme_pools(client, theme),
+            is_valid=lambda pools: any(pools.values()),
+        )
+        # Copies, since the pools are shuffled below and the cached lists are shared.
+        hindi_pool, english_pool, latest_pool = list(pools["hi"]), list(pools["en"]), list(pools["latest"])
+
     final_suggestions = []
     seen_ids = set()
 
     random.shuffle(latest_pool)
     for movie in latest_pool:
-        if len(final_suggestions) < 3 and movie['id'] not in seen_ids:
+        if len(final_suggestions) < 3 and movie.id not in seen_ids:
             final_suggestions.append(movie)
-            seen_ids.add(movie['id'])
+            seen_ids.add(movie.id)
     
     random.shuffle(hindi_pool)
     for movie in hindi_pool:
-        if len(final_suggestions) < 9 and movie['id'] not in seen_ids:
+        if len(final_suggestions) < 9 and movie.id not in seen_ids:
             final_suggestions.append(movie)
-            seen_ids.add(movie['id'])
+            seen_ids.add(movie.id)
     
     random.shuffle(english_pool)
     for movie in english_pool:
-        if len(final_suggestions) < 15 and movie['id'] not in seen_ids:
+        if len(final_suggestions) < 15 and movie.id not in seen_ids:
             final_suggestions.append(movie)
-            seen_ids.add(movie['id'])
+            seen_ids.add(movie.id)
     
     random.shuffle(final_suggestions)
 
     formatted_suggestions = [
         {
-            "title": movie.get("title"), "overview": movie.get("overview"), "release_date": movie.get("release_date"),
-            "language": movie.get("original_language"), "vote_average": movie.get("vote_average"),
-            "poster_path": f"https://image.tmdb.org/t/p/w500{movie.get('poster_path')}" if movie.get('poster_path') else None
+            "title": movie.title, "overview": movie.overview, "release_date": movie.release_date,
+            "language": movie.original_language, "vote_average": movie.vote_average, "poster_path": movie.poster_url
         }
         for movie in final_suggestions
     ]
 
-    return {
+    return ORJSONResponse({
         "timezone_used": user_timezone, "current_hour_in_timezone": current_hour,
         "greeting": greeting, "suggestions": formatted_suggestions
-    }
\ No newline at end of file
+    })
\ No newline at end of file
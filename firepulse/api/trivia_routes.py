@@ -1,7 +1,6 @@
-from fastapi import APIRouter, HTTPException, Body, Request, Depends, status
+import logging
+from fastapi import APIRouter, HTTPException, Body, Request, Depends, Query, status
 from sqlalchemy.orm import Session
-import httpx
-import json
 import random
 
 from ..core.config import settings
@@ -10,7 +9,11 @@ from ..api.auth_routes import get_current_user
 from ..models.user import User as UserModel
 from ..crud import trivia as trivia_crud
 from ..schemas import trivia as trivia_schema
-from ..services import gamification 
+from ..services import gamification, leaderboard, trivia_bot
+from ..services.trivia_pool import TriviaQuestionPool, TRIVIA_POOL_BATCH_SIZE
+from ..services.upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -21,42 +24,6 @@ def get_db():
     finally:
         db.close()
 
-GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent"
-
-async def generate_trivia_question_from_gemini(client: httpx.AsyncClient, topic: str) -> dict | None:
-    if not settings.GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Gemini API key not configured.")
-
-    prompt = f'''
-    Generate a unique and factually accurate trivia question about the topic: "{topic}".
-    The question should be multiple-choice. Before generating, double-check the factual accuracy of the question and the correct answer.
-    Provide your response STRICTLY in JSON format with the following structure:
-    {{
-      "question_text": "The trivia question text?",
-      "answers": [
-        {{"text": "An incorrect answer", "is_correct": false}},
-        {{"text": "The single correct answer", "is_correct": true}},
-        {{"text": "Another incorrect answer", "is_correct": false}},
-        {{"text": "A third incorrect answer", "is_correct": false}}
-      ]
-    }}
-    Ensure exactly one answer has "is_correct": true. Ensure there are exactly four distinct options. Do not repeat answers.'''
-    
-    api_url_with_key = f"{GEMINI_API_BASE_URL}?key={settings.GEMINI_API_KEY}"
-    payload = {"contents": [{"parts": [{"text": prompt}]}], "generationConfig": {"responseMimeType": "application/json"}}
-    try:
-        response = await client.post(api_url_with_key, json=payload)
-        response.raise_for_status()
-        result_json = response.json()
-        if not result_json.get("candidates"):
-            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Invalid response structure from Gemini API.")
-        trivia_data_str = result_json["candidates"][0]["content"]["parts"][0]["text"]
-        return json.loads(trivia_data_str)
-    except Exception as e:
-        print(f"An unexpected error occurred during trivia generation: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Trivia generation failed: {e}")
-
-
 @router.post("/trivia/start", response_model=trivia_schema.TriviaQuestion, tags=["Trivia"])
 async def start_trivia_game(
     request: Request,
@@ -64,16 +31,23 @@ async def start_trivia_game(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
+    pool: TriviaQuestionPool = request.app.state.trivia_pool
+    pool.record_demand(topic)
     db_question = trivia_crud.get_unanswered_question(db, category=topic, user_id=current_user.id)
 
     if not db_question:
-        print("No unanswered questions in DB, generating new one from Gemini...")
-        client: httpx.AsyncClient = request.app.state.httpx_client
-        generated_question_data = await generate_trivia_question_from_gemini(client, topic)
-        if not generated_question_data:
+        if not settings.GEMINI_API_KEY:
+            raise HTTPException(status_code=500, detail="Gemini API key not configured.")
+        logger.info("No unanswered questions in DB, generating a batch from Gemini...", extra={"topic": topic})
+        client: UpstreamClient = request.app.state.upstream
+        generated_questions = await trivia_bot.generate_trivia_questions(client, topic, count=TRIVIA_POOL_BATCH_SIZE)
+        if not generated_questions:
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Failed to generate trivia question.")
 
-        db_question = trivia_crud.create_trivia_question(db, question_data=generated_question_data, category=topic)
+        trivia_crud.bulk_create_trivia_questions(db, generated_questions, category=topic)
+        db_question = trivia_crud.get_unanswered_question(db, category=topic, user_id=current_user.id)
+
+    pool.request_refill(topic, user_id=current_user.id)
 
     if not db_question:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not retrieve or create a trivia question.")
@@ -101,32 +75,23 @@ def submit_trivia_answer(submission: trivia_schema.AnswerSubmission, db: Session
 
     is_correct = (submission.selected_answer_text.lower() == question.correct_answer.lower())
     
-    trivia_crud.record_user_answer(db, user_id=current_user.id, question_id=question.id, was_correct=is_correct)
+    stats = trivia_crud.record_user_answer(db, user_id=current_user.id, question=question, was_correct=is_correct)
     
     points_awarded = 0
     message = ""
     new_badges = []
 
     if is_correct:
-        points_awarded = 10
-        
-        user_to_update = db.query(UserModel).filter(UserModel.id == current_user.id).first()
-        if user_to_update: 
-            user_to_update.total_points = (user_to_update.total_points or 0) + points_awarded
-            db.commit()
-            db.refresh(user_to_update) 
-            
-            current_user.total_points = user_to_update.total_points
-            current_user.badges = user_to_update.badges 
-       
+        points_awarded = trivia_crud.POINTS_PER_CORRECT_ANSWER
+        current_user.total_points = stats["total_points"]
+        leaderboard.record_correct_answer(current_user.id, question.category, stats["correct_total"])
 
         message = f"Correct! You earned {points_awarded} points."
         
         
-        new_badges = gamification.check_and_award_badges(db, user=user_to_update) 
+        new_badges = gamification.check_and_award_badges(db, user=current_user, stats=stats)
         if new_badges:
-            badge_names = [badge.name for badge in new_badges]
-            message += f" You've earned new badges: {', '.join(badge_names)}!"
+            message += f" You've earned new badges: {', '.join(new_badges)}!"
     else:
         message = f"Wrong. The correct answer was: '{question.correct_answer}'."
 
@@ -139,3 +104,21 @@ def get_user_trivia_score(
     current_user: UserModel = Depends(get_current_user)
 ):
     return {"total_score": current_user.total_points}
+
+
+@router.get("/trivia/leaderboard", response_model=trivia_schema.Leaderboard, tags=["Trivia"])
+def get_trivia_leaderboard(
+    category: str | None = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Returns the top players overall, or within one trivia category, plus the current user's rank."""
+    board = leaderboard.get_leaderboard(db, category)
+    return trivia_schema.Leaderboard(
+        category=category,
+        entries=board.top(limit),
+        your_rank=board.rank(current_user.id),
+        your_score=board.score(current_user.id),
+        total_players=len(board),
+    )
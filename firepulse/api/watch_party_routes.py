@@ -1,9 +1,10 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.orm import Session
-import httpx
+from ..core.metrics import WS_MESSAGES
 from ..services.connection_manager import manager
 from ..services import group_recs
 from ..core.db import SessionLocal
+from ..services.upstream import UpstreamClient
 
 router = APIRouter()
 
@@ -24,11 +25,12 @@ async def websocket_endpoint(websocket: WebSocket, party_id: str, user_id: str,
     await manager.connect(websocket, party_id, user_id)
     await manager.broadcast(f"User '{user_id}' has joined the party.", party_id)
 
-    client: httpx.AsyncClient = websocket.app.state.httpx_client
+    client: UpstreamClient = websocket.app.state.upstream
 
     try:
         while True:
             data = await websocket.receive_text()
+            WS_MESSAGES.labels("received").inc()
 
             
             if data == "suggest_movie":
@@ -2,11 +2,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from .config import settings
+from . import tracing
+from .metrics import instrument_engine
 
 
 engine = create_engine(
     str(settings.DATABASE_URL)
 )
+instrument_engine(engine)
+tracing.instrument_engine(engine)
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,68 @@
+"""
+Logging for the API: one JSON object per line on stdout (FIREPULSE_LOG_FORMAT=text for plain lines).
+
+Records are formatted where they are logged and written by a background thread (QueueHandler/QueueListener),
+so a slow stdout or log shipper never blocks the event loop. Fields passed with extra={...} become JSON keys.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+import orjson
+
+LOG_LEVEL = os.getenv("FIREPULSE_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("FIREPULSE_LOG_FORMAT", "json")
+# Lambda freezes the process as soon as a response is returned, so queued lines would only be written during
+# the next invocation; log synchronously there.
+LOG_ASYNC = os.getenv("FIREPULSE_LOG_ASYNC", "0" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "1") != "0"
+# Libraries that log every request at INFO.
+QUIET_LOGGERS = ["httpx", "httpcore", "hpack"]
+
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+def configure_logging():
+    """Installs the root handler; calling it again does nothing."""
+    global _listener
+    root = logging.getLogger()
+    if any(getattr(handler, "firepulse", False) for handler in root.handlers):
+        return
+
+    formatter = JSONFormatter() if LOG_FORMAT == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    stream = logging.StreamHandler(sys.stdout)
+    if LOG_ASYNC:
+        # QueueHandler formats the record before queueing it, so the listener thread only writes finished lines.
+        handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, stream)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        handler = stream
+    handler.setFormatter(formatter)
+    handler.firepulse = True
+
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
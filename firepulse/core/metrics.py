@@ -0,0 +1,135 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Values are per process: with several workers each one is scraped (or aggregated) separately, and on Lambda
+they only cover the current container.
+"""
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# No *_created series: they double the output and nothing here reads them.
+disable_created_metrics()
+
+# Seconds: cache-served responses take a few ms, cold upstream chains and Gemini generation several seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "firepulse_http_request_duration_seconds", "HTTP requests by route template.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "firepulse_upstream_request_duration_seconds", "Single attempts of upstream API calls; status is the HTTP status or the error type.",
+    ["host", "endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "firepulse_upstream_errors_total", "Failed upstream attempts: 429/5xx responses, transport errors, open circuits and rate limit timeouts.",
+    ["host", "endpoint", "reason"],
+)
+CACHE_LOOKUPS = Counter(
+    "firepulse_cache_lookups_total", "Cache lookups by outcome (fresh/hit, stale, shared_hit, miss, stale_on_error).",
+    ["cache", "result"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "firepulse_db_query_duration_seconds", "Database statements by operation.",
+    ["operation"], buckets=DB_QUERY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "firepulse_db_queries_per_request", "Database statements run while serving one HTTP request.",
+    ["route"], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "firepulse_db_seconds_per_request", "Time spent in database statements while serving one HTTP request.",
+    ["route"], buckets=LATENCY_BUCKETS,
+)
+NLP_INFERENCE_SECONDS = Histogram(
+    "firepulse_nlp_inference_duration_seconds", "Emotion model inference per query.",
+    ["model"], buckets=LATENCY_BUCKETS,
+)
+NLP_MODEL_LOAD_SECONDS = Gauge("firepulse_nlp_model_load_seconds", "How long loading the emotion model took.", ["model"])
+WS_CONNECTIONS = Gauge("firepulse_ws_connections", "Open watch party WebSocket connections.")
+WS_PARTIES = Gauge("firepulse_ws_parties", "Watch parties with at least one open connection.")
+WS_MESSAGES = Counter("firepulse_ws_messages_total", "Watch party messages received from and sent to members.", ["direction"])
+WS_BROADCAST_SECONDS = Histogram(
+    "firepulse_ws_broadcast_duration_seconds", "Time to send one message to every member of a party.", buckets=LATENCY_BUCKETS,
+)
+
+# [statements, seconds] for the HTTP request being served; sync routes run in a thread that inherits it.
+_request_db: ContextVar[Optional[List]] = ContextVar("firepulse_request_db", default=None)
+
+
+def render():
+    """The /metrics response body and content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def _operation(statement: str) -> str:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return operation if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine: Engine):
+    """Times every statement on the engine and adds it to the current request's totals."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("firepulse_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["firepulse_query_started"].pop()
+        DB_QUERY_SECONDS.labels(_operation(statement)).observe(elapsed)
+        usage = _request_db.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute.
+        started = context.connection.info.get("firepulse_query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class MetricsMiddleware:
+    """
+    Records each HTTP request's latency under its route template (e.g. /api/v1/history, not the raw path, so
+    label values stay bounded) with the database statements it ran.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        usage = [0, 0.0]
+        token = _request_db.set(usage)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            # The router stores the matched route in the scope; unmatched paths (404s, scanners) share one label.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(usage[0])
+            DB_SECONDS_PER_REQUEST.labels(route).observe(usage[1])
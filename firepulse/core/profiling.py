@@ -0,0 +1,297 @@
+"""
+A sampling profiler for live workers, served to admins by api/admin_routes.py.
+
+A Sampler thread records the Python stack of every other thread in the process at a fixed interval, so it sees
+the event loop, the thread pool running extract_mood and the AnyIO threads serving sync routes alike, without
+tracing each call. Samples are aggregated into collapsed stacks ("thread;outer;...;inner count", the format
+flamegraph.pl and speedscope read) and saved under PROFILE_DIR as JSON artifacts.
+
+Profiles come from two places:
+  - on demand: record_profile() samples for a few seconds (POST /api/v1/admin/profiles)
+  - slow requests: with FIREPULSE_PROFILE_SLOW_MS set, a low-rate sampler runs continuously into a ring buffer
+    and SlowRequestProfiler saves the samples covering any request slower than that
+
+Samples cover the whole worker, not only the slow request: they show what kept the event loop busy meanwhile.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("FIREPULSE_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "firepulse-profiles"))
+# Older profiles are deleted once there are more than this many.
+MAX_PROFILES = int(os.getenv("FIREPULSE_PROFILE_MAX_FILES", "50"))
+MAX_PROFILE_SECONDS = 60
+DEFAULT_INTERVAL_MS = 5.0
+MIN_INTERVAL_MS = 1.0
+
+# Slow-request capture, off unless a threshold is set. The continuous sampler runs at a lower rate and keeps
+# the last SLOW_WINDOW_SECONDS of samples; one profile per route per cooldown is saved during a spike.
+SLOW_REQUEST_MS = float(os.getenv("FIREPULSE_PROFILE_SLOW_MS", "0"))
+SLOW_INTERVAL_MS = float(os.getenv("FIREPULSE_PROFILE_SLOW_INTERVAL_MS", "10"))
+SLOW_WINDOW_SECONDS = 30
+SLOW_COOLDOWN_SECONDS = 60
+# Long by design (on-demand profiling waits out its run), so never captured as slow.
+SLOW_EXCLUDED_ROUTE_PREFIX = "/api/v1/admin/"
+
+TOP_FUNCTIONS = 30
+# Innermost frames of threads that are waiting rather than working; samples ending in them are dropped.
+IDLE_FRAMES = {
+    ("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"),
+    ("thread.py", "_worker"), ("handlers.py", "dequeue"),
+}
+
+Stack = Tuple[str, ...]
+
+_labels: Dict[object, str] = {}
+_slow_sampler: Optional["Sampler"] = None
+_last_slow_capture: Dict[str, float] = {}
+_on_demand_lock = threading.Lock()
+
+
+def _label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        marker = filename.rfind("site-packages" + os.sep)
+        if marker >= 0:
+            filename = filename[marker + len("site-packages" + os.sep):]
+        else:
+            marker = filename.rfind(os.sep + "firepulse" + os.sep)
+            filename = filename[marker + 1:] if marker >= 0 else os.path.basename(filename)
+        label = _labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+    return label
+
+
+def _is_idle(code) -> bool:
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class Sampler:
+    """Samples every other thread's stack each interval on a daemon thread, keeping at most max_samples."""
+
+    def __init__(self, interval: float, max_samples: Optional[int] = None):
+        self.interval = interval
+        self.samples: Deque[Tuple[float, List[Stack]]] = deque(maxlen=max_samples)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="firepulse-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own or _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stacks.append(tuple(reversed(stack)))
+            self.samples.append((time.time(), stacks))
+
+    def window(self, start: float, end: float) -> List[Tuple[float, List[Stack]]]:
+        return [sample for sample in list(self.samples) if start <= sample[0] <= end]
+
+
+def summarize(samples: List[Tuple[float, List[Stack]]]) -> Dict:
+    """
+    Collapsed stacks and the functions with the most samples, innermost (self) and anywhere on the stack.
+    idle_samples counts samples where every thread was waiting, e.g. the event loop on upstream responses.
+    """
+    stacks: Counter = Counter()
+    own: Counter = Counter()
+    total: Counter = Counter()
+    idle = 0
+    for _, thread_stacks in samples:
+        idle += not thread_stacks
+        for stack in thread_stacks:
+            stacks[";".join(stack)] += 1
+            own[stack[-1]] += 1
+            total.update(set(stack[1:]))
+    top = [{"function": name, "self": count, "total": total[name]} for name, count in own.most_common(TOP_FUNCTIONS)]
+    return {"samples": len(samples), "idle_samples": idle, "top": top, "stacks": dict(stacks.most_common())}
+
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.json")
+
+
+def save_profile(kind: str, samples: List[Tuple[float, List[Stack]]], started: float, duration: float, interval: float, **details) -> Dict:
+    """Writes a profile artifact and returns its metadata (everything but the stacks)."""
+    profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{kind}-{uuid.uuid4().hex[:8]}"
+    profile = {
+        "id": profile_id,
+        "kind": kind,
+        "started_at": datetime.fromtimestamp(started, timezone.utc).isoformat(timespec="milliseconds"),
+        "duration_ms": round(duration * 1000, 1),
+        "interval_ms": interval * 1000,
+        "pid": os.getpid(),
+        **details,
+        **summarize(samples),
+    }
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tmp_path = f"{_profile_path(profile_id)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, _profile_path(profile_id))
+    _prune()
+    return {key: value for key, value in profile.items() if key != "stacks"}
+
+
+def _prune():
+    # Ids start with their UTC timestamp, so name order is age order.
+    paths = sorted(entry.path for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json"))
+    for path in paths[:-MAX_PROFILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[Dict]:
+    """Metadata of the stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path) as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profile.pop("stacks", None)
+        profile.pop("top", None)
+        profiles.append(profile)
+    return sorted(profiles, key=lambda profile: profile["started_at"], reverse=True)
+
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    """A stored profile by id, or None. Ids are checked so they cannot name a path outside PROFILE_DIR."""
+    if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+        return None
+    try:
+        with open(_profile_path(profile_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def collapsed(profile: Dict) -> str:
+    """The profile's stacks as flamegraph.pl / speedscope input."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+async def record_profile(seconds: float, interval_ms: float = DEFAULT_INTERVAL_MS) -> Dict:
+    """Samples the whole process for `seconds` and saves the profile; one on-demand run at a time."""
+    if not _on_demand_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being recorded.")
+    try:
+        interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+        sampler = Sampler(interval)
+        started = time.time()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+        duration = time.time() - started
+        return await asyncio.to_thread(save_profile, "on_demand", list(sampler.samples), started, duration, interval)
+    finally:
+        _on_demand_lock.release()
+
+
+def start_slow_request_sampler():
+    """Starts the continuous sampler when FIREPULSE_PROFILE_SLOW_MS is set; calling it again does nothing."""
+    global _slow_sampler
+    if SLOW_REQUEST_MS <= 0 or _slow_sampler is not None:
+        return
+    interval = max(SLOW_INTERVAL_MS, MIN_INTERVAL_MS) / 1000
+    _slow_sampler = Sampler(interval, max_samples=int(SLOW_WINDOW_SECONDS / interval))
+    _slow_sampler.start()
+    logger.info("Profiling requests slower than %.0f ms into %s.", SLOW_REQUEST_MS, PROFILE_DIR)
+
+
+def stop_slow_request_sampler():
+    global _slow_sampler
+    if _slow_sampler is not None:
+        _slow_sampler.stop()
+        _slow_sampler = None
+
+
+def _save_slow_request(samples, started: float, duration: float, interval: float, details: Dict, trace_id: Optional[str]):
+    try:
+        profile = save_profile("slow_request", samples, started, duration, interval, request=details, trace_id=trace_id)
+        logger.warning(
+            "Slow request %s %s took %.0f ms; profile %s saved.", details["method"], details["route"], duration * 1000, profile["id"],
+            extra={"profile_id": profile["id"], "route": details["route"]},
+        )
+    except OSError as e:
+        logger.error("Could not save slow request profile: %s", e)
+
+
+class SlowRequestProfiler:
+    """Saves the sampler's window for HTTP requests slower than FIREPULSE_PROFILE_SLOW_MS, once per route per cooldown."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _slow_sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.time()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finished = time.time()
+            duration = finished - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if (
+                duration * 1000 >= SLOW_REQUEST_MS and not route.startswith(SLOW_EXCLUDED_ROUTE_PREFIX)
+                and finished - _last_slow_capture.get(route, 0) >= SLOW_COOLDOWN_SECONDS
+            ):
+                _last_slow_capture[route] = finished
+                sampler = _slow_sampler
+                details = {"method": scope["method"], "route": route, "path": scope["path"], "status": status}
+                # Written off the event loop, after the response has been sent.
+                asyncio.get_running_loop().run_in_executor(
+                    None, _save_slow_request, sampler.window(started, finished), started, duration, sampler.interval, details,
+                    tracing.current_trace_id(),
+                )
@@ -0,0 +1,196 @@
+"""
+OpenTelemetry tracing, off unless FIREPULSE_TRACING names an exporter:
+  console            - spans as JSON on stdout
+  file:/path.jsonl   - one JSON span per line, for benchmarks/trace_report.py or a collector's file receiver
+  otlp               - OTLP over HTTP (needs opentelemetry-exporter-otlp-proto-http; OTEL_EXPORTER_OTLP_* configure it)
+
+Each HTTP request gets a server span (TracingMiddleware), with children for upstream calls (UpstreamClient),
+database statements (instrument_engine) and functions decorated with @traced, such as extract_mood and
+text_to_speech. Sampling follows the standard OTEL_TRACES_SAMPLER / OTEL_TRACES_SAMPLER_ARG variables.
+
+The SDK is only imported when tracing is on, so it costs nothing at cold start otherwise.
+"""
+import functools
+import inspect
+import logging
+import os
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("FIREPULSE_TRACING", "")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "firepulse")
+# Statements longer than this are cut in the db.statement attribute.
+MAX_STATEMENT_LENGTH = 1000
+
+_tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def _create_exporter(spec: str):
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if spec == "console":
+        return ConsoleSpanExporter()
+    if spec.startswith("file:"):
+        out = open(spec[len("file:"):], "a", buffering=1)
+        return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if spec == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    raise ValueError(f"unknown exporter {spec!r}")
+
+
+def configure_tracing():
+    """Installs the tracer provider for FIREPULSE_TRACING; calling it again does nothing."""
+    global _tracer
+    if _tracer is not None or not TRACING_EXPORTER:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(_create_exporter(TRACING_EXPORTER)))
+        trace.set_tracer_provider(provider)
+    except Exception as e:
+        logger.error("Tracing disabled, could not set up %r: %s", TRACING_EXPORTER, e)
+        return
+    _tracer = trace.get_tracer("firepulse")
+    logger.info("Tracing enabled, exporting to %s.", TRACING_EXPORTER)
+
+
+def span(name: str, **attributes):
+    """A child span of the current one, as a context manager yielding it (or None while tracing is off)."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes={key: value for key, value in attributes.items() if value is not None})
+
+
+def set_attributes(**attributes):
+    """Sets attributes on the current span, if any."""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+def current_trace_id() -> Optional[str]:
+    """The current trace's id as 32 hex digits, for linking logs and profiles to it."""
+    if _tracer is None:
+        return None
+    from opentelemetry import trace
+
+    context = trace.get_current_span().get_span_context()
+    return format(context.trace_id, "032x") if context.is_valid else None
+
+
+def traced(name: str) -> Callable:
+    """Runs each call of the decorated function (sync or async) in a span with this name."""
+
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def instrument_engine(engine: Engine):
+    """A span per statement on the engine, parented to the request or task that ran it."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _tracer is None:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        db_span = _tracer.start_span(
+            f"db {operation}",
+            attributes={"db.system": engine.dialect.name, "db.statement": statement[:MAX_STATEMENT_LENGTH], "db.executemany": executemany},
+        )
+        conn.info.setdefault("firepulse_spans", []).append(db_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("firepulse_spans")
+        if spans:
+            db_span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                db_span.set_attribute("db.rowcount", cursor.rowcount)
+            db_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        spans = context.connection.info.get("firepulse_spans") if context.connection is not None else None
+        if spans:
+            from opentelemetry.trace import Status, StatusCode
+
+            db_span = spans.pop()
+            db_span.record_exception(context.original_exception)
+            db_span.set_status(Status(StatusCode.ERROR, type(context.original_exception).__name__))
+            db_span.end()
+
+
+class TracingMiddleware:
+    """
+    A server span per HTTP request, continuing the caller's trace when it sends a traceparent header.
+    The span is named after the route template once routing has happened, e.g. "POST /api/v1/movies".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        from opentelemetry import propagate
+        from opentelemetry.trace import SpanKind, Status, StatusCode
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}", context=propagate.extract(headers), kind=SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as server_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    server_span.update_name(f"{scope['method']} {route}")
+                    server_span.set_attribute("http.route", route)
+                server_span.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    server_span.set_status(Status(StatusCode.ERROR))
@@ -1,10 +1,15 @@
 from sqlalchemy.orm import Session
-from ..models.trivia import Badge
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models.trivia import Badge, user_badge_association
 
 def get_badge_by_name(db: Session, name: str):
     """Fetches a badge by its name."""
     return db.query(Badge).filter(Badge.name == name).first()
 
+def get_all_badges(db: Session) -> list[tuple[int, str]]:
+    """Returns (id, name) for every badge in the catalog."""
+    return [tuple(row) for row in db.query(Badge.id, Badge.name).all()]
+
 def create_badge(db: Session, name: str, description: str):
     """Creates a new badge if it doesn't already exist."""
     db_badge = get_badge_by_name(db, name=name)
@@ -14,3 +19,18 @@ def create_badge(db: Session, name: str, description: str):
         db.commit()
         db.refresh(db_badge)
     return db_badge
+
+def award_badges(db: Session, user_id: int, badge_ids: list[int]) -> set[int]:
+    """
+    Links several badges to a user with a single multi-row insert and returns the ids actually added.
+    Badges the user already holds (e.g. awarded by a concurrent request) are skipped. The caller commits.
+    """
+    if not badge_ids:
+        return set()
+    stmt = (
+        pg_insert(user_badge_association)
+        .values([{"user_id": user_id, "badge_id": badge_id} for badge_id in badge_ids])
+        .on_conflict_do_nothing(index_elements=["user_id", "badge_id"])
+        .returning(user_badge_association.c.badge_id)
+    )
+    return set(db.execute(stmt).scalars())
@@ -1,33 +1,121 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
-from ..models.history import MovieHistory 
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models.history import MovieHistory, UserTasteProfile
 
-def get_user_movie_history(db: Session, user_id: int):
-    """Fetches the movie watch history for a specific user."""
-    return db.query(MovieHistory).filter(MovieHistory.user_id == user_id).order_by(MovieHistory.watched_at.desc()).all()
+_HISTORY_COLUMNS = (
+    MovieHistory.id,
+    MovieHistory.movie_title,
+    MovieHistory.tmdb_id,
+    MovieHistory.genres,
+    MovieHistory.watched_at,
+)
+
+def get_user_movie_history_page(db: Session, user_id: int, limit: int = 20, before: Optional[tuple[datetime, int]] = None):
+    """
+    Fetches one page of a user's history, newest first, as lightweight rows rather than ORM objects.
+    `before` is the (watched_at, id) of the last row of the previous page (keyset pagination),
+    so every page is a bounded scan of the (user_id, watched_at) index.
+    """
+    stmt = select(*_HISTORY_COLUMNS).where(MovieHistory.user_id == user_id)
+    if before is not None:
+        stmt = stmt.where(tuple_(MovieHistory.watched_at, MovieHistory.id) < tuple_(*before))
+    stmt = stmt.order_by(MovieHistory.watched_at.desc(), MovieHistory.id.desc()).limit(limit)
+    return db.execute(stmt).all()
+
+def get_latest_movie_history(db: Session, user_id: int, limit: int = 1):
+    """Fetches the user's `limit` most recently watched movies, newest first."""
+    return get_user_movie_history_page(db, user_id=user_id, limit=limit)
+
+def get_watched_tmdb_ids(db: Session, user_ids: list[int]) -> tuple[int, ...]:
+    """Returns the TMDB ids watched by any of the given users, without building ORM objects."""
+    if not user_ids:
+        return ()
+    stmt = select(MovieHistory.tmdb_id).where(MovieHistory.user_id.in_(user_ids)).distinct()
+    return tuple(db.execute(stmt).scalars())
+
+def get_recent_watch_lists(db: Session, per_user: int = 30) -> list[list]:
+    """
+    Returns each user's `per_user` most recently watched movies as one list of
+    (tmdb_id, movie_title, genres) rows per user, for building co-watch edges.
+    """
+    recency = func.row_number().over(
+        partition_by=MovieHistory.user_id,
+        order_by=(MovieHistory.watched_at.desc(), MovieHistory.id.desc())
+    ).label("recency")
+    recent = select(MovieHistory.user_id, MovieHistory.tmdb_id, MovieHistory.movie_title, MovieHistory.genres, recency).subquery()
+    stmt = select(recent.c.user_id, recent.c.tmdb_id, recent.c.movie_title, recent.c.genres).where(recent.c.recency <= per_user).order_by(recent.c.user_id)
+
+    watch_lists: list[list] = []
+    current_user_id = None
+    for user_id, tmdb_id, movie_title, genres in db.execute(stmt):
+        if user_id != current_user_id:
+            watch_lists.append([])
+            current_user_id = user_id
+        watch_lists[-1].append((tmdb_id, movie_title, genres))
+    return watch_lists
+
+def _upsert_history_statement(rows: list[dict]):
+    """INSERT ... ON CONFLICT (user_id, tmdb_id) DO UPDATE that refreshes watched_at and the stored title/genres."""
+    stmt = pg_insert(MovieHistory).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[MovieHistory.user_id, MovieHistory.tmdb_id],
+        set_={
+            "watched_at": func.now(),
+            "movie_title": stmt.excluded.movie_title,
+            "genres": stmt.excluded.genres,
+        }
+    )
 
 def add_movie_to_history(db: Session, user_id: int, movie_details: dict):
     """
     Adds a new movie to a user's watch history.
     If the movie already exists, it updates the watched_at timestamp.
     """
-    existing_entry = db.query(MovieHistory).filter_by(user_id=user_id, tmdb_id=movie_details['id']).first()
-
-    if existing_entry:
-        
-        existing_entry.watched_at = func.now()
-        db.commit()
-        db.refresh(existing_entry)
-        return existing_entry
-
-    
-    db_history_item = MovieHistory(
-        user_id=user_id, 
-        movie_title=movie_details['title'],
-        tmdb_id=movie_details['id'],
-        genres=movie_details['genres']
-    )
-    db.add(db_history_item)
+    stmt = _upsert_history_statement([{
+        "user_id": user_id,
+        "movie_title": movie_details['title'],
+        "tmdb_id": movie_details['id'],
+        "genres": movie_details['genres']
+    }]).returning(MovieHistory)
+    db_history_item = db.scalars(stmt).one()
     db.commit()
-    db.refresh(db_history_item)
     return db_history_item
+
+def bulk_add_movies_to_history(db: Session, user_id: int, movies: list[dict]) -> int:
+    """
+    Adds many movies to a user's watch history with a single multi-row upsert.
+    Movies already in the history get their watched_at refreshed. Returns the number of distinct movies written.
+    """
+    movies_by_id = {movie['id']: movie for movie in movies}
+    if not movies_by_id:
+        return 0
+
+    db.execute(_upsert_history_statement([
+        {"user_id": user_id, "movie_title": movie['title'], "tmdb_id": tmdb_id, "genres": movie['genres']}
+        for tmdb_id, movie in movies_by_id.items()
+    ]))
+    db.commit()
+    return len(movies_by_id)
+
+def get_taste_profile(db: Session, user_id: int, for_update: bool = False):
+    """
+    Fetches a user's taste profile row, or None if it has not been built yet.
+    With for_update the row stays locked until the next commit, for read-modify-write updates.
+    """
+    query = db.query(UserTasteProfile).filter_by(user_id=user_id)
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+def save_taste_profile(db: Session, user_id: int, weights, updated_at: datetime):
+    """Creates or replaces a user's taste profile."""
+    stmt = pg_insert(UserTasteProfile).values(user_id=user_id, weights=[float(weight) for weight in weights], updated_at=updated_at)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserTasteProfile.user_id],
+        set_={"weights": stmt.excluded.weights, "updated_at": stmt.excluded.updated_at}
+    ))
+    db.commit()
@@ -1,68 +1,214 @@
+import hashlib
+import random
+import unicodedata
+from typing import Iterable
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from ..models.trivia import TriviaQuestion as TriviaQuestionModel, UserAnswer as UserAnswerModel
+from sqlalchemy import func, exists, literal, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models.trivia import (
+    TriviaQuestion as TriviaQuestionModel,
+    UserAnswer as UserAnswerModel,
+    UserStats as UserStatsModel,
+    UserCategoryStats as UserCategoryStatsModel,
+)
+from ..models.user import User as UserModel
 
-def create_trivia_question(db: Session, question_data: dict, category: str):
+POINTS_PER_CORRECT_ANSWER = 10
+
+
+def normalize_category(category: str) -> str:
+    """Lowercases a trivia topic and collapses whitespace so equivalent topics share one key."""
+    return " ".join((category or "").lower().split())
+
+def normalize_question_text(question_text: str) -> str:
     """
-    Saves a new trivia question and all its answers to the database.
+    Case-folds question text and strips punctuation and extra whitespace for duplicate detection.
+    Letters and digits of any script are kept, with their combining marks (Devanagari vowel signs, accents).
+    """
+    text = unicodedata.normalize("NFKC", question_text).casefold()
+    kept = "".join(ch for ch in text if ch.isalnum() or ch.isspace() or unicodedata.category(ch).startswith("M"))
+    return " ".join(kept.split())
+
+def question_hash(question_text: str) -> str:
+    """Returns the md5 hex digest of the normalized question text."""
+    return hashlib.md5(normalize_question_text(question_text).encode("utf-8")).hexdigest()
+
+def build_question_row(question_data: dict, category: str | None = None) -> dict | None:
+    """
+    Converts a question payload into trivia_questions column values, or None if it is unusable.
+    Accepts our Gemini format ({"question_text", "answers": [{"text", "is_correct"}]}) and the
+    Open Trivia DB format ({"question", "correct_answer", "incorrect_answers"}). A "category"
+    key in the payload takes precedence over the `category` argument.
     """
     question_text = question_data.get('question_text') or question_data.get('question')
-    if not question_text:
+    category = question_data.get('category') or category
+    if not question_text or not category:
         return None
 
-    db_question = db.query(TriviaQuestionModel).filter_by(question_text=question_text).first()
-    if db_question:
-        
-        return db_question
+    if 'answers' in question_data:
+        correct_answer_text = ""
+        incorrect_answers = []
+        for answer in question_data['answers']:
+            if answer.get('is_correct'): 
+                correct_answer_text = answer.get('text')
+            else:
+                incorrect_answers.append(answer.get('text'))
+    else:
+        correct_answer_text = question_data.get('correct_answer')
+        incorrect_answers = list(question_data.get('incorrect_answers') or [])
 
-    correct_answer_text = ""
-    incorrect_answers = []
-    for answer in question_data['answers']:
-        if answer.get('is_correct'): 
-            correct_answer_text = answer.get('text')
-        else:
-            incorrect_answers.append(answer.get('text'))
+    if not correct_answer_text:
+        return None
 
     
     while len(incorrect_answers) < 3:
         incorrect_answers.append("Generated incorrect answer") 
 
-    db_question = TriviaQuestionModel(
-        category=category,
-        question_text=question_text,
-        correct_answer=correct_answer_text,
-        incorrect_answer_1=incorrect_answers[0],
-        incorrect_answer_2=incorrect_answers[1],
-        incorrect_answer_3=incorrect_answers[2],
-    )
+    return {
+        "category": category,
+        "category_key": normalize_category(category),
+        "question_text": question_text,
+        "question_hash": question_hash(question_text),
+        "correct_answer": correct_answer_text,
+        "incorrect_answer_1": incorrect_answers[0],
+        "incorrect_answer_2": incorrect_answers[1],
+        "incorrect_answer_3": incorrect_answers[2],
+    }
+
+def create_trivia_question(db: Session, question_data: dict, category: str):
+    """
+    Saves a new trivia question and all its answers to the database.
+    Returns the existing question instead if one with the same normalized text is stored.
+    """
+    row = build_question_row(question_data, category)
+    if not row:
+        return None
+
+    db_question = db.query(TriviaQuestionModel).filter_by(question_hash=row["question_hash"]).first()
+    if db_question:
+        
+        return db_question
+
+    db_question = TriviaQuestionModel(**row)
     db.add(db_question)
     db.commit()
     db.refresh(db_question)
     return db_question
 
+def bulk_create_trivia_questions(db: Session, questions: Iterable[dict], category: str | None = None, chunk_size: int = 500) -> int:
+    """
+    Inserts many questions with one multi-row INSERT ... ON CONFLICT DO NOTHING per chunk.
+    Questions that are malformed or duplicate an existing normalized question are skipped.
+    Returns the number of questions actually inserted.
+    """
+    inserted = 0
+    chunk: dict[str, dict] = {}
+
+    def flush():
+        nonlocal inserted
+        if chunk:
+            stmt = pg_insert(TriviaQuestionModel).values(list(chunk.values())).on_conflict_do_nothing()
+            inserted += db.execute(stmt).rowcount
+            db.commit()
+            chunk.clear()
+
+    for question_data in questions:
+        row = build_question_row(question_data, category)
+        if row:
+            chunk.setdefault(row["question_hash"], row)
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    return inserted
+
 def get_unanswered_question(db: Session, category: str, user_id: int):
-    """Fetches a random trivia question from the database that the user has not yet answered."""
-    answered_question_ids = db.query(UserAnswerModel.question_id).filter_by(user_id=user_id)
-
-    return (
-        db.query(TriviaQuestionModel)
-        .filter(
-            and_(
-                TriviaQuestionModel.category.ilike(f'%{category}%'),
-                TriviaQuestionModel.id.notin_(answered_question_ids) 
-            )
+    """
+    Fetches a random trivia question in the category that the user has not yet answered.
+    Counts the unanswered questions and takes the one at a random offset along the
+    (category_key, id) index, so every question is equally likely however the ids are
+    spread, without sorting every matching row by random().
+    """
+    already_answered = exists().where(
+        UserAnswerModel.user_id == user_id,
+        UserAnswerModel.question_id == TriviaQuestionModel.id
+    )
+    candidates = db.query(TriviaQuestionModel).filter(
+        TriviaQuestionModel.category_key == normalize_category(category),
+        ~already_answered
+    ).order_by(TriviaQuestionModel.id)
+
+    count = candidates.order_by(None).count()
+    if not count:
+        return None
+    # Questions answered or deleted since the count can leave the offset past the end.
+    return candidates.offset(random.randrange(count)).first() or candidates.first()
+
+def count_unanswered_questions(db: Session, category: str, user_id: int | None = None, limit: int = 100) -> int:
+    """
+    Counts questions in a category, optionally only those the user has not answered.
+    Counting stops at `limit`, so this stays cheap for large categories.
+    """
+    query = db.query(TriviaQuestionModel.id).filter(
+        TriviaQuestionModel.category_key == normalize_category(category)
+    )
+    if user_id is not None:
+        query = query.filter(~exists().where(
+            UserAnswerModel.user_id == user_id,
+            UserAnswerModel.question_id == TriviaQuestionModel.id
+        ))
+    return db.query(func.count()).select_from(query.limit(limit).subquery()).scalar()
+
+def record_user_answer(db: Session, user_id: int, question: TriviaQuestionModel, was_correct: bool):
+    """
+    Records a user's answer and updates their running stats and points in a single transaction.
+    Returns the updated stats row (correct_total, current_streak, best_streak, total_points).
+    """
+    correct = 1 if was_correct else 0
+    db.add(UserAnswerModel(user_id=user_id, question_id=question.id, was_correct=was_correct))
+
+    new_streak = UserStatsModel.current_streak + 1 if was_correct else literal(0)
+    stats_stmt = (
+        pg_insert(UserStatsModel)
+        .values(user_id=user_id, answered_total=1, correct_total=correct, current_streak=correct, best_streak=correct)
+        .on_conflict_do_update(
+            index_elements=[UserStatsModel.user_id],
+            set_={
+                "answered_total": UserStatsModel.answered_total + 1,
+                "correct_total": UserStatsModel.correct_total + correct,
+                "current_streak": new_streak,
+                "best_streak": func.greatest(UserStatsModel.best_streak, new_streak),
+            },
         )
-        .order_by(func.random())
-        .first()
+        .returning(UserStatsModel.correct_total, UserStatsModel.current_streak, UserStatsModel.best_streak)
     )
+    stats = db.execute(stats_stmt).one()
+
+    total_points = None
+    if was_correct:
+        category_stmt = (
+            pg_insert(UserCategoryStatsModel)
+            .values(user_id=user_id, category_key=normalize_category(question.category), correct_count=1)
+            .on_conflict_do_update(
+                index_elements=[UserCategoryStatsModel.user_id, UserCategoryStatsModel.category_key],
+                set_={"correct_count": UserCategoryStatsModel.correct_count + 1},
+            )
+        )
+        db.execute(category_stmt)
+
+        total_points = db.execute(
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(total_points=func.coalesce(UserModel.total_points, 0) + POINTS_PER_CORRECT_ANSWER)
+            .returning(UserModel.total_points)
+        ).scalar_one()
 
-def record_user_answer(db: Session, user_id: int, question_id: int, was_correct: bool):
-    """Records a user's answer to a question."""
-    db_answer = UserAnswerModel(user_id=user_id, question_id=question_id, was_correct=was_correct)
-    db.add(db_answer)
     db.commit()
-    db.refresh(db_answer)
-    return db_answer
+    return {
+        "correct_total": stats.correct_total,
+        "current_streak": stats.current_streak,
+        "best_streak": stats.best_streak,
+        "total_points": total_points,
+    }
 
 def get_question_by_id(db: Session, question_id: int):
     """Fetches a question by its ID."""
@@ -70,10 +216,36 @@ def get_question_by_id(db: Session, question_id: int):
 
 
 def get_user_score(db: Session, user_id: int) -> int:
-    """Calculates the total trivia score for a user."""
-    correct_answers_count = (
-        db.query(UserAnswerModel)
-        .filter_by(user_id=user_id, was_correct=True)
-        .count()
+    """Returns the total trivia score for a user from their running stats."""
+    correct_total = db.query(UserStatsModel.correct_total).filter_by(user_id=user_id).scalar()
+    return (correct_total or 0) * POINTS_PER_CORRECT_ANSWER
+
+def get_user_stats(db: Session, user_id: int):
+    """Fetches the running trivia stats for a user, or None if they have never answered."""
+    return db.query(UserStatsModel).filter_by(user_id=user_id).first()
+
+def get_user_category_counts(db: Session, user_id: int) -> dict[str, int]:
+    """Returns a mapping of normalized category key to correct-answer count for a user."""
+    rows = (
+        db.query(UserCategoryStatsModel.category_key, UserCategoryStatsModel.correct_count)
+        .filter_by(user_id=user_id)
+        .all()
     )
-    return correct_answers_count * 10 
+    return {category_key: correct_count for category_key, correct_count in rows}
+
+def get_leaderboard_scores(db: Session, category_key: str | None = None) -> list[tuple[int, int]]:
+    """
+    Returns (user_id, correct_count) for every user with at least one correct answer,
+    either overall or within a single normalized category.
+    """
+    if category_key is None:
+        query = (
+            db.query(UserStatsModel.user_id, UserStatsModel.correct_total)
+            .filter(UserStatsModel.correct_total > 0)
+        )
+    else:
+        query = (
+            db.query(UserCategoryStatsModel.user_id, UserCategoryStatsModel.correct_count)
+            .filter(UserCategoryStatsModel.category_key == category_key, UserCategoryStatsModel.correct_count > 0)
+        )
+    return [tuple(row) for row in query.all()]
@@ -8,6 +8,12 @@ def get_user_by_email(db: Session, email: str):
     
     return db.query(user_model.User).options(joinedload(user_model.User.badges)).filter(user_model.User.email == email).first()
 
+def get_user_ids_by_emails(db: Session, emails: list[str]) -> list[int]:
+    """Returns the ids of the users with the given email addresses."""
+    if not emails:
+        return []
+    return [user_id for (user_id,) in db.query(user_model.User.id).filter(user_model.User.email.in_(emails)).all()]
+
 def create_user(db: Session, user: user_schema.UserCreate):
     """Creates a new user in the database."""
     hashed_password = get_password_hash(user.password)
@@ -1,12 +1,18 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
-import httpx
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
 from mangum import Mangum
+from .core.logs import configure_logging
+from .core.metrics import MetricsMiddleware, render as render_metrics
+from .core.profiling import SlowRequestProfiler, start_slow_request_sampler, stop_slow_request_sampler
+from .core.tracing import TracingMiddleware, configure_tracing
 
 
 from .core.db import Base, engine
@@ -19,31 +25,56 @@ from .api import trivia_routes
 from .api import history_routes
 from .api import auth_routes
 from .api import watch_party_routes
+from .api import admin_routes
+from .services.trivia_pool import TriviaQuestionPool
+from .services import catalog, movie_graph
+from .services.upstream import UpstreamClient, create_http_client
+
+configure_logging()
+configure_tracing()
+logger = logging.getLogger(__name__)
+
+# Mangum runs the lifespan around every Lambda invocation, so refreshers started there would be cancelled
+# before finishing. On Lambda the catalog and graph are built out of band (build_artifacts.py) and only loaded.
+RUN_BACKGROUND_TASKS = os.getenv("FIREPULSE_BACKGROUND_TASKS", "0" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "1") != "0"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     
-    print("--- FirePulse+ API starting. HTTP client created. ---")
-    app.state.httpx_client = httpx.AsyncClient(timeout=30.0)
-    
-    
-    print("Creating database tables...")
+    logger.info("FirePulse+ API starting. HTTP client created.")
+    app.state.upstream = UpstreamClient(create_http_client())
+    app.state.trivia_pool = TriviaQuestionPool(app.state.upstream)
+    refreshers = []
+    if RUN_BACKGROUND_TASKS:
+        app.state.trivia_pool.start()
+        refreshers = [
+            asyncio.create_task(catalog.run_catalog_refresher(app.state.upstream)),
+            asyncio.create_task(movie_graph.run_graph_refresher(app.state.upstream)),
+        ]
+        start_slow_request_sampler()
+    else:
+        await asyncio.gather(catalog.load_catalog(), movie_graph.load_graph())
     
-    print("Database tables created successfully.")
     
     yield 
     
    
-    await app.state.httpx_client.aclose()
-    print("--- FirePulse+ API shutting down. HTTP client closed. ---")
+    for refresher in refreshers:
+        refresher.cancel()
+    await asyncio.gather(*refreshers, return_exceptions=True)
+    await app.state.trivia_pool.close()
+    await app.state.upstream.aclose()
+    stop_slow_request_sampler()
+    logger.info("FirePulse+ API shutting down. HTTP client closed.")
 
 
 app = FastAPI(
     title="FirePulse+ API",
     description="The backend API for the FirePulse+ social entertainment hub.",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -58,6 +89,10 @@ app.add_middleware(
 
 
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+app.add_middleware(SlowRequestProfiler)
+app.add_middleware(TracingMiddleware)
+# Added last so it is outermost and times the whole request, middleware included.
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(general_router, prefix="/api/v1", tags=["Main Bot"])
@@ -66,6 +101,7 @@ app.include_router(history_routes.router, prefix="/api/v1", tags=["User History
 app.include_router(trivia_routes.router, prefix="/api/v1", tags=["Trivia & Gamification"])
 app.include_router(auth_routes.router, prefix="/api/v1")
 app.include_router(watch_party_routes.router, prefix="/api/v1", tags=["Watch Party"])
+app.include_router(admin_routes.router, prefix="/api/v1")
 
 
 if os.path.isdir("static"):
@@ -77,4 +113,20 @@ async def read_root():
     
     return {"status": "ok", "message": "Welcome to the FirePulse+ API!"}
 
+
+@app.get("/health/upstreams", tags=["Root"], dependencies=[Depends(admin_routes.get_admin_user)])
+async def upstream_health():
+    """
+    Circuit breaker state, in-flight calls and connection reuse per upstream host, and rate limit queues.
+    Admins only: it reveals which upstreams are failing and how close each is to its limits.
+    """
+    return {"hosts": app.state.upstream.status(), "rate_limits": app.state.upstream.governor.status()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this process."""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
 handler = Mangum(app)
\ No newline at end of file
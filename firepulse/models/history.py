@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, Float
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.db import Base
@@ -15,4 +15,17 @@ class MovieHistory(Base):
     genres = Column(JSONB)
 
     watched_at = Column(DateTime(timezone=True), server_default=func.now())
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+    __table_args__ = (
+        Index("uq_movie_history_user_tmdb", user_id, tmdb_id, unique=True),
+        Index("ix_movie_history_user_watched_at", user_id, watched_at.desc()),
+    )
+
+
+class UserTasteProfile(Base):
+    """Genre weights (in services.taste.TMDB_GENRE_IDS order) decayed to updated_at."""
+    __tablename__ = "user_taste_profiles"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    weights = Column(ARRAY(Float), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
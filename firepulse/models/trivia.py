@@ -1,18 +1,21 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from ..core.db import Base
 
 user_badge_association = Table(
     'user_badge', Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
-    Column('badge_id', Integer, ForeignKey('badges.id'))
+    Column('badge_id', Integer, ForeignKey('badges.id')),
+    UniqueConstraint('user_id', 'badge_id', name='uq_user_badge_user_badge'),
 )
 
 class TriviaQuestion(Base):
     __tablename__ = "trivia_questions"
     id = Column(Integer, primary_key=True, index=True)
     category = Column(String, index=True)
+    category_key = Column(String)
     question_text = Column(String, unique=True, nullable=False)
+    question_hash = Column(String(32))
     correct_answer = Column(String, nullable=False)
 
     
@@ -20,6 +23,11 @@ class TriviaQuestion(Base):
     incorrect_answer_2 = Column(String, nullable=False, server_default="Default Answer 2")
     incorrect_answer_3 = Column(String, nullable=False, server_default="Default Answer 3")
 
+    __table_args__ = (
+        Index("ix_trivia_questions_category_key_id", category_key, id),
+        Index("uq_trivia_questions_question_hash", question_hash, unique=True),
+    )
+
 
 class UserAnswer(Base):
     __tablename__ = "user_answers"
@@ -30,9 +38,38 @@ class UserAnswer(Base):
     user = relationship("User") 
     question = relationship("TriviaQuestion")
 
+    __table_args__ = (
+        Index("ix_user_answers_user_question", user_id, question_id),
+    )
+
 class Badge(Base):
     __tablename__ = "badges"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
     description = Column(String)
 
+
+class UserStats(Base):
+    """Running trivia totals for a user, updated in the same transaction as each answer."""
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    answered_total = Column(Integer, nullable=False, default=0, server_default="0")
+    correct_total = Column(Integer, nullable=False, default=0, server_default="0")
+    current_streak = Column(Integer, nullable=False, default=0, server_default="0")
+    best_streak = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_user_stats_correct_total", correct_total.desc(), user_id),
+    )
+
+
+class UserCategoryStats(Base):
+    """Correct-answer count per user and normalized trivia category."""
+    __tablename__ = "user_category_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category_key = Column(String, primary_key=True)
+    correct_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_user_category_stats_leaderboard", category_key, correct_count.desc(), user_id),
+    )
@@ -0,0 +1,54 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+# Response schemas for the movie endpoints. The handlers build these payloads as plain dicts and
+# return them as ORJSONResponse, so the models document the responses without re-validating them.
+
+
+class MovieSuggestion(BaseModel):
+    title: Optional[str] = None
+    overview: Optional[str] = None
+    release_date: Optional[str] = None
+    language: Optional[str] = None
+    vote_average: Optional[float] = None
+    poster_path: Optional[str] = None
+
+
+class TimeBasedSuggestions(BaseModel):
+    timezone_used: str
+    current_hour_in_timezone: int
+    greeting: str
+    suggestions: List[MovieSuggestion]
+
+
+class RecommendedMovie(BaseModel):
+    """services.tmdb.MovieRecord.to_dict(); score is only present on movie graph neighbors."""
+    id: int
+    title: str
+    genre_ids: List[int] = []
+    original_language: Optional[str] = None
+    overview: str = ""
+    poster_path: Optional[str] = None
+    release_date: Optional[str] = None
+    popularity: float = 0.0
+    vote_average: float = 0.0
+    vote_count: int = 0
+    score: Optional[float] = None
+
+
+class HistoryRecommendations(BaseModel):
+    recommending_based_on: str
+    suggestions: List[RecommendedMovie]
+
+
+class WatchHistoryItem(BaseModel):
+    tmdb_id: int
+    title: str
+    genres: Optional[List[int]] = None
+    watched_at: datetime
+
+
+class WatchHistoryPage(BaseModel):
+    items: List[WatchHistoryItem]
+    next_cursor: Optional[str] = None
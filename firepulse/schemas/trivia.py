@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List
+from typing import List, Optional
 
 class TriviaAnswer(BaseModel):
     text: str
@@ -22,3 +22,15 @@ class Badge(BaseModel):
     description: str
 
     model_config = ConfigDict(from_attributes=True)
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    score: int
+
+class Leaderboard(BaseModel):
+    category: Optional[str] = None
+    entries: List[LeaderboardEntry]
+    your_rank: Optional[int] = None
+    your_score: int = 0
+    total_players: int = 0
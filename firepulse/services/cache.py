@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import orjson
+
+from ..core.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Shared second-tier cache. Unset: in-process caches only.
+#   sqlite:////var/cache/firepulse.sqlite  - one file shared by the workers of a host
+#   redis://localhost:6379/0               - shared by every host and Lambda container
+CACHE_URL = os.getenv("FIREPULSE_CACHE_URL")
+CACHE_KEY_PREFIX = "firepulse"
+# Bump a namespace's version when the shape of what it stores changes; old entries are then ignored and expire.
+CACHE_NAMESPACE_VERSIONS: Dict[str, int] = {
+    "tmdb": 2,
+    "spotify": 1,
+    "tts": 1,
+    "mood": 1,
+}
+# Deleting expired rows from the SQLite backend happens on one set in this many.
+SQLITE_PURGE_EVERY = 500
+REDIS_SOCKET_TIMEOUT_SECONDS = 0.5
+# After a backend error, the shared tier is skipped for this long instead of timing out on every request.
+BACKEND_ERROR_BACKOFF_SECONDS = 30.0
+
+
+class SQLiteBackend:
+    """Key/value blobs with an expiry in a local SQLite file (WAL, so readers never block the writer)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connect().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, time.time() + ttl))
+        self._sets += 1
+        if self._sets % SQLITE_PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisBackend:
+    """Any server speaking the Redis protocol, through the synchronous redis-py client."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS, socket_connect_timeout=REDIS_SOCKET_TIMEOUT_SECONDS
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+def create_backend(url: Optional[str]):
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported FIREPULSE_CACHE_URL scheme: {url}")
+
+
+_backend = None
+_backend_loaded = False
+_backend_down_until = 0.0
+
+
+def get_backend():
+    """The process-wide shared backend, created from FIREPULSE_CACHE_URL on first use (None if unset)."""
+    global _backend, _backend_loaded
+    if not _backend_loaded:
+        _backend_loaded = True
+        try:
+            _backend = create_backend(CACHE_URL)
+        except Exception as e:
+            logger.error("Shared cache disabled, could not open %s: %s", CACHE_URL, e)
+    return _backend
+
+
+def _backend_failed(action: str, namespace: str, error: Exception):
+    global _backend_down_until
+    _backend_down_until = time.monotonic() + BACKEND_ERROR_BACKOFF_SECONDS
+    logger.warning("Shared cache %s failed for %s, skipping it for %.0fs: %s", action, namespace, BACKEND_ERROR_BACKOFF_SECONDS, error)
+
+
+class SharedNamespace:
+    """
+    One versioned namespace in the shared backend. Values are orjson-encoded (or stored as-is with raw=True).
+    Backend errors are logged and treated as misses, so a cache outage never fails a request.
+    """
+
+    def __init__(self, namespace: str, raw: bool = False, backend=None):
+        self.namespace = namespace
+        self.raw = raw
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if time.monotonic() < _backend_down_until:
+            return None
+        return self._backend if self._backend is not None else get_backend()
+
+    def key(self, key: Hashable) -> str:
+        return f"{CACHE_KEY_PREFIX}:{self.namespace}:v{CACHE_NAMESPACE_VERSIONS.get(self.namespace, 1)}:{key}"
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        backend = self.backend
+        if backend is None:
+            return None
+        try:
+            data = await asyncio.to_thread(backend.get, self.key(key))
+        except Exception as e:
+            _backend_failed("read", self.namespace, e)
+            return None
+        if data is None:
+            return None
+        return data if self.raw else orjson.loads(data)
+
+    async def set(self, key: Hashable, value: Any, ttl: float):
+        backend = self.backend
+        if backend is None:
+            return
+        try:
+            data = value if self.raw else orjson.dumps(value)
+        except TypeError as e:
+            logger.warning("Not caching unserializable %s value for %r: %s", self.namespace, key, e)
+            return
+        try:
+            await asyncio.to_thread(backend.set, self.key(key), data, ttl)
+        except Exception as e:
+            _backend_failed("write", self.namespace, e)
+
+
+class TwoTierCache:
+    """
+    An in-process LRU with per-entry expiry in front of a SharedNamespace.
+    Shared entries carry their expiry time, so a worker picking one up keeps it no longer than its writer meant to.
+    `name` labels its hit/miss metrics (default: the namespace).
+    """
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int = 1024, backend=None, name: Optional[str] = None):
+        self.name = name or namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.shared = SharedNamespace(namespace, backend=backend)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+
+    def _remember(self, key: Hashable, value: Any, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self._entries.move_to_end(key)
+                CACHE_LOOKUPS.labels(self.name, "hit").inc()
+                return entry[0]
+            del self._entries[key]
+
+        stored = await self.shared.get(key)
+        if not stored or stored[1] <= time.time():
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+        CACHE_LOOKUPS.labels(self.name, "shared_hit").inc()
+        self._remember(key, stored[0], stored[1])
+        return stored[0]
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl
+        self._remember(key, value, expires_at)
+        await self.shared.set(key, [value, expires_at], ttl)
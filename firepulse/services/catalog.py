@@ -0,0 +1,295 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from ..core import tracing
+from ..core.config import settings
+from .taste import TMDB_GENRE_IDS, genre_ids_from_mask, genre_mask
+from .rate_limit import BACKGROUND
+from .tmdb import MovieRecord, parse_results
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.getenv("FIREPULSE_CATALOG_PATH", "/tmp/firepulse-catalog.npz")
+CATALOG_REFRESH_SECONDS = 6 * 60 * 60
+# Wait before retrying after a failed or empty refresh.
+CATALOG_RETRY_SECONDS = 5 * 60
+CATALOG_LANGUAGES = ["en", "hi"]
+# Discover pages fetched per language, and per (language, genre), on each refresh.
+CATALOG_POPULAR_PAGES = 10
+CATALOG_GENRE_PAGES = 3
+CATALOG_MIN_VOTES = 20
+CATALOG_REQUEST_CONCURRENCY = 4
+
+_EPOCH = date(1970, 1, 1)
+_NO_RELEASE_DATE = np.iinfo(np.int32).min
+
+
+def _release_day(release_date: Optional[str]) -> int:
+    try:
+        return (date.fromisoformat(release_date) - _EPOCH).days
+    except (TypeError, ValueError):
+        return _NO_RELEASE_DATE
+
+
+def _today() -> int:
+    return (datetime.now(timezone.utc).date() - _EPOCH).days
+
+
+class PackedStrings:
+    """
+    A string column as one UTF-8 byte blob plus offsets: row i is data[offsets[i]:offsets[i + 1]].
+    Unlike a NumPy unicode array (4 bytes per character, every row padded to the longest), it takes
+    about one byte per character of the text actually stored.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, values: Iterable[str]) -> "PackedStrings":
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"PackedStrings index out of range: {index}")
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.data.nbytes
+
+
+def save_columns(path: str, built_at: float, columns: Dict[str, Union[np.ndarray, PackedStrings]]):
+    """Writes columns to an .npz atomically, so a concurrent reader never sees a partial file."""
+    arrays = {}
+    for name, column in columns.items():
+        if isinstance(column, PackedStrings):
+            arrays[f"{name}_offsets"], arrays[f"{name}_data"] = column.offsets, column.data
+        else:
+            arrays[name] = column
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, built_at=np.array(built_at), **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_columns(path: str, names: Iterable[str], string_names: Iterable[str]):
+    """Reads what save_columns wrote: (columns, built_at), or None if the file does not exist."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        columns = {name: data[name] for name in names if name not in string_names}
+        for name in string_names:
+            columns[name] = PackedStrings(data[f"{name}_offsets"], data[f"{name}_data"])
+        return columns, float(data["built_at"])
+
+
+class MovieCatalog:
+    """
+    A columnar, in-process copy of the TMDB movies we recommend from.
+    Every column is a NumPy array indexed by row, except the free-text ones, which are PackedStrings;
+    filters are vectorized boolean masks. Genres are stored as a bitmask over TMDB_GENRE_IDS.
+    """
+
+    COLUMNS = (
+        "ids", "titles", "overviews", "poster_paths", "languages", "genre_bits",
+        "popularity", "vote_average", "vote_count", "release_days",
+    )
+    STRING_COLUMNS = ("titles", "overviews", "poster_paths")
+
+    def __init__(self, columns: Dict[str, np.ndarray], built_at: float):
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self.built_at = built_at
+        self._genre_matrix: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_movies(cls, movies: Iterable[MovieRecord]) -> "MovieCatalog":
+        unique = list({movie.id: movie for movie in movies}.values())
+        columns = {
+            "ids": np.array([movie.id for movie in unique], dtype=np.int64),
+            "titles": PackedStrings.from_strings(movie.title for movie in unique),
+            "overviews": PackedStrings.from_strings(movie.overview for movie in unique),
+            "poster_paths": PackedStrings.from_strings(movie.poster_path or "" for movie in unique),
+            # ISO 639-1 codes, as ASCII bytes so the language filter stays a vectorized comparison.
+            "languages": np.array([(movie.original_language or "").encode("ascii", "ignore") for movie in unique], dtype="S8"),
+            "genre_bits": np.array([genre_mask(movie.genre_ids) for movie in unique], dtype=np.uint32),
+            "popularity": np.array([movie.popularity for movie in unique], dtype=np.float32),
+            "vote_average": np.array([movie.vote_average for movie in unique], dtype=np.float32),
+            "vote_count": np.array([movie.vote_count for movie in unique], dtype=np.int32),
+            "release_days": np.array([_release_day(movie.release_date) for movie in unique], dtype=np.int32),
+        }
+        return cls(columns, built_at=time.time())
+
+    def save(self, path: str = CATALOG_PATH):
+        save_columns(path, self.built_at, {name: getattr(self, name) for name in self.COLUMNS})
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> Optional["MovieCatalog"]:
+        loaded = load_columns(path, cls.COLUMNS, cls.STRING_COLUMNS)
+        return cls(*loaded) if loaded is not None else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def filter(
+        self,
+        genre_ids: Optional[Iterable[int]] = None,
+        language: Optional[str] = None,
+        min_votes: int = 0,
+        min_vote_average: float = 0.0,
+        released_within_days: Optional[int] = None,
+        exclude_ids: Optional[Iterable[int]] = None,
+    ) -> np.ndarray:
+        """Returns the row indices matching every given filter; genre_ids match if the movie has any of them."""
+        mask = np.ones(len(self), dtype=bool)
+        if genre_ids:
+            mask &= (self.genre_bits & np.uint32(genre_mask(genre_ids))) != 0
+        if language:
+            mask &= self.languages == language.encode("ascii", "ignore")
+        if min_votes:
+            mask &= self.vote_count >= min_votes
+        if min_vote_average:
+            mask &= self.vote_average >= min_vote_average
+        if released_within_days is not None:
+            today = _today()
+            mask &= (self.release_days <= today) & (self.release_days >= today - released_within_days)
+        if exclude_ids:
+            mask &= ~np.isin(self.ids, np.fromiter(exclude_ids, dtype=np.int64))
+        return np.flatnonzero(mask)
+
+    def sample(self, limit: int, **filters) -> List[MovieRecord]:
+        """Returns up to `limit` random movies matching the filters, favouring popular ones."""
+        indices = self.filter(**filters)
+        if len(indices) == 0:
+            return []
+        weights = np.log1p(self.popularity[indices].astype(np.float64)) + 1.0
+        chosen = np.random.choice(indices, size=min(limit, len(indices)), replace=False, p=weights / weights.sum())
+        return self.records(chosen)
+
+    def genre_matrix(self) -> np.ndarray:
+        """Rows are catalog movies, columns are genres; each row sums to 1 like taste.genre_vector."""
+        if self._genre_matrix is None:
+            bits = (self.genre_bits[:, None] >> np.arange(len(TMDB_GENRE_IDS), dtype=np.uint32)) & 1
+            matrix = bits.astype(np.float64)
+            counts = matrix.sum(axis=1, keepdims=True)
+            self._genre_matrix = np.divide(matrix, counts, out=np.zeros_like(matrix), where=counts > 0)
+        return self._genre_matrix
+
+    def records(self, indices: Iterable[int]) -> List[MovieRecord]:
+        """Builds MovieRecords for the given rows."""
+        movies = []
+        for index in indices:
+            release_day = int(self.release_days[index])
+            movies.append(MovieRecord(
+                id=int(self.ids[index]),
+                title=self.titles[index],
+                genre_ids=tuple(genre_ids_from_mask(int(self.genre_bits[index]))),
+                original_language=self.languages[index].decode("ascii") or None,
+                overview=self.overviews[index],
+                poster_path=self.poster_paths[index] or None,
+                release_date=date.fromordinal(_EPOCH.toordinal() + release_day).isoformat() if release_day != _NO_RELEASE_DATE else None,
+                popularity=round(float(self.popularity[index]), 3),
+                vote_average=round(float(self.vote_average[index]), 3),
+                vote_count=int(self.vote_count[index]),
+            ))
+        return movies
+
+
+_catalog: Optional[MovieCatalog] = None
+
+
+def get_catalog() -> Optional[MovieCatalog]:
+    """Returns the loaded catalog, or None until the first load or refresh has finished."""
+    return _catalog
+
+
+async def _fetch_page(client: UpstreamClient, semaphore: asyncio.Semaphore, path: str, params: Dict[str, Any]) -> List[MovieRecord]:
+    async with semaphore:
+        try:
+            response = await client.get(f"https://api.themoviedb.org/3/{path}", params={"api_key": settings.TMDB_API_KEY, **params}, priority=BACKGROUND)
+            response.raise_for_status()
+            return parse_results(response.json())
+        except Exception as e:
+            logger.warning("Error fetching catalog page %s %s: %s", path, params, e)
+            return []
+
+
+async def build_catalog(client: UpstreamClient) -> MovieCatalog:
+    """Fetches popular movies per language and per (language, genre), plus now-playing, from TMDB."""
+    semaphore = asyncio.Semaphore(CATALOG_REQUEST_CONCURRENCY)
+    base = {"language": "en-US", "sort_by": "popularity.desc", "include_adult": False, "vote_count.gte": CATALOG_MIN_VOTES}
+    requests = []
+    for lang in CATALOG_LANGUAGES:
+        for page in range(1, CATALOG_POPULAR_PAGES + 1):
+            requests.append(("discover/movie", {**base, "with_original_language": lang, "page": page}))
+        for genre_id in TMDB_GENRE_IDS:
+            for page in range(1, CATALOG_GENRE_PAGES + 1):
+                requests.append(("discover/movie", {**base, "with_original_language": lang, "with_genres": genre_id, "page": page}))
+    for page in range(1, 4):
+        requests.append(("movie/now_playing", {"language": "en-US", "region": "IN", "page": page}))
+
+    pages = await asyncio.gather(*(_fetch_page(client, semaphore, path, params) for path, params in requests))
+    return MovieCatalog.from_movies(movie for page in pages for movie in page)
+
+
+@tracing.traced("catalog.refresh")
+async def refresh_catalog(client: UpstreamClient) -> Optional[MovieCatalog]:
+    """Rebuilds the catalog from TMDB, keeping the previous one if the refresh came back empty."""
+    global _catalog
+    catalog = await build_catalog(client)
+    if len(catalog) == 0:
+        logger.warning("Catalog refresh returned no movies; keeping the previous catalog.")
+        return _catalog
+    try:
+        await asyncio.to_thread(catalog.save)
+    except OSError as e:
+        logger.warning("Could not persist movie catalog: %s", e)
+    _catalog = catalog
+    logger.info("Movie catalog refreshed with %d movies.", len(catalog), extra={"movies": len(catalog)})
+    return catalog
+
+
+async def load_catalog() -> Optional[MovieCatalog]:
+    """Loads the catalog saved at CATALOG_PATH, unless one is already loaded. Never fetches from TMDB."""
+    global _catalog
+    if _catalog is None:
+        try:
+            _catalog = await asyncio.to_thread(MovieCatalog.load)
+        except Exception as e:
+            logger.warning("Could not load movie catalog from %s: %s", CATALOG_PATH, e)
+    return _catalog
+
+
+async def run_catalog_refresher(client: UpstreamClient):
+    """Loads the catalog from disk, then keeps it fresh. Runs until cancelled."""
+    await load_catalog()
+
+    while True:
+        if _catalog is None or time.time() - _catalog.built_at >= CATALOG_REFRESH_SECONDS:
+            try:
+                await refresh_catalog(client)
+            except Exception as e:
+                logger.exception("Movie catalog refresh failed: %s", e)
+
+        if _catalog is None:
+            delay = CATALOG_RETRY_SECONDS
+        else:
+            delay = max(CATALOG_REFRESH_SECONDS - (time.time() - _catalog.built_at), CATALOG_RETRY_SECONDS)
+        await asyncio.sleep(delay)
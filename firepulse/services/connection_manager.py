@@ -1,5 +1,7 @@
+import time
 from fastapi import WebSocket
 from typing import List, Dict, Tuple
+from ..core import metrics
 
 class ConnectionManager:
     def __init__(self):
@@ -11,7 +13,9 @@ class ConnectionManager:
         await websocket.accept()
         if party_id not in self.active_connections:
             self.active_connections[party_id] = []
+            metrics.WS_PARTIES.inc()
         self.active_connections[party_id].append((user_id, websocket))
+        metrics.WS_CONNECTIONS.inc()
 
     def disconnect(self, websocket: WebSocket, party_id: str):
         
@@ -23,12 +27,20 @@ class ConnectionManager:
                     break
             if connection_to_remove:
                 self.active_connections[party_id].remove(connection_to_remove)
+                metrics.WS_CONNECTIONS.dec()
+            if not self.active_connections[party_id]:
+                del self.active_connections[party_id]
+                metrics.WS_PARTIES.dec()
 
     async def broadcast(self, message: str, party_id: str):
         
         if party_id in self.active_connections:
-            for user_id, connection in self.active_connections[party_id]:
+            started = time.perf_counter()
+            members = self.active_connections[party_id]
+            for user_id, connection in members:
                 await connection.send_text(message)
+            metrics.WS_MESSAGES.labels("sent").inc(len(members))
+            metrics.WS_BROADCAST_SECONDS.observe(time.perf_counter() - started)
 
     def get_users_in_party(self, party_id: str) -> List[str]:
         
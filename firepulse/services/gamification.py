@@ -1,44 +1,92 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
 from sqlalchemy.orm import Session
 from ..models.user import User as UserModel
-from ..models.trivia import UserAnswer, TriviaQuestion
 from ..crud import badge as badge_crud
+from ..crud import trivia as trivia_crud
 
-def check_and_award_badges(db: Session, user: UserModel) -> list[str]:
+
+@dataclass(frozen=True)
+class BadgeRule:
+    """
+    A badge awarded once a per-user counter reaches a threshold.
+    `counter` is one of "correct_total", "best_streak" or "category"; category rules
+    sum correct answers over every normalized category key containing `category`.
     """
-    Checks user's trivia performance and awards new badges.
+    name: str
+    description: str
+    counter: str
+    threshold: int
+    category: Optional[str] = None
+
+
+BADGE_RULES = [
+    BadgeRule("First Correct Answer", "Get your first trivia answer right!", "correct_total", 1),
+    BadgeRule("Trivia Regular", "Answer 25 trivia questions correctly.", "correct_total", 25),
+    BadgeRule("Trivia Master", "Answer 100 trivia questions correctly.", "correct_total", 100),
+    BadgeRule("Movie Novice", "Answer 5 movie trivia questions correctly.", "category", 5, category="movie"),
+    BadgeRule("Music Maestro", "Answer 5 music trivia questions correctly.", "category", 5, category="music"),
+    BadgeRule("Hot Streak", "Answer 5 trivia questions in a row correctly.", "best_streak", 5),
+    BadgeRule("Unstoppable", "Answer 15 trivia questions in a row correctly.", "best_streak", 15),
+]
+
+# Badge rows change only when seed_db.py runs, so the name -> id catalog is cached per worker.
+BADGE_CATALOG_TTL_SECONDS = 300
+
+_badge_catalog: Dict[str, int] = {}
+_badge_catalog_loaded_at = 0.0
+
+
+def get_badge_catalog(db: Session) -> Dict[str, int]:
+    """Returns a cached mapping of badge name to badge id."""
+    global _badge_catalog, _badge_catalog_loaded_at
+    if not _badge_catalog or time.monotonic() - _badge_catalog_loaded_at > BADGE_CATALOG_TTL_SECONDS:
+        _badge_catalog = {name: badge_id for badge_id, name in badge_crud.get_all_badges(db)}
+        _badge_catalog_loaded_at = time.monotonic()
+    return _badge_catalog
+
+
+def check_and_award_badges(db: Session, user: UserModel, stats: Optional[dict] = None) -> list[str]:
+    """
+    Evaluates every badge rule against the user's counters in a single pass and awards new badges.
+    `stats` is the row returned by trivia_crud.record_user_answer; it is loaded when not given.
     Returns a list of names of newly awarded badges.
     """
-    
-    user = db.merge(user)
+    catalog = get_badge_catalog(db)
+    owned_badge_ids = {badge.id for badge in user.badges}
+
+    pending_rules = [
+        rule for rule in BADGE_RULES
+        if rule.name in catalog and catalog[rule.name] not in owned_badge_ids
+    ]
+    if not pending_rules:
+        return []
+
+    if stats is None:
+        user_stats = trivia_crud.get_user_stats(db, user_id=user.id)
+        stats = {
+            "correct_total": user_stats.correct_total if user_stats else 0,
+            "best_streak": user_stats.best_streak if user_stats else 0,
+        }
 
+    category_counts = None
     newly_awarded_badges = []
+    for rule in pending_rules:
+        if rule.counter == "category":
+            if category_counts is None:
+                category_counts = trivia_crud.get_user_category_counts(db, user_id=user.id)
+            value = sum(count for key, count in category_counts.items() if rule.category in key)
+        else:
+            value = stats.get(rule.counter) or 0
 
-    
-    first_correct_badge = badge_crud.get_badge_by_name(db, name="First Correct Answer")
-    if first_correct_badge and first_correct_badge not in user.badges:
-        correct_answers_count = db.query(UserAnswer).filter_by(user_id=user.id, was_correct=True).count()
-        if correct_answers_count >= 1:
-            user.badges.append(first_correct_badge)
-            newly_awarded_badges.append(first_correct_badge.name)
-
-    
-    movie_novice_badge = badge_crud.get_badge_by_name(db, name="Movie Novice")
-    if movie_novice_badge and movie_novice_badge not in user.badges:
-        correct_movie_answers = (
-            db.query(UserAnswer)
-            .join(TriviaQuestion)
-            .filter(
-                UserAnswer.user_id == user.id,
-                UserAnswer.was_correct == True,
-                TriviaQuestion.category.ilike('%movie%')
-            )
-            .count()
-        )
-        if correct_movie_answers >= 5:
-            user.badges.append(movie_novice_badge)
-            newly_awarded_badges.append(movie_novice_badge.name)
+        if value >= rule.threshold:
+            newly_awarded_badges.append(rule.name)
 
     if newly_awarded_badges:
+        added = badge_crud.award_badges(db, user_id=user.id, badge_ids=[catalog[name] for name in newly_awarded_badges])
         db.commit()
+        # A concurrent request may have awarded some of them first; only announce what this one added.
+        newly_awarded_badges = [name for name in newly_awarded_badges if catalog[name] in added]
 
     return newly_awarded_badges
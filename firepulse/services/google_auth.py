@@ -1,15 +1,19 @@
+import logging
 import os
-from google_auth_oauthlib.flow import Flow
 from ..core.config import settings
 import json 
-from google.oauth2.credentials import Credentials 
-from googleapiclient.discovery import build 
+
+logger = logging.getLogger(__name__)
+
+# The Google client libraries are imported inside the functions below: they are only needed for the
+# OAuth and calendar routes and are slow to import, so loading them eagerly would delay every cold start.
 
 
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
 
 def get_google_auth_flow():
+    from google_auth_oauthlib.flow import Flow
     
     client_config = {
         "web": {
@@ -36,6 +40,8 @@ def get_google_auth_flow():
     return flow
 
 def build_calendar_service(creds_json: str):
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
     
     try:
         
@@ -45,5 +51,5 @@ def build_calendar_service(creds_json: str):
         service = build('calendar', 'v3', credentials=creds)
         return service
     except Exception as e:
-        print(f"Error building calendar service: {e}")
+        logger.warning("Error building calendar service: %s", e)
         return None
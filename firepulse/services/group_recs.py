@@ -1,36 +1,42 @@
+import logging
 from sqlalchemy.orm import Session
 import random
 import asyncio # <-- NEW IMPORT
 from ..crud import history as history_crud
 from ..crud import user as user_crud
-from ..services import movie_bot
+from ..services import movie_bot, movie_graph
+
+logger = logging.getLogger(__name__)
+
+# The group suggestion is picked at random from this many of the graph's best-scored neighbors.
+GROUP_GRAPH_CANDIDATES = 10
 
 async def suggest_movie_for_group(db: Session, client, user_emails: list[str]):
     
-    all_history_items = []
-    watched_movie_ids = set()
-
-    for email in user_emails:
-        user = user_crud.get_user_by_email(db, email=email)
-        if user:
-            user_history = history_crud.get_user_movie_history(db, user_id=user.id)
-            all_history_items.extend(user_history)
-            for item in user_history:
-                watched_movie_ids.add(item.tmdb_id)
-
-    if not all_history_items:
+    user_ids = user_crud.get_user_ids_by_emails(db, emails=user_emails)
+    watched_movie_ids = set(history_crud.get_watched_tmdb_ids(db, user_ids=user_ids))
+
+    if not watched_movie_ids:
         movies = await movie_bot.get_movies_by_mood(client, "comedy")
         return random.choice(movies) if movies else "No suggestion found."
 
+    graph = movie_graph.get_graph()
+    if graph is not None:
+        # Local neighbor lookup. Seeds the graph does not know are skipped; live TMDB calls are made only
+        # when there is no graph yet or it has no neighbors for any of the seeds.
+        suggestions = graph.recommend(watched_movie_ids, exclude_ids=watched_movie_ids, limit=GROUP_GRAPH_CANDIDATES)
+        if suggestions:
+            return random.choice(suggestions).title
+
     
     recommendation_tasks = []
-    for item in all_history_items:
+    for tmdb_id in watched_movie_ids:
         recommendation_tasks.append(
-            movie_bot.get_recommendations_for_movie(client, item.tmdb_id)
+            movie_bot.get_recommendations_for_movie(client, tmdb_id)
         )
 
     
-    print(f"DEBUG: Fetching recommendations for {len(recommendation_tasks)} seed movies...")
+    logger.debug("Fetching recommendations for %d seed movies...", len(recommendation_tasks))
     list_of_recommendation_lists = await asyncio.gather(*recommendation_tasks)
 
     
@@ -45,13 +51,12 @@ async def suggest_movie_for_group(db: Session, client, user_emails: list[str]):
     seen_suggestion_ids = set()
     new_suggestions = []
     for movie in potential_suggestions:
-        movie_id = movie.get("id")
-        if movie_id and movie_id not in watched_movie_ids and movie_id not in seen_suggestion_ids:
+        if movie.id not in watched_movie_ids and movie.id not in seen_suggestion_ids:
             new_suggestions.append(movie)
-            seen_suggestion_ids.add(movie_id)
+            seen_suggestion_ids.add(movie.id)
 
     if not new_suggestions:
         return "Found some recommendations, but you've seen them all! Try logging more movies."
 
    
-    return random.choice(new_suggestions).get("title", "No suggestion found.")
\ No newline at end of file
+    return random.choice(new_suggestions).title
\ No newline at end of file
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+from sqlalchemy.orm import Session
+
+from ..crud import trivia as trivia_crud
+
+# How long a board loaded from the database is trusted before being reloaded.
+# Updates made by this worker are applied immediately; the reload picks up other workers.
+LEADERBOARD_REFRESH_SECONDS = 60
+# Category boards held at once; the least recently read is dropped beyond this.
+MAX_CATEGORY_BOARDS = 256
+
+
+class Leaderboard:
+    """
+    A sorted in-memory leaderboard.
+    Entries are kept as (-score, user_id) in a SortedList, so updates, a user's rank and top-N are all
+    logarithmic. Sync routes call in from the threadpool, so every method holds the board's lock.
+    """
+
+    def __init__(self):
+        self._ranked = SortedList()
+        self._scores: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.loaded_at = 0.0
+
+    def load(self, rows: List[Tuple[int, int]]):
+        scores = dict(rows)
+        ranked = SortedList((-score, user_id) for user_id, score in scores.items())
+        with self._lock:
+            self._scores = scores
+            self._ranked = ranked
+            self.loaded_at = time.monotonic()
+
+    def update(self, user_id: int, score: int):
+        with self._lock:
+            old_score = self._scores.get(user_id)
+            if old_score is not None:
+                self._ranked.discard((-old_score, user_id))
+            self._ranked.add((-score, user_id))
+            self._scores[user_id] = score
+
+    def _rank(self, score: int) -> int:
+        return self._ranked.bisect_left((-score,)) + 1
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Returns the 1-based rank of a user; tied scores share a rank."""
+        with self._lock:
+            score = self._scores.get(user_id)
+            return None if score is None else self._rank(score)
+
+    def score(self, user_id: int) -> int:
+        with self._lock:
+            return self._scores.get(user_id, 0)
+
+    def top(self, limit: int) -> List[Dict]:
+        with self._lock:
+            return [
+                {"rank": self._rank(-neg_score), "user_id": user_id, "score": -neg_score}
+                for neg_score, user_id in self._ranked.islice(stop=limit)
+            ]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ranked)
+
+
+_global_board: Optional[Leaderboard] = None
+_category_boards: "OrderedDict[str, Leaderboard]" = OrderedDict()
+_boards_lock = threading.Lock()
+
+
+def _load(db: Session, board: Leaderboard, category_key: Optional[str]) -> Leaderboard:
+    rows = trivia_crud.get_leaderboard_scores(db, category_key)
+    board.load([(user_id, count * trivia_crud.POINTS_PER_CORRECT_ANSWER) for user_id, count in rows])
+    return board
+
+
+def _is_stale(board: Optional[Leaderboard]) -> bool:
+    return board is None or time.monotonic() - board.loaded_at > LEADERBOARD_REFRESH_SECONDS
+
+
+def get_leaderboard(db: Session, category: Optional[str] = None) -> Leaderboard:
+    """
+    Returns the global board, or the board for one category, loading it from the database when stale.
+    Only categories somebody has scored in are kept, so arbitrary category strings do not pile up boards.
+    """
+    global _global_board
+    if not category:
+        board = _global_board
+        if _is_stale(board):
+            board = _load(db, board or Leaderboard(), None)
+            with _boards_lock:
+                _global_board = board
+        return board
+
+    category_key = trivia_crud.normalize_category(category)
+    with _boards_lock:
+        board = _category_boards.get(category_key)
+        if board is not None:
+            _category_boards.move_to_end(category_key)
+    if _is_stale(board):
+        board = _load(db, board or Leaderboard(), category_key)
+        with _boards_lock:
+            if len(board):
+                _category_boards[category_key] = board
+                _category_boards.move_to_end(category_key)
+                while len(_category_boards) > MAX_CATEGORY_BOARDS:
+                    _category_boards.popitem(last=False)
+            else:
+                _category_boards.pop(category_key, None)
+    return board
+
+
+def record_correct_answer(user_id: int, category: str, correct_total: int):
+    """Applies a correct answer to any boards this worker already holds."""
+    with _boards_lock:
+        board = _global_board
+        category_board = _category_boards.get(trivia_crud.normalize_category(category))
+    if board is not None:
+        board.update(user_id, correct_total * trivia_crud.POINTS_PER_CORRECT_ANSWER)
+    if category_board is not None:
+        category_board.update(user_id, category_board.score(user_id) + trivia_crud.POINTS_PER_CORRECT_ANSWER)
@@ -1,18 +1,47 @@
-import httpx
 import asyncio
+import logging
 import random
+import threading
+import time
 from typing import List, Optional ,Dict,Any
-from transformers import pipeline
 from ..core.config import settings
-
-
-print("Loading NLP model for mood detection...")
-try:
-    emotion_classifier = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", top_k=1)
-    print("✅ NLP model loaded successfully.")
-except Exception as e:
-    print(f"❌ FAILED to load NLP model: {e}")
-    emotion_classifier = None
+from ..core import tracing
+from ..core.metrics import NLP_INFERENCE_SECONDS, NLP_MODEL_LOAD_SECONDS
+from . import catalog
+from .cache import TwoTierCache
+from .rate_limit import INTERACTIVE
+from .swr_cache import SWRCache
+from .tmdb import MovieRecord, parse_results, records_from_dicts
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+
+# transformers and the model are loaded on the first mood that keywords cannot answer, not at import,
+# so cold starts (and every route that never needs the model) skip several seconds of loading.
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+_emotion_classifier = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+
+
+def get_emotion_classifier():
+    """Returns the emotion pipeline, loading it on first call; None if it could not be loaded."""
+    global _emotion_classifier, _classifier_loaded
+    with _classifier_lock:
+        if not _classifier_loaded:
+            logger.info("Loading NLP model for mood detection...")
+            started = time.perf_counter()
+            try:
+                from transformers import pipeline
+
+                _emotion_classifier = pipeline("text-classification", model=EMOTION_MODEL, top_k=1)
+                NLP_MODEL_LOAD_SECONDS.labels(EMOTION_MODEL).set(time.perf_counter() - started)
+                logger.info("NLP model loaded in %.1fs.", time.perf_counter() - started)
+            except Exception as e:
+                logger.error("Failed to load NLP model: %s", e)
+            _classifier_loaded = True
+    return _emotion_classifier
 
 
 GENRE_KEYWORDS = {
@@ -24,6 +53,7 @@ GENRE_KEYWORDS = {
     "thriller": ["thriller", "thrill", "suspense", "intense", "mystery", "detective", "edge-of-your-seat"]
 }
 
+@tracing.traced("extract_mood")
 def extract_mood(text: str) -> Optional[str]:
    
     text_lower = text.lower()
@@ -32,26 +62,31 @@ def extract_mood(text: str) -> Optional[str]:
     for genre, keywords in GENRE_KEYWORDS.items():
         for kw in keywords:
             if kw in text_lower:
-                print(f"Direct keyword match found for genre: '{genre}'")
+                logger.debug("Direct keyword match found for genre: '%s'", genre)
+                tracing.set_attributes(**{"mood.source": "keyword", "mood.result": genre})
                 return genre
 
    
+    tracing.set_attributes(**{"mood.source": "model", "mood.model_loaded": _emotion_classifier is not None})
+    emotion_classifier = get_emotion_classifier()
     if not emotion_classifier:
-        print("NLP model is not available. Cannot extract mood.")
+        logger.warning("NLP model is not available. Cannot extract mood.")
         return None
         
     try:
-        print("No direct keywords found. Using NLP model for emotion detection...")
+        started = time.perf_counter()
         results = emotion_classifier(text)
+        NLP_INFERENCE_SECONDS.labels(EMOTION_MODEL).observe(time.perf_counter() - started)
         if results and results[0]:
             detected_emotion = results[0][0]['label']
-            print(f"NLP model detected emotion: '{detected_emotion}' from text: '{text}'")
+            logger.debug("NLP model detected emotion: '%s' from text: '%s'", detected_emotion, text)
             
             mood_map = {
                 "joy": "comedy", "sadness": "drama", "anger": "action",
                 "fear": "horror", "surprise": "thriller", "disgust": "horror", "love": "romance"
             }
             mapped_mood = mood_map.get(detected_emotion)
+            tracing.set_attributes(**{"mood.emotion": detected_emotion, "mood.result": mapped_mood})
             if mapped_mood:
                 return mapped_mood
             if detected_emotion == "neutral":
@@ -59,11 +94,42 @@ def extract_mood(text: str) -> Optional[str]:
             return detected_emotion
         return None
     except Exception as e:
-        print(f"Error during NLP mood extraction: {e}")
+        logger.warning("Error during NLP mood extraction: %s", e)
         return None
 
 
-async def get_movies_by_mood(client: httpx.AsyncClient, mood: str) -> List[str]:
+# Moods the NLP model detected, per normalized query text; "" records that no mood was found.
+MOOD_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+mood_cache = TwoTierCache("mood", ttl=MOOD_CACHE_TTL_SECONDS, maxsize=4096)
+
+
+@tracing.traced("detect_mood")
+async def detect_mood(text: str) -> Optional[str]:
+    """extract_mood for request handlers: runs the classifier off the event loop and caches its answers."""
+    cache_key = " ".join(text.lower().split())
+    cached = await mood_cache.get(cache_key)
+    tracing.set_attributes(**{"mood.cached": cached is not None})
+    if cached is not None:
+        return cached or None
+
+    mood = await asyncio.to_thread(extract_mood, text)
+    if mood is not None or _emotion_classifier is not None:
+        await mood_cache.set(cache_key, mood or "")
+    return mood
+
+
+# Discover results per genre are served for MOOD_MOVIES_SOFT_TTL_SECONDS, then refreshed in the background;
+# past the hard TTL a request waits for fresh results, and falls back to the stale ones if TMDB errors.
+MOOD_MOVIES_SOFT_TTL_SECONDS = 10 * 60
+MOOD_MOVIES_HARD_TTL_SECONDS = 60 * 60
+MOOD_MOVIES_STALE_IF_ERROR_SECONDS = 24 * 60 * 60
+mood_movies_cache = SWRCache(
+    "mood movies", soft_ttl=MOOD_MOVIES_SOFT_TTL_SECONDS, hard_ttl=MOOD_MOVIES_HARD_TTL_SECONDS,
+    stale_if_error_ttl=MOOD_MOVIES_STALE_IF_ERROR_SECONDS, namespace="tmdb", decode=records_from_dicts,
+)
+
+
+async def get_movies_by_mood(client: UpstreamClient, mood: str) -> List[str]:
     """Gets a randomized, mixed list of English and Hindi movies concurrently."""
     mood_to_genres = {
         "action": 28, "comedy": 35, "drama": 18, "romance": 10749,
@@ -74,6 +140,13 @@ async def get_movies_by_mood(client: httpx.AsyncClient, mood: str) -> List[str]:
     if not genre_id:
         return [f"Sorry, I don't have a genre category for '{mood}'."]
 
+    movie_catalog = catalog.get_catalog()
+    if movie_catalog is not None:
+        combined = movie_catalog.sample(3, genre_ids=[genre_id], language="en") + movie_catalog.sample(2, genre_ids=[genre_id], language="hi")
+        if combined:
+            random.shuffle(combined)
+            return [movie.title for movie in combined]
+
     async def fetch_movies_by_lang(lang: str):
         discover_url = "https://api.themoviedb.org/3/discover/movie"
         params = {
@@ -85,23 +158,24 @@ async def get_movies_by_mood(client: httpx.AsyncClient, mood: str) -> List[str]:
         try:
             res = await client.get(discover_url, params=params)
             res.raise_for_status()
-            return res.json().get("results", [])
+            return parse_results(res.json())
         except Exception as e:
-            print(f"Error fetching {lang} movies for genre {genre_id}: {e}")
+            logger.warning("Error fetching %s movies for genre %s: %s", lang, genre_id, e)
             return []
 
-    tasks = [fetch_movies_by_lang("en"), fetch_movies_by_lang("hi")]
-    results = await asyncio.gather(*tasks)
-    
-    combined = results[0] + results[1]
+    async def fetch_both_languages():
+        results = await asyncio.gather(fetch_movies_by_lang("en"), fetch_movies_by_lang("hi"))
+        return results[0] + results[1]
+
+    combined = list(await mood_movies_cache.get(genre_id, fetch_both_languages))
     if not combined:
         return ["Sorry, I couldn't find any movie suggestions for that right now."]
 
     random.shuffle(combined)
-    return [movie.get("title", "Untitled") for movie in combined[:5]]
+    return [movie.title for movie in combined[:5]]
 
 
-async def search_person_async(client: httpx.AsyncClient, person_name: str) -> Optional[int]:
+async def search_person_async(client: UpstreamClient, person_name: str) -> Optional[int]:
     """Searches for a person on TMDB and returns their ID."""
     url = "https://api.themoviedb.org/3/search/person"
    
@@ -112,10 +186,10 @@ async def search_person_async(client: httpx.AsyncClient, person_name: str) -> Op
         results = res.json().get("results", [])
         return results[0].get("id") if results else None
     except Exception as e:
-        print(f"Error searching for person '{person_name}': {e}")
+        logger.warning("Error searching for person '%s': %s", person_name, e)
         return None
 
-async def get_movies_by_person_async(client: httpx.AsyncClient, person_id: int) -> List[str]:
+async def get_movies_by_person_async(client: UpstreamClient, person_id: int) -> List[str]:
     """Gets a randomized list of popular movies for a given person ID."""
     url = f"https://api.themoviedb.org/3/discover/movie"
    
@@ -123,16 +197,16 @@ async def get_movies_by_person_async(client: httpx.AsyncClient, person_id: int)
     try:
         res = await client.get(url, params=params)
         res.raise_for_status()
-        movies_data = res.json().get("results", [])
+        movies_data = parse_results(res.json())
         
         random.shuffle(movies_data)
         
-        return [movie.get("title", "Untitled") for movie in movies_data[:5]]
+        return [movie.title for movie in movies_data[:5]]
     except Exception as e:
-        print(f"Error fetching movies for person ID {person_id}: {e}")
+        logger.warning("Error fetching movies for person ID %s: %s", person_id, e)
         return []
     
-async def get_movies_by_genre_id(client: httpx.AsyncClient, genre_id: int) -> List[str]:
+async def get_movies_by_genre_id(client: UpstreamClient, genre_id: int) -> List[str]:
     """Gets a list of movies for a specific genre ID."""
     discover_url = "https://api.themoviedb.org/3/discover/movie"
     params = {
@@ -145,29 +219,20 @@ async def get_movies_by_genre_id(client: httpx.AsyncClient, genre_id: int) -> Li
     try:
         res = await client.get(discover_url, params=params)
         res.raise_for_status()
-        results = res.json().get("results", [])
-        return [movie.get("title", "Untitled") for movie in results]
+        return [movie.title for movie in parse_results(res.json())]
     except Exception as e:
-        print(f"Error fetching movies for genre ID {genre_id}: {e}")
+        logger.warning("Error fetching movies for genre ID %s: %s", genre_id, e)
         return []
 
-async def get_recommendations_for_movie(client: httpx.AsyncClient, movie_id: int) -> List[Dict[str, Any]]:
-    """Gets a list of recommended movies for a specific movie ID with retry logic."""
+async def get_recommendations_for_movie(client: UpstreamClient, movie_id: int, priority: int = INTERACTIVE) -> List[MovieRecord]:
+    """Gets a list of recommended movies for a specific movie ID. Retries are handled by the upstream client."""
     url = f"https://api.themoviedb.org/3/movie/{movie_id}/recommendations"
     params = {"api_key": settings.TMDB_API_KEY, "language": "en-US", "page": 1}
 
-    for attempt in range(3): 
-        try:
-            res = await client.get(url, params=params)
-            res.raise_for_status()
-            results = res.json().get("results", [])
-            return results
-        except (httpx.ConnectError, httpx.ReadTimeout) as e:
-            print(f"Attempt {attempt + 1} failed for get_recommendations_for_movie (ID: {movie_id}): {e}")
-            await asyncio.sleep(1) 
-        except Exception as e:
-            print(f"An unexpected error occurred fetching recommendations for movie ID {movie_id}: {e}")
-            return [] 
-
-    print(f"All attempts failed for get_recommendations_for_movie (ID: {movie_id})")
-    return [] 
+    try:
+        res = await client.get(url, params=params, priority=priority)
+        res.raise_for_status()
+        return parse_results(res.json())
+    except Exception as e:
+        logger.warning("Error fetching recommendations for movie ID %s: %s", movie_id, e)
+        return []
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core import tracing
+from ..core.db import SessionLocal
+from ..crud import history as history_crud
+from . import catalog, movie_bot
+from .taste import genre_ids_from_mask, genre_mask
+from .rate_limit import BACKGROUND
+from .tmdb import MovieRecord
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+GRAPH_PATH = os.getenv("FIREPULSE_MOVIE_GRAPH_PATH", "/tmp/firepulse-movie-graph.npz")
+GRAPH_REFRESH_SECONDS = 24 * 60 * 60
+GRAPH_RETRY_SECONDS = 5 * 60
+# How long the first build waits for the catalog, whose most popular movies are used as extra seeds.
+GRAPH_CATALOG_WAIT_SECONDS = 120
+# Seed movies whose TMDB recommendations are fetched on each build: everything users have
+# watched, topped up with the most popular catalog movies.
+GRAPH_MAX_SEEDS = 3000
+GRAPH_REQUEST_CONCURRENCY = 4
+# Recent watches per user that count as co-watched with each other.
+GRAPH_CO_WATCH_RECENT = 30
+# Edge weights: a TMDB recommendation at rank r adds RECOMMENDATION_WEIGHT / log2(r + 2);
+# each user who watched both movies adds CO_WATCH_WEIGHT in both directions.
+RECOMMENDATION_WEIGHT = 1.0
+CO_WATCH_WEIGHT = 0.5
+GRAPH_MAX_NEIGHBORS = 50
+
+
+class MovieGraph:
+    """
+    An item-item neighbor table in CSR form.
+    Node i is ids[i] (sorted, so lookups are a binary search); its neighbors are
+    indices[indptr[i]:indptr[i + 1]] with the matching weights.
+    """
+
+    COLUMNS = ("ids", "titles", "genre_bits", "indptr", "indices", "weights")
+    STRING_COLUMNS = ("titles",)
+
+    def __init__(self, columns: Dict[str, np.ndarray], built_at: float):
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self.built_at = built_at
+
+    @classmethod
+    def from_edges(cls, edges: Dict[int, Dict[int, float]], nodes: Dict[int, Tuple[str, int]]) -> "MovieGraph":
+        """Builds the graph from {source: {target: weight}}, keeping each source's strongest neighbors."""
+        ids = np.array(sorted(set(nodes) | set(edges)), dtype=np.int64)
+        position = {int(tmdb_id): index for index, tmdb_id in enumerate(ids)}
+
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        indices: List[int] = []
+        weights: List[float] = []
+        for index, tmdb_id in enumerate(ids):
+            neighbors = sorted(edges.get(int(tmdb_id), {}).items(), key=lambda item: item[1], reverse=True)[:GRAPH_MAX_NEIGHBORS]
+            indices.extend(position[target] for target, _ in neighbors)
+            weights.extend(weight for _, weight in neighbors)
+            indptr[index + 1] = len(indices)
+
+        columns = {
+            "ids": ids,
+            "titles": catalog.PackedStrings.from_strings(nodes.get(int(tmdb_id), ("Untitled", 0))[0] for tmdb_id in ids),
+            "genre_bits": np.array([nodes.get(int(tmdb_id), ("Untitled", 0))[1] for tmdb_id in ids], dtype=np.uint32),
+            "indptr": indptr,
+            "indices": np.array(indices, dtype=np.int32),
+            "weights": np.array(weights, dtype=np.float32),
+        }
+        return cls(columns, built_at=time.time())
+
+    def save(self, path: str = GRAPH_PATH):
+        catalog.save_columns(path, self.built_at, {name: getattr(self, name) for name in self.COLUMNS})
+
+    @classmethod
+    def load(cls, path: str = GRAPH_PATH) -> Optional["MovieGraph"]:
+        loaded = catalog.load_columns(path, cls.COLUMNS, cls.STRING_COLUMNS)
+        return cls(*loaded) if loaded is not None else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def _positions(self, tmdb_ids: Iterable[int]) -> np.ndarray:
+        tmdb_ids = np.fromiter(tmdb_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, tmdb_ids)
+        positions = np.minimum(positions, len(self.ids) - 1)
+        return positions[self.ids[positions] == tmdb_ids] if len(self.ids) else positions[:0]
+
+    def neighbors(self, tmdb_id: int) -> List[Tuple[int, float]]:
+        positions = self._positions([tmdb_id])
+        if len(positions) == 0:
+            return []
+        start, end = self.indptr[positions[0]], self.indptr[positions[0] + 1]
+        return [(int(self.ids[index]), float(weight)) for index, weight in zip(self.indices[start:end], self.weights[start:end])]
+
+    def recommend(self, seed_ids: Iterable[int], exclude_ids: Iterable[int] = (), limit: int = 10) -> List[MovieRecord]:
+        """
+        Sums the edge weights from every seed to each neighbor and returns the top `limit`
+        neighbors that are neither seeds nor excluded, best first, with their summed score.
+        """
+        seeds = self._positions(seed_ids)
+        if len(seeds) == 0:
+            return []
+
+        starts, ends = self.indptr[seeds], self.indptr[seeds + 1]
+        lengths = ends - starts
+        if lengths.sum() == 0:
+            return []
+        # Edge offsets of every seed's neighbor slice, concatenated without a Python loop.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        scores = np.bincount(self.indices[offsets], weights=self.weights[offsets], minlength=len(self.ids))
+
+        scores[seeds] = 0
+        excluded = self._positions(exclude_ids)
+        scores[excluded] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        candidates = candidates[np.argsort(scores[candidates])[::-1]]
+        return [
+            MovieRecord(
+                id=int(self.ids[index]),
+                title=self.titles[index],
+                genre_ids=tuple(genre_ids_from_mask(int(self.genre_bits[index]))),
+                score=float(scores[index]),
+            )
+            for index in candidates
+        ]
+
+
+_graph: Optional[MovieGraph] = None
+
+
+def get_graph() -> Optional[MovieGraph]:
+    """Returns the loaded graph, or None until the first load or build has finished."""
+    return _graph
+
+
+def _co_watch_edges(edges: Dict[int, Dict[int, float]], nodes: Dict[int, Tuple[str, int]]):
+    db = SessionLocal()
+    try:
+        watch_lists = history_crud.get_recent_watch_lists(db, per_user=GRAPH_CO_WATCH_RECENT)
+    finally:
+        db.close()
+
+    for watched in watch_lists:
+        for tmdb_id, title, genres in watched:
+            nodes.setdefault(tmdb_id, (title, genre_mask(genres)))
+        for source, _, _ in watched:
+            for target, _, _ in watched:
+                if source != target:
+                    edges[source][target] += CO_WATCH_WEIGHT
+
+
+async def build_graph(client: UpstreamClient, previous: Optional[MovieGraph] = None) -> MovieGraph:
+    """
+    Builds the graph from co-watches in movie_history plus TMDB recommendations for the seed movies.
+    A seed whose recommendations could not be fetched keeps its edges from `previous`.
+    """
+    edges: Dict[int, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+    nodes: Dict[int, Tuple[str, int]] = {}
+    await asyncio.to_thread(_co_watch_edges, edges, nodes)
+
+    seeds = list(nodes)[:GRAPH_MAX_SEEDS]
+    movie_catalog = catalog.get_catalog()
+    if movie_catalog is not None and len(seeds) < GRAPH_MAX_SEEDS:
+        by_popularity = np.argsort(movie_catalog.popularity)[::-1]
+        for movie in movie_catalog.records(by_popularity[:GRAPH_MAX_SEEDS]):
+            if len(seeds) >= GRAPH_MAX_SEEDS:
+                break
+            if movie.id not in nodes:
+                nodes[movie.id] = (movie.title, genre_mask(movie.genre_ids))
+                seeds.append(movie.id)
+
+    semaphore = asyncio.Semaphore(GRAPH_REQUEST_CONCURRENCY)
+
+    async def fetch(tmdb_id: int):
+        async with semaphore:
+            return tmdb_id, await movie_bot.get_recommendations_for_movie(client, tmdb_id, priority=BACKGROUND)
+
+    for tmdb_id, recommendations in await asyncio.gather(*(fetch(tmdb_id) for tmdb_id in seeds)):
+        if not recommendations and previous is not None:
+            for target, weight in previous.neighbors(tmdb_id):
+                edges[tmdb_id][target] = max(edges[tmdb_id][target], weight)
+                positions = previous._positions([target])
+                nodes.setdefault(target, (previous.titles[positions[0]], int(previous.genre_bits[positions[0]])))
+            continue
+        for rank, movie in enumerate(recommendations):
+            nodes.setdefault(movie.id, (movie.title, genre_mask(movie.genre_ids)))
+            edges[tmdb_id][movie.id] += RECOMMENDATION_WEIGHT / math.log2(rank + 2)
+
+    return await asyncio.to_thread(MovieGraph.from_edges, edges, nodes)
+
+
+@tracing.traced("movie_graph.refresh")
+async def refresh_graph(client: UpstreamClient) -> Optional[MovieGraph]:
+    """Rebuilds the graph, keeping the previous one if the build produced no edges."""
+    global _graph
+    graph = await build_graph(client, previous=_graph)
+    if graph.edge_count == 0:
+        logger.warning("Movie graph build produced no edges; keeping the previous graph.")
+        return _graph
+    try:
+        await asyncio.to_thread(graph.save)
+    except OSError as e:
+        logger.warning("Could not persist movie graph: %s", e)
+    _graph = graph
+    logger.info("Movie graph rebuilt with %d movies and %d edges.", len(graph), graph.edge_count, extra={"movies": len(graph), "edges": graph.edge_count})
+    return graph
+
+
+async def load_graph() -> Optional[MovieGraph]:
+    """Loads the graph saved at GRAPH_PATH, unless one is already loaded. Never builds one."""
+    global _graph
+    if _graph is None:
+        try:
+            _graph = await asyncio.to_thread(MovieGraph.load)
+        except Exception as e:
+            logger.warning("Could not load movie graph from %s: %s", GRAPH_PATH, e)
+    return _graph
+
+
+async def run_graph_refresher(client: UpstreamClient):
+    """Loads the graph from disk, then rebuilds it daily. Runs until cancelled."""
+    await load_graph()
+
+    if _graph is None:
+        waited = 0
+        while catalog.get_catalog() is None and waited < GRAPH_CATALOG_WAIT_SECONDS:
+            await asyncio.sleep(5)
+            waited += 5
+
+    while True:
+        if _graph is None or time.time() - _graph.built_at >= GRAPH_REFRESH_SECONDS:
+            try:
+                await refresh_graph(client)
+            except Exception as e:
+                logger.exception("Movie graph build failed: %s", e)
+
+        if _graph is None:
+            delay = GRAPH_RETRY_SECONDS
+        else:
+            delay = max(GRAPH_REFRESH_SECONDS - (time.time() - _graph.built_at), GRAPH_RETRY_SECONDS)
+        await asyncio.sleep(delay)
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# Lower values are served first.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Default time a request may queue for a token before giving up, per priority.
+# Background jobs can afford to wait; interactive requests should rather fall back.
+MAX_WAIT_SECONDS = {INTERACTIVE: 5.0, BACKGROUND: 120.0}
+
+# Set to a file path to share buckets between worker processes on one machine.
+RATE_LIMIT_DB_PATH = os.getenv("FIREPULSE_RATE_LIMIT_DB")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Sustained requests per second, and how many may be sent at once after an idle period."""
+    rate: float
+    burst: int
+
+
+# Conservative limits, below what each provider documents or enforces in practice.
+RATE_LIMITS: Dict[str, RateLimit] = {
+    "api.themoviedb.org": RateLimit(rate=35.0, burst=40),
+    "api.spotify.com": RateLimit(rate=8.0, burst=15),
+    "accounts.spotify.com": RateLimit(rate=1.0, burst=3),
+    "generativelanguage.googleapis.com": RateLimit(rate=0.25, burst=4),
+    "translate.google.com": RateLimit(rate=3.0, burst=5),
+}
+
+
+class RateLimitTimeout(httpx.RequestError):
+    """Raised when no token became available before the request's deadline."""
+
+
+class SharedBucketStore:
+    """
+    Token buckets kept in a local SQLite file, so all workers on a host draw from the same budget.
+    Each take is one short IMMEDIATE transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, key: str, limit: RateLimit, change) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = float(limit.burst) if row is None else min(limit.burst, row[0] + (now - row[1]) * limit.rate)
+            tokens, result = change(tokens)
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def try_take(self, key: str, limit: RateLimit) -> float:
+        """Takes a token and returns 0, or returns how long until one is available."""
+        def take(tokens):
+            if tokens >= 1:
+                return tokens - 1, 0.0
+            return tokens, (1 - tokens) / limit.rate
+        return self._update(key, limit, take)
+
+    def penalize(self, key: str, limit: RateLimit, seconds: float):
+        """Empties the bucket so the next token only appears after `seconds`."""
+        self._update(key, limit, lambda tokens: (min(tokens, 1 - seconds * limit.rate), None))
+
+
+class TokenBucket:
+    """
+    An async token bucket with a priority queue of waiters.
+    A request with a free token and nobody of equal or higher priority queued goes straight through;
+    otherwise it queues and is woken in (priority, arrival) order as tokens refill.
+    """
+
+    def __init__(self, key: str, limit: RateLimit, store: Optional[SharedBucketStore] = None):
+        self.key = key
+        self.limit = limit
+        self.store = store
+        self._tokens = float(limit.burst)
+        self._updated_at = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._pump_task: Optional[asyncio.Task] = None
+        self.throttled = 0
+        self.timeouts = 0
+
+    def _try_take_local(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.limit.burst, self._tokens + (now - self._updated_at) * self.limit.rate)
+        self._updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.limit.rate
+
+    async def _try_take(self) -> float:
+        if self.store is None:
+            return self._try_take_local()
+        return await asyncio.to_thread(self.store.try_take, self.key, self.limit)
+
+    def _refund(self):
+        if self.store is None:
+            self._tokens = min(self.limit.burst, self._tokens + 1)
+
+    async def acquire(self, priority: int = INTERACTIVE, timeout: Optional[float] = None):
+        """Waits for a token for at most `timeout` seconds (default per priority), else raises RateLimitTimeout."""
+        if not any(waiter[0] <= priority for waiter in self._waiters) and await self._try_take() == 0:
+            return
+
+        self.throttled += 1
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+
+        if timeout is None:
+            timeout = MAX_WAIT_SECONDS.get(priority)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return
+            future.cancel()
+            self.timeouts += 1
+            raise RateLimitTimeout(f"Rate limit for {self.key} not available within {timeout}s.")
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    async def _pump(self):
+        while self._waiters:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = await self._try_take()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            # A higher-priority waiter may have arrived while we were taking the token.
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                self._refund()
+                return
+            heapq.heappop(self._waiters)[2].set_result(None)
+
+    async def penalize(self, seconds: float):
+        """Stops handing out tokens for `seconds`, e.g. after a 429 with Retry-After."""
+        if self.store is None:
+            now = time.monotonic()
+            self._tokens = min(self.limit.burst, self._tokens + (now - self._updated_at) * self.limit.rate, 1 - seconds * self.limit.rate)
+            self._updated_at = now
+        else:
+            await asyncio.to_thread(self.store.penalize, self.key, self.limit, seconds)
+
+    def status(self) -> Dict:
+        return {"queued": sum(1 for waiter in self._waiters if not waiter[2].done()), "throttled": self.throttled, "timeouts": self.timeouts}
+
+
+class RateGovernor:
+    """One TokenBucket per upstream host and API key, created on first use."""
+
+    def __init__(self, limits: Optional[Dict[str, RateLimit]] = None, store_path: Optional[str] = RATE_LIMIT_DB_PATH):
+        self.limits = {**RATE_LIMITS, **(limits or {})}
+        self.store = SharedBucketStore(store_path) if store_path else None
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, host: str, api_key: Optional[str] = None) -> Optional[TokenBucket]:
+        """Returns the bucket for a host, or None if the host is not rate limited."""
+        limit = self.limits.get(host)
+        if limit is None:
+            return None
+        key = f"{host}:{hashlib.sha256(api_key.encode()).hexdigest()[:8]}" if api_key else host
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(key, limit, self.store)
+        return bucket
+
+    def status(self) -> Dict[str, Dict]:
+        return {key: bucket.status() for key, bucket in self._buckets.items()}
@@ -1,10 +1,19 @@
+import logging
 import httpx
 import random  
 from typing import List, Optional
 from fastapi import Request
 from ..services import spotify_helper
+from .cache import TwoTierCache
+from .upstream import UpstreamClient
 import random
 
+logger = logging.getLogger(__name__)
+
+# "name by artist" lists per Spotify search query; the caller shuffles its own copy.
+SPOTIFY_SEARCH_TTL_SECONDS = 6 * 60 * 60
+spotify_search_cache = TwoTierCache("spotify", ttl=SPOTIFY_SEARCH_TTL_SECONDS, maxsize=512, name="spotify_search")
+
 SONG_MOOD_KEYWORDS = {
     "happy": ["happy", "joy", "dance", "party", "energetic", "fun"],
     "sad": ["sad", "cry", "heartbreak", "pain", "lonely", "melancholy"],
@@ -26,9 +35,33 @@ def extract_song_mood(text: str) -> Optional[str]:
     best = max(scores, key=scores.get)
     return best if scores[best] > 0 else None
 
+async def search_tracks(client: UpstreamClient, token: str, query: str, limit: int) -> List[str]:
+    """Searches Spotify tracks and returns a fresh list of "name by artist" strings, cached per query."""
+    cache_key = f"search:{query.lower()}:{limit}"
+    cached = await spotify_search_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"q": query, "type": "track", "limit": limit}
+    url = "https://api.spotify.com/v1/search"
+
+    res = await client.get(url, headers=headers, params=params)
+    res.raise_for_status()
+
+    songs = []
+    for item in res.json().get("tracks", {}).get("items", []):
+        name = item.get("name", "Untitled")
+        artist = item.get("artists", [{}])[0].get("name", "Unknown Artist")
+        songs.append(f"{name} by {artist}")
+
+    if songs:
+        await spotify_search_cache.set(cache_key, songs)
+    return list(songs)
+
 async def get_songs_by_mood(request: Request, mood: str, language_hint: Optional[str] = None, limit: int = 10) -> List[str]:
     """Asynchronously gets song recommendations from Spotify based on mood."""
-    client: httpx.AsyncClient = request.app.state.httpx_client
+    client: UpstreamClient = request.app.state.upstream
     token = await spotify_helper.get_spotify_token(request)
     if not token:
         return ["Failed to authenticate with Spotify."]
@@ -37,19 +70,8 @@ async def get_songs_by_mood(request: Request, mood: str, language_hint: Optional
     if language_hint:
         query += f" {language_hint}"
 
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {"q": query, "type": "track", "limit": limit}
-    url = "https://api.spotify.com/v1/search"
-
     try:
-        res = await client.get(url, headers=headers, params=params)
-        res.raise_for_status()
-        
-        songs = []
-        for item in res.json().get("tracks", {}).get("items", []):
-            name = item.get("name", "Untitled")
-            artist = item.get("artists", [{}])[0].get("name", "Unknown Artist")
-            songs.append(f"{name} by {artist}")
+        songs = await search_tracks(client, token, query, limit)
         
         if songs:
             random.shuffle(songs) 
@@ -58,30 +80,19 @@ async def get_songs_by_mood(request: Request, mood: str, language_hint: Optional
         return ["No songs found for that mood."]
         
     except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        print(f"Error fetching songs by mood from Spotify: {e}")
+        logger.warning("Error fetching songs by mood from Spotify: %s", e)
         return ["Failed to fetch songs from Spotify."]
 
 
 async def get_songs_by_artist(request: Request, artist_name: str, limit: int = 10) -> List[str]:
     """Asynchronously gets songs by a specific artist from Spotify."""
-    client: httpx.AsyncClient = request.app.state.httpx_client
+    client: UpstreamClient = request.app.state.upstream
     token = await spotify_helper.get_spotify_token(request)
     if not token:
         return ["Failed to authenticate with Spotify."]
 
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {"q": f"artist:{artist_name}", "type": "track", "limit": limit}
-    url = "https://api.spotify.com/v1/search"
-
     try:
-        res = await client.get(url, headers=headers, params=params)
-        res.raise_for_status()
-
-        songs = []
-        for item in res.json().get("tracks", {}).get("items", []):
-            name = item.get("name", "Untitled")
-            artist = item.get("artists", [{}])[0].get("name", "Unknown Artist")
-            songs.append(f"{name} by {artist}")
+        songs = await search_tracks(client, token, f"artist:{artist_name}", limit)
 
         if songs:
             
@@ -91,5 +102,5 @@ async def get_songs_by_artist(request: Request, artist_name: str, limit: int = 1
         return [] 
 
     except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        print(f"Error fetching songs by artist from Spotify: {e}")
-        return ["Failed to fetch songs from Spotify."]
\ No newline at end of file
+        logger.warning("Error fetching songs by artist from Spotify: %s", e)
+        return ["Failed to fetch songs from Spotify."]
@@ -1,20 +1,32 @@
+import logging
+import time
 import httpx
 import base64
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Request
 
 from ..core.config import settings
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+# Client-credentials tokens last an hour; they are refreshed this long before Spotify expires them.
+SPOTIFY_TOKEN_EXPIRY_MARGIN_SECONDS = 60
+# (token, expires_at on the monotonic clock). A bearer credential, so it stays in this process and is never
+# written to the shared cache backend, which other instances can read.
+_spotify_token: Optional[Tuple[str, float]] = None
 
 async def get_spotify_token(request: Request) -> Optional[str]:
     """
     Asynchronously gets a Spotify API access token.
-    It intelligently caches the token in the app's state to avoid refetching on every call.
+    The token is cached in this worker until shortly before it expires.
     """
-    client: httpx.AsyncClient = request.app.state.httpx_client
+    global _spotify_token
+    client: UpstreamClient = request.app.state.upstream
     
    
-    if hasattr(request.app.state, "spotify_token") and request.app.state.spotify_token:
-        return request.app.state.spotify_token
+    if _spotify_token is not None and _spotify_token[1] > time.monotonic():
+        return _spotify_token[0]
 
     
     url = "https://accounts.spotify.com/api/token"
@@ -34,17 +46,17 @@ async def get_spotify_token(request: Request) -> Optional[str]:
         response = await client.post(url, headers=headers, data=data)
         response.raise_for_status() 
         
-        token = response.json().get("access_token")
+        payload = response.json()
+        token = payload.get("access_token")
         
         
-        request.app.state.spotify_token = token
+        if token:
+            expires_in = payload.get("expires_in", 3600)
+            _spotify_token = (token, time.monotonic() + max(expires_in - SPOTIFY_TOKEN_EXPIRY_MARGIN_SECONDS, 1))
         
-        print("✅ Successfully fetched and cached new Spotify token.")
+        logger.info("Fetched and cached a new Spotify token.")
         return token
         
     except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        print(f"❌ Error getting Spotify token: {e}")
-        
-        if hasattr(request.app.state, "spotify_token"):
-            del request.app.state.spotify_token
+        logger.error("Error getting Spotify token: %s", e)
         return None
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from ..core.metrics import CACHE_LOOKUPS
+from .cache import SharedNamespace
+
+logger = logging.getLogger(__name__)
+
+
+class SWRCache:
+    """
+    An in-process stale-while-revalidate cache.
+
+    - Younger than soft_ttl: served from the cache.
+    - Between soft_ttl and hard_ttl: served from the cache immediately while one background
+      task per key reloads it.
+    - Older than hard_ttl, or missing: the caller waits for a load; concurrent callers share it.
+    - If that load fails or returns an invalid value (e.g. the empty list a service returns
+      when the upstream errors), an entry up to stale_if_error_ttl old is served instead.
+
+    With a `namespace`, entries are also written to the shared cache backend (kept for stale_if_error_ttl)
+    and a worker that has no entry yet starts from the shared one, at the age it was stored with.
+    `decode` turns a value read back from the shared backend (plain JSON types) into what the loader returns.
+    """
+
+    def __init__(
+        self, name: str, soft_ttl: float, hard_ttl: float, stale_if_error_ttl: Optional[float] = None,
+        maxsize: int = 1024, namespace: Optional[str] = None, decode: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.name = name
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.stale_if_error_ttl = max(stale_if_error_ttl or hard_ttl, hard_ttl)
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._loads: Dict[Hashable, asyncio.Task] = {}
+        self.shared = SharedNamespace(namespace) if namespace else None
+        self.decode = decode
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "stale_on_error": 0, "refresh_errors": 0, "shared_hits": 0}
+
+    def _count(self, outcome: str):
+        self.stats[outcome] += 1
+        CACHE_LOOKUPS.labels(self.name, outcome).inc()
+
+    def _store(self, key: Hashable, value: Any, stored_at: float):
+        # Wall-clock time, so ages stay meaningful for entries shared between processes.
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _shared_key(self, key: Hashable) -> str:
+        return f"{self.name}:{key}".replace(" ", "_")
+
+    async def _load_shared(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        stored = await self.shared.get(self._shared_key(key))
+        if not stored or time.time() - stored["t"] >= self.stale_if_error_ttl:
+            return None
+        self.stats["shared_hits"] += 1
+        CACHE_LOOKUPS.labels(self.name, "shared_hit").inc()
+        value = self.decode(stored["v"]) if self.decode else stored["v"]
+        self._store(key, value, stored["t"])
+        return value, stored["t"]
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], is_valid: Callable[[Any], bool]) -> asyncio.Task:
+        """Starts a load for `key` unless one is already running, and returns it."""
+        task = self._loads.get(key)
+        if task is None:
+            async def run():
+                value = await loader()
+                if is_valid(value):
+                    stored_at = time.time()
+                    self._store(key, value, stored_at)
+                    if self.shared is not None:
+                        await self.shared.set(self._shared_key(key), {"v": value, "t": stored_at}, self.stale_if_error_ttl)
+                return value
+
+            task = self._loads[key] = asyncio.create_task(run())
+            task.add_done_callback(lambda done: self._loads.pop(key, None) if self._loads.get(key) is done else None)
+        return task
+
+    def _refresh_in_background(self, key: Hashable, loader, is_valid):
+        def log_failure(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                self.stats["refresh_errors"] += 1
+                logger.warning("Background refresh of %s cache entry %r failed: %s", self.name, key, task.exception())
+
+        if key not in self._loads:
+            self._load(key, loader, is_valid).add_done_callback(log_failure)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]], is_valid: Callable[[Any], bool] = bool) -> Any:
+        entry = self._entries.get(key)
+        if entry is None and self.shared is not None and key not in self._loads:
+            entry = await self._load_shared(key)
+        age = time.time() - entry[1] if entry else None
+
+        if entry and age < self.soft_ttl:
+            self._count("fresh")
+            self._entries.move_to_end(key)
+            return entry[0]
+        if entry and age < self.hard_ttl:
+            self._count("stale")
+            self._refresh_in_background(key, loader, is_valid)
+            return entry[0]
+
+        self._count("miss")
+        can_serve_stale = entry is not None and age < self.stale_if_error_ttl
+        try:
+            value = await asyncio.shield(self._load(key, loader, is_valid))
+        except Exception as e:
+            if not can_serve_stale:
+                raise
+            logger.warning("Serving stale %s cache entry %r after error: %s", self.name, key, e)
+            self._count("stale_on_error")
+            return entry[0]
+
+        if not is_valid(value) and can_serve_stale:
+            self._count("stale_on_error")
+            return entry[0]
+        return value
+
+    def clear(self):
+        self._entries.clear()
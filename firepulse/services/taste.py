@@ -0,0 +1,201 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..crud import history as history_crud
+from .swr_cache import SWRCache
+from .tmdb import MovieRecord, parse_results, records_from_dicts
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+# TMDB movie genre ids; a taste vector holds one weight per genre in this order.
+TMDB_GENRES = {
+    28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime",
+    99: "Documentary", 18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History",
+    27: "Horror", 10402: "Music", 9648: "Mystery", 10749: "Romance", 878: "Science Fiction",
+    10770: "TV Movie", 53: "Thriller", 10752: "War", 37: "Western",
+}
+TMDB_GENRE_IDS = tuple(TMDB_GENRES)
+GENRE_INDEX = {genre_id: index for index, genre_id in enumerate(TMDB_GENRE_IDS)}
+
+# A watch counts half as much after this many days.
+TASTE_HALF_LIFE_DAYS = 90
+# Share of a candidate's score that comes from popularity rather than genre fit.
+POPULARITY_WEIGHT = 0.15
+# Share of a graph neighbor's score that comes from how strongly it is linked to the user's recent watches.
+GRAPH_WEIGHT = 0.5
+# Small random jitter so repeated requests do not always return the same list.
+SCORE_JITTER = 0.05
+
+# The candidate pool is refreshed in the background after the soft TTL and refetched inline after the hard TTL.
+CANDIDATE_POOL_SOFT_TTL_SECONDS = 60 * 60
+CANDIDATE_POOL_HARD_TTL_SECONDS = 6 * 60 * 60
+CANDIDATE_POOL_STALE_IF_ERROR_SECONDS = 24 * 60 * 60
+CANDIDATE_POOL_SOURCES = [("popular", page) for page in range(1, 6)] + [("top_rated", page) for page in range(1, 4)]
+
+
+def genre_vector(genre_ids: Iterable[int]) -> np.ndarray:
+    """One watch of a movie: its known genres share a total weight of 1."""
+    vector = np.zeros(len(TMDB_GENRE_IDS), dtype=np.float64)
+    indices = [GENRE_INDEX[genre_id] for genre_id in genre_ids or [] if genre_id in GENRE_INDEX]
+    if indices:
+        vector[indices] = 1.0 / len(indices)
+    return vector
+
+
+def genre_mask(genre_ids: Iterable[int]) -> int:
+    """Packs genre ids into a bitmask over TMDB_GENRE_IDS; unknown ids are ignored."""
+    mask = 0
+    for genre_id in genre_ids or []:
+        if genre_id in GENRE_INDEX:
+            mask |= 1 << GENRE_INDEX[genre_id]
+    return mask
+
+
+def genre_ids_from_mask(mask: int) -> List[int]:
+    return [genre_id for position, genre_id in enumerate(TMDB_GENRE_IDS) if mask >> position & 1]
+
+
+def decay_factor(since: Optional[datetime], now: datetime) -> float:
+    if since is None:
+        return 1.0
+    elapsed_days = max((now - since).total_seconds(), 0.0) / 86400
+    return 0.5 ** (elapsed_days / TASTE_HALF_LIFE_DAYS)
+
+
+def updated_taste(weights: Optional[Sequence[float]], updated_at: Optional[datetime], genre_lists: List[List[int]], now: datetime) -> np.ndarray:
+    """Decays an existing taste vector to `now` and adds the genres of newly watched movies."""
+    taste = np.zeros(len(TMDB_GENRE_IDS), dtype=np.float64)
+    if weights is not None and len(weights) == len(TMDB_GENRE_IDS):
+        taste += np.asarray(weights, dtype=np.float64) * decay_factor(updated_at, now)
+    for genre_ids in genre_lists:
+        taste += genre_vector(genre_ids)
+    return taste
+
+
+def taste_from_history(rows, now: datetime) -> np.ndarray:
+    """Builds a taste vector from history rows (with genres and watched_at), decayed by each row's age."""
+    taste = np.zeros(len(TMDB_GENRE_IDS), dtype=np.float64)
+    for row in rows:
+        taste += genre_vector(row.genres) * decay_factor(row.watched_at, now)
+    return taste
+
+
+def add_watches_to_profile(db: Session, user_id: int, genre_lists: List[List[int]]):
+    """
+    Decays a user's stored taste vector to now and adds newly watched genres. Users without a profile are left
+    without one: the next recommendations request builds it from their whole recent history, new watches included.
+    """
+    if not genre_lists:
+        return
+    profile = history_crud.get_taste_profile(db, user_id=user_id, for_update=True)
+    if profile is None:
+        return
+    now = utcnow()
+    weights = updated_taste(profile.weights, profile.updated_at, genre_lists, now)
+    history_crud.save_taste_profile(db, user_id=user_id, weights=weights, updated_at=now)
+
+
+def top_genre_names(taste: np.ndarray, limit: int = 2) -> List[str]:
+    order = np.argsort(taste)[::-1][:limit]
+    return [TMDB_GENRES[TMDB_GENRE_IDS[index]] for index in order if taste[index] > 0]
+
+
+def genre_matrix(candidates: List[MovieRecord]) -> np.ndarray:
+    """Rows are candidates, columns are genres; each row sums to 1 like genre_vector."""
+    matrix = np.zeros((len(candidates), len(TMDB_GENRE_IDS)), dtype=np.float64)
+    for row, movie in enumerate(candidates):
+        indices = [GENRE_INDEX[genre_id] for genre_id in movie.genre_ids if genre_id in GENRE_INDEX]
+        if indices:
+            matrix[row, indices] = 1.0 / len(indices)
+    return matrix
+
+
+def _scores(taste: np.ndarray, genres: np.ndarray, prior: np.ndarray, prior_weight: float = POPULARITY_WEIGHT) -> np.ndarray:
+    """Blends genre fit with a per-candidate prior (popularity, graph score), log-scaled to [0, 1]."""
+    norm = np.linalg.norm(taste)
+    taste_unit = taste / norm if norm else taste
+    prior = np.log1p(prior.astype(np.float64))
+    if prior.size and prior.max() > 0:
+        prior /= prior.max()
+    scores = (1 - prior_weight) * (genres @ taste_unit) + prior_weight * prior
+    return scores + np.random.uniform(0, SCORE_JITTER, size=len(scores))
+
+
+def rank_candidates(taste: np.ndarray, candidates: List[MovieRecord], exclude_ids: Iterable[int], limit: int = 10) -> List[MovieRecord]:
+    """Scores every candidate against the taste vector with one matrix-vector product and returns the best unwatched ones."""
+    if not candidates:
+        return []
+
+    popularity = np.array([movie.popularity for movie in candidates], dtype=np.float64)
+    scores = _scores(taste, genre_matrix(candidates), popularity)
+
+    excluded = set(exclude_ids)
+    scores[[movie.id in excluded for movie in candidates]] = -np.inf
+
+    order = np.argsort(scores)[::-1][:limit]
+    return [candidates[index] for index in order if np.isfinite(scores[index])]
+
+
+def rank_neighbors(taste: np.ndarray, neighbors: List[MovieRecord], limit: int = 10) -> List[MovieRecord]:
+    """Re-ranks movie_graph neighbors (which carry a score) by taste fit blended with that score."""
+    if not neighbors:
+        return []
+
+    graph_scores = np.array([movie.score for movie in neighbors], dtype=np.float64)
+    scores = _scores(taste, genre_matrix(neighbors), graph_scores, prior_weight=GRAPH_WEIGHT)
+    order = np.argsort(scores)[::-1][:limit]
+    return [neighbors[index] for index in order]
+
+
+def rank_catalog(taste: np.ndarray, catalog, exclude_ids: Iterable[int], limit: int = 10) -> List[MovieRecord]:
+    """Like rank_candidates, but scores every movie in a MovieCatalog using its precomputed genre matrix."""
+    if len(catalog) == 0:
+        return []
+
+    scores = _scores(taste, catalog.genre_matrix(), catalog.popularity)
+    exclude_ids = list(exclude_ids)
+    if exclude_ids:
+        scores[np.isin(catalog.ids, np.array(exclude_ids, dtype=np.int64))] = -np.inf
+
+    top = np.argpartition(scores, -limit)[-limit:] if len(scores) > limit else np.arange(len(scores))
+    top = top[np.argsort(scores[top])[::-1]]
+    return catalog.records([index for index in top if np.isfinite(scores[index])])
+
+
+candidate_pool_cache = SWRCache(
+    "candidate pool", soft_ttl=CANDIDATE_POOL_SOFT_TTL_SECONDS, hard_ttl=CANDIDATE_POOL_HARD_TTL_SECONDS,
+    stale_if_error_ttl=CANDIDATE_POOL_STALE_IF_ERROR_SECONDS, namespace="tmdb", decode=records_from_dicts,
+)
+
+
+async def _fetch_candidates(client: UpstreamClient, list_name: str, page: int) -> List[MovieRecord]:
+    url = f"https://api.themoviedb.org/3/movie/{list_name}"
+    params = {"api_key": settings.TMDB_API_KEY, "language": "en-US", "page": page}
+    try:
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        return parse_results(response.json())
+    except Exception as e:
+        logger.warning("Error fetching %s candidates (page %s): %s", list_name, page, e)
+        return []
+
+
+async def _load_candidate_pool(client: UpstreamClient) -> List[MovieRecord]:
+    pages = await asyncio.gather(*(_fetch_candidates(client, list_name, page) for list_name, page in CANDIDATE_POOL_SOURCES))
+    return list({movie.id: movie for page in pages for movie in page}.values())
+
+
+async def get_candidate_pool(client: UpstreamClient) -> List[MovieRecord]:
+    """Returns a cached pool of popular and top-rated movies, refreshed in the background once it goes stale."""
+    return await candidate_pool_cache.get("pool", lambda: _load_candidate_pool(client))
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
@@ -0,0 +1,71 @@
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TMDB_POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500"
+
+
+@dataclass(slots=True)
+class MovieRecord:
+    """
+    The fields of a TMDB movie that FirePulse uses. TMDB results are projected to this as soon as they are
+    parsed, so caches and responses never carry backdrops, adult/video flags or other unused fields.
+    """
+    id: int
+    title: str
+    genre_ids: Tuple[int, ...] = ()
+    original_language: Optional[str] = None
+    overview: str = ""
+    poster_path: Optional[str] = None
+    release_date: Optional[str] = None
+    popularity: float = 0.0
+    vote_average: float = 0.0
+    vote_count: int = 0
+    # Set on movie graph neighbors: how strongly they are linked to the seed movies.
+    score: Optional[float] = None
+
+    @classmethod
+    def from_tmdb(cls, movie: Dict[str, Any]) -> Optional["MovieRecord"]:
+        """Projects a TMDB movie object; returns None for entries without an id."""
+        if not movie.get("id"):
+            return None
+        return cls(
+            id=movie["id"],
+            title=movie.get("title") or "Untitled",
+            genre_ids=tuple(movie.get("genre_ids") or ()),
+            original_language=movie.get("original_language") or None,
+            overview=movie.get("overview") or "",
+            poster_path=movie.get("poster_path") or None,
+            release_date=movie.get("release_date") or None,
+            popularity=movie.get("popularity") or 0.0,
+            vote_average=movie.get("vote_average") or 0.0,
+            vote_count=movie.get("vote_count") or 0,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MovieRecord":
+        """Rebuilds a record from to_dict() output, e.g. one read back from the shared cache."""
+        record = cls(**{name: data[name] for name in _FIELD_NAMES if name in data})
+        record.genre_ids = tuple(record.genre_ids)
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        movie = {name: getattr(self, name) for name in _FIELD_NAMES}
+        if self.score is None:
+            del movie["score"]
+        return movie
+
+    @property
+    def poster_url(self) -> Optional[str]:
+        return f"{TMDB_POSTER_BASE_URL}{self.poster_path}" if self.poster_path else None
+
+
+_FIELD_NAMES = tuple(field.name for field in fields(MovieRecord))
+
+
+def parse_results(payload: Dict[str, Any]) -> List[MovieRecord]:
+    """The "results" of a TMDB list response (discover, search, recommendations, ...) as MovieRecords."""
+    return [record for record in map(MovieRecord.from_tmdb, payload.get("results") or []) if record is not None]
+
+
+def records_from_dicts(movies: Iterable[Dict[str, Any]]) -> List[MovieRecord]:
+    return [MovieRecord.from_dict(movie) for movie in movies]
@@ -0,0 +1,51 @@
+import json
+import logging
+from typing import List, Dict, Any
+from ..core.config import settings
+from .rate_limit import INTERACTIVE
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent"
+
+
+async def generate_trivia_questions(client: UpstreamClient, topic: str, count: int = 1, priority: int = INTERACTIVE) -> List[Dict[str, Any]]:
+    """
+    Generates `count` multiple-choice trivia questions about a topic with a single Gemini request.
+    Returns an empty list if the request fails or the response cannot be parsed.
+    """
+    prompt = f'''
+    Generate {count} unique and factually accurate trivia questions about the topic: "{topic}".
+    Each question should be multiple-choice and about a different fact. Before generating, double-check the factual accuracy of each question and its correct answer.
+    Provide your response STRICTLY in JSON format as a list with the following structure:
+    [
+      {{
+        "question_text": "The trivia question text?",
+        "answers": [
+          {{"text": "An incorrect answer", "is_correct": false}},
+          {{"text": "The single correct answer", "is_correct": true}},
+          {{"text": "Another incorrect answer", "is_correct": false}},
+          {{"text": "A third incorrect answer", "is_correct": false}}
+        ]
+      }}
+    ]
+    For every question, ensure exactly one answer has "is_correct": true. Ensure there are exactly four distinct options. Do not repeat answers or questions.'''
+
+    api_url_with_key = f"{GEMINI_API_BASE_URL}?key={settings.GEMINI_API_KEY}"
+    payload = {"contents": [{"parts": [{"text": prompt}]}], "generationConfig": {"responseMimeType": "application/json"}}
+    try:
+        response = await client.post(api_url_with_key, json=payload, priority=priority)
+        response.raise_for_status()
+        result_json = response.json()
+        if not result_json.get("candidates"):
+            logger.warning("Invalid response structure from Gemini API for topic '%s'.", topic)
+            return []
+        trivia_data = json.loads(result_json["candidates"][0]["content"]["parts"][0]["text"])
+    except Exception as e:
+        logger.warning("An unexpected error occurred during trivia generation for '%s': %s", topic, e)
+        return []
+
+    if isinstance(trivia_data, dict):
+        trivia_data = trivia_data.get("questions", [trivia_data])
+    return [question for question in trivia_data if isinstance(question, dict) and question.get("answers")]
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Dict, Optional, Set
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..crud import trivia as trivia_crud
+from ..services import trivia_bot
+from .rate_limit import BACKGROUND
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+# Topics kept stocked from startup, before any demand has been observed.
+TRIVIA_POOL_TOPICS = ["movies", "music", "bollywood", "tv shows"]
+# A refill starts when a topic has fewer than LOW_WATER unanswered questions and stops at TARGET.
+TRIVIA_POOL_LOW_WATER = 5
+TRIVIA_POOL_TARGET = 20
+# Questions requested from Gemini per call.
+TRIVIA_POOL_BATCH_SIZE = 5
+# Gemini requests the pool may have in flight at once.
+TRIVIA_POOL_MAX_CONCURRENCY = 2
+# How often the most requested topics are re-checked, and how many of them.
+TRIVIA_POOL_CHECK_INTERVAL_SECONDS = 600
+TRIVIA_POOL_POPULAR_TOPICS = 10
+# A topic is refilled at most once per cooldown, however many players run low on it.
+TRIVIA_POOL_REFILL_COOLDOWN_SECONDS = 60
+# Topics whose demand is tracked; beyond this the least requested half is forgotten.
+# Demand is also halved every check interval, so old spikes fade.
+TRIVIA_POOL_MAX_TRACKED_TOPICS = 1000
+
+
+class TriviaQuestionPool:
+    """
+    Keeps a stock of trivia questions per topic so /trivia/start rarely waits on Gemini.
+    Refills run as background tasks, at most one per topic at a time and per cooldown, with bounded
+    Gemini concurrency, so generation grows with the number of topics rather than players.
+    """
+
+    def __init__(self, client: UpstreamClient):
+        self.client = client
+        self.demand: Counter = Counter()
+        self._topics: Dict[str, str] = {}
+        self._semaphore = asyncio.Semaphore(TRIVIA_POOL_MAX_CONCURRENCY)
+        self._refilling: Set[str] = set()
+        self._last_refill: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._watcher: Optional[asyncio.Task] = None
+        self.running = False
+
+    def start(self):
+        """
+        Stocks the configured topics and starts the periodic check of popular topics.
+        Until then refills are not scheduled, and /trivia/start generates questions inline when it runs out.
+        """
+        self.running = True
+        for topic in TRIVIA_POOL_TOPICS:
+            self.request_refill(topic)
+        self._watcher = asyncio.create_task(self._watch_popular_topics())
+
+    async def close(self):
+        self.running = False
+        tasks = list(self._tasks)
+        if self._watcher:
+            tasks.append(self._watcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def record_demand(self, topic: str):
+        category_key = trivia_crud.normalize_category(topic)
+        if category_key not in self.demand and len(self.demand) >= TRIVIA_POOL_MAX_TRACKED_TOPICS:
+            self._keep_topics(dict(self.demand.most_common(TRIVIA_POOL_MAX_TRACKED_TOPICS // 2)))
+        self.demand[category_key] += 1
+        self._topics.setdefault(category_key, topic)
+
+    def _keep_topics(self, demand: Dict[str, int]):
+        self.demand = Counter(demand)
+        self._topics = {key: topic for key, topic in self._topics.items() if key in self.demand}
+        self._last_refill = {key: at for key, at in self._last_refill.items() if key in self.demand}
+
+    def _decay_demand(self):
+        self._keep_topics({key: count // 2 for key, count in self.demand.items() if count // 2})
+
+    def request_refill(self, topic: str, user_id: Optional[int] = None):
+        """
+        Schedules a refill check for a topic without waiting for it.
+        With a user_id, stock is counted as the questions that user has not answered yet. The check is
+        skipped while the topic is already refilling or was refilled within the cooldown, whoever asks.
+        """
+        if not self.running or not settings.GEMINI_API_KEY:
+            return
+        category_key = trivia_crud.normalize_category(topic)
+        if category_key in self._refilling:
+            return
+        if time.monotonic() - self._last_refill.get(category_key, float("-inf")) < TRIVIA_POOL_REFILL_COOLDOWN_SECONDS:
+            return
+        self._refilling.add(category_key)
+        task = asyncio.create_task(self._refill(topic, category_key, user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._refilling.discard(category_key))
+
+    async def _refill(self, topic: str, category_key: str, user_id: Optional[int]):
+        try:
+            stock = await asyncio.to_thread(_count_stock, topic, user_id)
+            if stock >= TRIVIA_POOL_LOW_WATER:
+                return
+
+            self._last_refill[category_key] = time.monotonic()
+            while stock < TRIVIA_POOL_TARGET:
+                async with self._semaphore:
+                    questions = await trivia_bot.generate_trivia_questions(self.client, topic, count=TRIVIA_POOL_BATCH_SIZE, priority=BACKGROUND)
+                if not questions:
+                    return
+
+                new_stock = await asyncio.to_thread(_store_and_count, topic, questions, user_id)
+                if new_stock <= stock:
+                    # Gemini only returned questions we already had; try again on the next request.
+                    return
+                stock = new_stock
+            logger.info("Trivia pool stocked '%s' with %d questions.", topic, stock, extra={"topic": topic, "stock": stock})
+        except Exception as e:
+            logger.warning("Error refilling trivia pool for '%s': %s", topic, e)
+
+    async def _watch_popular_topics(self):
+        while True:
+            await asyncio.sleep(TRIVIA_POOL_CHECK_INTERVAL_SECONDS)
+            for category_key, _ in self.demand.most_common(TRIVIA_POOL_POPULAR_TOPICS):
+                self.request_refill(self._topics[category_key])
+            self._decay_demand()
+
+
+# The pool's database work runs in worker threads, each with its own session, off the event loop.
+
+def _count_stock(topic: str, user_id: Optional[int]) -> int:
+    db = SessionLocal()
+    try:
+        return trivia_crud.count_unanswered_questions(db, topic, user_id=user_id, limit=TRIVIA_POOL_TARGET)
+    finally:
+        db.close()
+
+
+def _store_and_count(topic: str, questions, user_id: Optional[int]) -> int:
+    db = SessionLocal()
+    try:
+        trivia_crud.bulk_create_trivia_questions(db, questions, category=topic)
+        return trivia_crud.count_unanswered_questions(db, topic, user_id=user_id, limit=TRIVIA_POOL_TARGET)
+    finally:
+        db.close()
@@ -0,0 +1,336 @@
+import asyncio
+import functools
+import logging
+import os
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+import httpx
+
+from ..core import metrics, tracing
+from .rate_limit import INTERACTIVE, RateGovernor, RateLimitTimeout, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Connection pool of the shared client. Each host's concurrency is further capped by its policy.
+HTTP_MAX_CONNECTIONS = int(os.getenv("FIREPULSE_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("FIREPULSE_HTTP_MAX_KEEPALIVE_CONNECTIONS", "40"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("FIREPULSE_HTTP_KEEPALIVE_EXPIRY_SECONDS", "90"))
+# How long a request may wait for a free connection from the pool.
+HTTP_POOL_TIMEOUT_SECONDS = float(os.getenv("FIREPULSE_HTTP_POOL_TIMEOUT_SECONDS", "5"))
+HTTP2_ENABLED = os.getenv("FIREPULSE_HTTP2", "1") != "0"
+
+
+@dataclass(frozen=True)
+class UpstreamPolicy:
+    """How calls to one upstream host are limited, retried and failed fast."""
+    max_concurrency: int = 10
+    max_attempts: int = 3
+    # Full-jitter backoff: the wait before retry n is uniform in [0, min(backoff_max, backoff_base * 2**n)].
+    backoff_base: float = 0.25
+    backoff_max: float = 4.0
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+    # Consecutive failed calls that open the circuit, and how long it stays open before a trial call.
+    failure_threshold: int = 5
+    reset_seconds: float = 30.0
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout, pool=HTTP_POOL_TIMEOUT_SECONDS)
+
+
+UPSTREAM_POLICIES: Dict[str, UpstreamPolicy] = {
+    "api.themoviedb.org": UpstreamPolicy(max_concurrency=20),
+    "api.spotify.com": UpstreamPolicy(max_concurrency=10),
+    "accounts.spotify.com": UpstreamPolicy(max_concurrency=2),
+    "generativelanguage.googleapis.com": UpstreamPolicy(max_concurrency=4, max_attempts=2, read_timeout=30.0),
+    # gTTS talks to Google Translate through its own (blocking) HTTP client; see UpstreamClient.call.
+    "translate.google.com": UpstreamPolicy(max_concurrency=4, max_attempts=2, read_timeout=12.0),
+}
+DEFAULT_POLICY = UpstreamPolicy()
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# A Retry-After longer than this is not waited out; the response goes back to the caller.
+MAX_RETRY_AFTER_SECONDS = 10.0
+# How long the host's rate limit bucket is drained after a 429 that carries no Retry-After.
+RATE_LIMITED_PAUSE_SECONDS = 1.0
+
+
+class UpstreamUnavailable(httpx.RequestError):
+    """Raised without contacting the upstream while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and consecutive failures are counted.
+    Open: calls fail fast until reset_seconds have passed.
+    Half-open: a single trial call is let through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Forgets a trial call that ended without an outcome (e.g. it was cancelled)."""
+        self._trial_in_flight = False
+
+
+class _HostState:
+    def __init__(self, policy: UpstreamPolicy):
+        self.policy = policy
+        self.semaphore = asyncio.Semaphore(policy.max_concurrency)
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_seconds)
+        self.in_flight = 0
+        # requests sent, new TCP connections, TLS handshakes and requests sent over HTTP/2.
+        self.connections: Counter = Counter()
+
+    def connection_stats(self) -> Dict[str, float]:
+        stats = {name: self.connections[name] for name in ("requests", "new_connections", "tls_handshakes", "http2_requests")}
+        stats["reuse_ratio"] = round(1 - stats["new_connections"] / stats["requests"], 3) if stats["requests"] else None
+        return stats
+
+
+async def _trace_connections(state: _HostState, event: str, info: dict):
+    """httpcore "trace" extension: counts new connections and TLS handshakes against requests sent."""
+    if event == "connection.connect_tcp.complete":
+        state.connections["new_connections"] += 1
+    elif event == "connection.start_tls.complete":
+        state.connections["tls_handshakes"] += 1
+    elif event.endswith(".send_request_headers.started"):
+        state.connections["requests"] += 1
+        if event.startswith("http2."):
+            state.connections["http2_requests"] += 1
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """The shared pooled client: keep-alive connections, HTTP/2 where the upstream supports it."""
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("h2 is not installed; upstream calls will use HTTP/1.1.")
+            http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=DEFAULT_POLICY.timeout,
+    )
+
+
+# Numeric path segments after the first (TMDB movie and person ids, not its /3 version) are collapsed,
+# so each API endpoint is one label value.
+_ID_SEGMENT = re.compile(r"(?<=[^/])/\d+(?=/|$)")
+
+
+def _endpoint(url: httpx.URL) -> str:
+    return _ID_SEGMENT.sub("/{id}", url.path)
+
+
+def _api_key(url: str, params) -> Optional[str]:
+    """The API key a request is sent with (TMDB's api_key param or Gemini's key param), if any."""
+    if isinstance(params, dict) and params.get("api_key"):
+        return str(params["api_key"])
+    return httpx.URL(url).params.get("key")
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamClient:
+    """
+    Wraps the shared httpx.AsyncClient for calls to TMDB, Spotify, Gemini and gTTS.
+    Each host gets its own concurrency limit, retry policy and circuit breaker, and each
+    host and API key its own rate limit bucket.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, policies: Optional[Dict[str, UpstreamPolicy]] = None, governor: Optional[RateGovernor] = None):
+        self.client = client
+        self.governor = governor or RateGovernor()
+        self._policies = {**UPSTREAM_POLICIES, **(policies or {})}
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _host(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self._policies.get(host, DEFAULT_POLICY))
+        return state
+
+    def status(self) -> Dict[str, Dict]:
+        """Breaker state, in-flight calls and connection reuse per host contacted so far."""
+        return {
+            host: {
+                "state": state.breaker.state,
+                "consecutive_failures": state.breaker.failures,
+                "in_flight": state.in_flight,
+                "connections": state.connection_stats(),
+            }
+            for host, state in self._hosts.items()
+        }
+
+    async def request(self, method: str, url: str, *, retry: bool = True, priority: int = INTERACTIVE, **kwargs) -> httpx.Response:
+        """
+        Sends a request, retrying transport errors and 429/5xx responses with jittered backoff
+        (or the server's Retry-After). The final response is returned as-is; callers still raise_for_status().
+        A 429 drains the host's rate limit bucket for the Retry-After period but never counts toward the circuit breaker.
+        Each attempt first takes a token from the host's rate limit; background jobs pass priority=BACKGROUND
+        so they queue behind interactive requests.
+        """
+        host = httpx.URL(url).host
+        state = self._host(host)
+        bucket = self.governor.bucket(host, _api_key(url, kwargs.get("params")))
+        kwargs.setdefault("timeout", state.policy.timeout)
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": functools.partial(_trace_connections, state)}
+        endpoint = _endpoint(httpx.URL(url))
+        with tracing.span(f"{method} {host}{endpoint}", **{"http.request.method": method, "server.address": host, "url.template": endpoint}):
+            response = await self._call(host, endpoint, state, lambda: self.client.request(method, url, **kwargs), retry, (httpx.TransportError,), bucket, priority)
+            tracing.set_attributes(**{"http.response.status_code": response.status_code})
+            return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def call(
+        self, host: str, fn: Callable[[], Awaitable[T]], retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+        priority: int = INTERACTIVE, endpoint: str = "call",
+    ) -> T:
+        """Runs a call made through another library (e.g. gTTS) under the host's limits, retries and breaker."""
+        state = self._host(host)
+
+        async def timed():
+            return await asyncio.wait_for(fn(), timeout=state.policy.connect_timeout + state.policy.read_timeout)
+
+        with tracing.span(f"{host} {endpoint}", **{"server.address": host}):
+            return await self._call(host, endpoint, state, timed, True, retry_on + (asyncio.TimeoutError,), self.governor.bucket(host), priority)
+
+    async def _call(
+        self, host: str, endpoint: str, state: _HostState, send: Callable[[], Awaitable[T]], retry: bool, retry_on,
+        bucket: Optional[TokenBucket], priority: int,
+    ) -> T:
+        if not state.breaker.allow():
+            metrics.UPSTREAM_ERRORS.labels(host, endpoint, "circuit_open").inc()
+            raise UpstreamUnavailable(f"{host} is temporarily unavailable (circuit open).")
+
+        attempts = state.policy.max_attempts if retry else 1
+        recorded = False
+        # Time spent waiting for rate limit tokens and a concurrency slot rather than on the wire.
+        queued = 0.0
+        attempt = 0
+        try:
+            for attempt in range(attempts):
+                delay = None
+                queue_started = time.perf_counter()
+                if bucket is not None:
+                    try:
+                        await bucket.acquire(priority)
+                    except RateLimitTimeout:
+                        metrics.UPSTREAM_ERRORS.labels(host, endpoint, "rate_limit_timeout").inc()
+                        raise
+                try:
+                    async with state.semaphore:
+                        state.in_flight += 1
+                        started = time.perf_counter()
+                        queued += started - queue_started
+                        try:
+                            result = await send()
+                        except BaseException as e:
+                            metrics.UPSTREAM_REQUEST_SECONDS.labels(host, endpoint, type(e).__name__).observe(time.perf_counter() - started)
+                            raise
+                        finally:
+                            state.in_flight -= 1
+                    status = str(result.status_code) if isinstance(result, httpx.Response) else "ok"
+                    metrics.UPSTREAM_REQUEST_SECONDS.labels(host, endpoint, status).observe(time.perf_counter() - started)
+                except retry_on as e:
+                    metrics.UPSTREAM_ERRORS.labels(host, endpoint, type(e).__name__).inc()
+                    if attempt == attempts - 1:
+                        state.breaker.record_failure()
+                        recorded = True
+                        raise
+                    logger.warning("Upstream %s attempt %d failed: %r", host, attempt + 1, e, extra={"host": host, "endpoint": endpoint})
+                else:
+                    if not isinstance(result, httpx.Response) or result.status_code not in RETRY_STATUS_CODES:
+                        state.breaker.record_success()
+                        recorded = True
+                        return result
+                    metrics.UPSTREAM_ERRORS.labels(host, endpoint, status).inc()
+                    delay = _retry_after_seconds(result)
+                    if result.status_code == 429 and bucket is not None:
+                        await bucket.penalize(delay if delay is not None else RATE_LIMITED_PAUSE_SECONDS)
+                    if attempt == attempts - 1 or (delay is not None and delay > MAX_RETRY_AFTER_SECONDS):
+                        # A 429 is backpressure, not an outage: the bucket above already backs off, and
+                        # counting it would let ordinary rate limiting open the circuit for every caller.
+                        if result.status_code != 429:
+                            state.breaker.record_failure()
+                            recorded = True
+                        return result
+                    logger.warning("Upstream %s attempt %d returned %d.", host, attempt + 1, result.status_code, extra={"host": host, "endpoint": endpoint})
+
+                if delay is None:
+                    delay = random.uniform(0, min(state.policy.backoff_max, state.policy.backoff_base * 2 ** attempt))
+                await asyncio.sleep(delay)
+        finally:
+            if not recorded:
+                state.breaker.release()
+            tracing.set_attributes(**{"upstream.attempts": attempt + 1, "upstream.queued_ms": round(queued * 1000, 2)})
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -1,24 +1,56 @@
-import httpx
-from gtts import gTTS
-import uuid
+import hashlib
+import io
+import logging
 import os
 import asyncio
+import uuid
 from typing import Optional
 
+from ..core import tracing
+from ..core.metrics import CACHE_LOOKUPS
+from .cache import SharedNamespace
+from .upstream import UpstreamClient
+
+# gTTS fetches audio from Google Translate; calls are limited and circuit-broken under this host.
+GTTS_HOST = "translate.google.com"
+
 
 STATIC_DIR = "app/static"
 AUDIO_DIR = os.path.join(STATIC_DIR, "audio")
-os.makedirs(AUDIO_DIR, exist_ok=True)
 
+# Audio is named after a hash of its text, so a repeated message reuses its file; the MP3 bytes are also
+# kept in the shared cache backend so other workers and fresh containers can serve them without gTTS.
+TTS_LANG = "en"
+TTS_SHARED_TTL_SECONDS = 7 * 24 * 60 * 60
+tts_audio_cache = SharedNamespace("tts", raw=True)
+
+logger = logging.getLogger(__name__)
+
+
+
+def _write_atomic(path: str, data: bytes):
+    # Unique per call: two requests for the same text may write the same file at once.
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
 
 
-async def text_to_speech(client: httpx.AsyncClient, text: str) -> Optional[str]:
+def _synthesize(tts) -> bytes:
+    buffer = io.BytesIO()
+    tts.write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+@tracing.traced("text_to_speech")
+async def text_to_speech(client: UpstreamClient, text: str) -> Optional[str]:
     """
     Asynchronously generates speech from text using gTTS and saves it to a static file.
-    It runs the blocking gTTS save operation in a separate thread to avoid blocking the main server loop.
+    It runs the blocking gTTS request and the file write in separate threads to avoid blocking the main server loop.
     
     Args:
-        client: The shared httpx.AsyncClient (for pattern consistency).
+        client: The shared UpstreamClient, which applies the gTTS host's limits, retries and circuit breaker.
         text: The text to be converted to speech.
 
     Returns:
@@ -29,19 +61,34 @@ async def text_to_speech(client: httpx.AsyncClient, text: str) -> Optional[str]:
         
     try:
         
-        filename = f"{uuid.uuid4()}.mp3"
+        digest = hashlib.sha256(f"{TTS_LANG}:{text}".encode("utf-8")).hexdigest()[:32]
+        filename = f"{digest}.mp3"
         filepath = os.path.join(AUDIO_DIR, filename)
+        url = f"/static/audio/{filename}"
+        if os.path.exists(filepath):
+            CACHE_LOOKUPS.labels("tts_audio", "hit").inc()
+            tracing.set_attributes(**{"tts.cache": "hit"})
+            return url
 
-        
-        tts = gTTS(text, lang='en')
-        
-        
-        await asyncio.to_thread(tts.save, filepath)
+        audio = await tts_audio_cache.get(digest)
+        if audio:
+            CACHE_LOOKUPS.labels("tts_audio", "shared_hit").inc()
+            tracing.set_attributes(**{"tts.cache": "shared_hit"})
+            await asyncio.to_thread(_write_atomic, filepath, audio)
+            return url
+        CACHE_LOOKUPS.labels("tts_audio", "miss").inc()
+        tracing.set_attributes(**{"tts.cache": "miss"})
 
-        
-        return f"/static/audio/{filename}"
+        # Imported here rather than at module load, which happens on every cold start.
+        from gtts import gTTS
+
+        tts = gTTS(text, lang=TTS_LANG)
+        audio = await client.call(GTTS_HOST, lambda: asyncio.to_thread(_synthesize, tts), endpoint="tts")
+        await asyncio.to_thread(_write_atomic, filepath, audio)
+        await tts_audio_cache.set(digest, audio, TTS_SHARED_TTL_SECONDS)
+        return url
 
     except Exception as e:
         
-        print(f"Error generating text-to-speech audio: {e}")
+        logger.warning("Error generating text-to-speech audio: %s", e)
         return None
@@ -0,0 +1,43 @@
+import argparse
+import json
+import sys
+import time
+
+from firepulse.core.db import SessionLocal
+from firepulse.crud.trivia import bulk_create_trivia_questions
+
+
+def read_questions(path: str):
+    """Yields question dicts from a JSON list, a {"results": [...]} object or a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("questions") or data.get("results") or []
+    yield from data
+
+
+def import_trivia(paths: list[str], category: str | None, chunk_size: int):
+    db = SessionLocal()
+    try:
+        for path in paths:
+            started = time.perf_counter()
+            inserted = bulk_create_trivia_questions(db, read_questions(path), category=category, chunk_size=chunk_size)
+            print(f"{path}: inserted {inserted} new questions in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import trivia questions from JSON or JSONL files.")
+    parser.add_argument("paths", nargs="+", help="JSON (list of questions) or JSONL (one question per line) files")
+    parser.add_argument("--category", help="category for questions that do not carry their own")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows per INSERT statement")
+    args = parser.parse_args()
+    if args.chunk_size < 1:
+        sys.exit("--chunk-size must be at least 1")
+    import_trivia(args.paths, args.category, args.chunk_size)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+
+import pytest
+
+from firepulse.services import cache
+from firepulse.services.cache import SharedNamespace, SQLiteBackend, TwoTierCache, create_backend
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def backend_up(monkeypatch):
+    monkeypatch.setattr(cache, "_backend_down_until", 0.0)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "cache.sqlite"))
+
+
+def test_sqlite_backend_get_set_delete_and_expiry(backend):
+    backend.set("a", b"1", ttl=60)
+    backend.set("expired", b"2", ttl=-1)
+    assert backend.get("a") == b"1"
+    assert backend.get("expired") is None
+    assert backend.get("missing") is None
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_sqlite_backend_purges_expired_rows(backend, monkeypatch):
+    monkeypatch.setattr(cache, "SQLITE_PURGE_EVERY", 2)
+    backend.set("expired", b"1", ttl=-1)
+    backend.set("fresh", b"2", ttl=60)
+    keys = [row[0] for row in backend._connect().execute("SELECT key FROM cache")]
+    assert keys == ["fresh"]
+
+
+def test_sqlite_file_is_shared_between_backends(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SQLiteBackend(path).set("a", b"1", ttl=60)
+    assert SQLiteBackend(path).get("a") == b"1"
+
+
+def test_create_backend_schemes(tmp_path):
+    assert create_backend(None) is None
+    assert isinstance(create_backend(f"sqlite:///{tmp_path / 'cache.sqlite'}"), SQLiteBackend)
+    with pytest.raises(ValueError):
+        create_backend("memcached://localhost")
+
+
+def test_namespace_round_trips_values_through_orjson(backend):
+    namespace = SharedNamespace("tmdb", backend=backend)
+    value = {"title": "Amélie", "ids": [1, 2, 3], "score": 7.5, "nested": {"ok": True, "none": None}}
+
+    async def scenario():
+        await namespace.set("movie", value, ttl=60)
+        return await namespace.get("movie"), await namespace.get("missing")
+
+    assert run(scenario()) == (value, None)
+
+
+def test_raw_namespace_stores_bytes_as_is(backend):
+    namespace = SharedNamespace("tts", raw=True, backend=backend)
+
+    async def scenario():
+        await namespace.set("clip", b"ID3\x00\xff", ttl=60)
+        return await namespace.get("clip")
+
+    assert run(scenario()) == b"ID3\x00\xff"
+
+
+def test_unserializable_values_are_not_stored(backend):
+    namespace = SharedNamespace("tmdb", backend=backend)
+
+    async def scenario():
+        await namespace.set("bad", {"value": object()}, ttl=60)
+        return await namespace.get("bad")
+
+    assert run(scenario()) is None
+
+
+def test_bumping_a_namespace_version_retires_its_entries(backend, monkeypatch):
+    namespace = SharedNamespace("tmdb", backend=backend)
+    monkeypatch.setitem(cache.CACHE_NAMESPACE_VERSIONS, "tmdb", 2)
+    assert namespace.key("movie") == "firepulse:tmdb:v2:movie"
+    run(namespace.set("movie", {"shape": "old"}, ttl=60))
+
+    monkeypatch.setitem(cache.CACHE_NAMESPACE_VERSIONS, "tmdb", 3)
+    assert run(namespace.get("movie")) is None
+    # Other namespaces are untouched.
+    assert SharedNamespace("spotify", backend=backend).key("movie") == f"firepulse:spotify:v{cache.CACHE_NAMESPACE_VERSIONS['spotify']}:movie"
+
+
+class FailingBackend:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise OSError("backend down")
+
+    def set(self, key, value, ttl):
+        self.calls += 1
+        raise OSError("backend down")
+
+
+def test_backend_errors_are_misses_and_back_off():
+    backend = FailingBackend()
+    namespace = SharedNamespace("tmdb", backend=backend)
+
+    async def scenario():
+        await namespace.set("movie", {"a": 1}, ttl=60)
+        return await namespace.get("movie")
+
+    assert run(scenario()) is None
+    # The write failed; the read was skipped during the backoff.
+    assert backend.calls == 1
+
+
+def test_two_tier_cache_serves_from_memory(backend):
+    tier = TwoTierCache("tmdb", ttl=60, backend=backend)
+
+    async def scenario():
+        await tier.set("movie", {"a": 1})
+        backend.delete(tier.shared.key("movie"))
+        return await tier.get("movie")
+
+    assert run(scenario()) == {"a": 1}
+
+
+def test_two_tier_cache_promotes_shared_entries_with_their_expiry(backend):
+    writer = TwoTierCache("tmdb", ttl=60, backend=backend)
+    reader = TwoTierCache("tmdb", ttl=600, backend=backend)
+
+    async def scenario():
+        await writer.set("movie", {"a": 1}, ttl=30)
+        return await reader.get("movie")
+
+    assert run(scenario()) == {"a": 1}
+    value, expires_at = reader._entries["movie"]
+    # The writer's 30 s, not the reader's own 600 s ttl.
+    assert value == {"a": 1} and expires_at <= time.time() + 30
+
+
+def test_two_tier_cache_drops_expired_entries(backend):
+    tier = TwoTierCache("tmdb", ttl=60, backend=backend)
+
+    async def scenario():
+        await tier.set("movie", {"a": 1})
+        tier._entries["movie"] = ({"a": 1}, time.time() - 1)
+        await tier.shared.set("movie", [{"a": 1}, time.time() - 1], ttl=60)
+        return await tier.get("movie")
+
+    assert run(scenario()) is None
+    assert "movie" not in tier._entries
+
+
+def test_two_tier_cache_lru_is_bounded(backend):
+    tier = TwoTierCache("tmdb", ttl=60, maxsize=2, backend=backend)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await tier.set(key, key)
+
+    run(scenario())
+    assert list(tier._entries) == ["b", "c"]
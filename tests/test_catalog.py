@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from firepulse.services.catalog import PackedStrings, load_columns, save_columns
+
+VALUES = ["Heat", "", "Amélie", "千と千尋の神隠し", "शोले", "", "Crème brûlée 🍮", "last"]
+
+
+def test_round_trip_keeps_empty_and_non_ascii_values():
+    packed = PackedStrings.from_strings(VALUES)
+    assert len(packed) == len(VALUES)
+    assert [packed[i] for i in range(len(packed))] == VALUES
+    # Offsets count UTF-8 bytes, not characters.
+    assert packed.offsets[-1] == len(packed.data) == sum(len(value.encode("utf-8")) for value in VALUES)
+
+
+def test_last_element_and_negative_indices():
+    packed = PackedStrings.from_strings(VALUES)
+    assert packed[len(VALUES) - 1] == "last"
+    assert packed[-1] == "last"
+    assert packed[-2] == "Crème brûlée 🍮"
+    assert packed[np.int64(2)] == "Amélie"
+
+
+def test_trailing_empty_string_is_kept():
+    packed = PackedStrings.from_strings(["a", ""])
+    assert packed[1] == packed[-1] == ""
+    assert len(packed) == 2
+
+
+@pytest.mark.parametrize("index", [8, 100, -9])
+def test_out_of_range_indices_raise(index):
+    with pytest.raises(IndexError):
+        PackedStrings.from_strings(VALUES)[index]
+
+
+def test_no_values_and_only_empty_values():
+    empty = PackedStrings.from_strings([])
+    assert len(empty) == 0 and empty.nbytes == empty.offsets.nbytes
+    blanks = PackedStrings.from_strings(["", "", ""])
+    assert [blanks[i] for i in range(3)] == ["", "", ""]
+
+
+def test_columns_survive_save_and_load(tmp_path):
+    path = str(tmp_path / "columns.npz")
+    save_columns(path, 123.5, {"ids": np.array([1, 2, 3]), "titles": PackedStrings.from_strings(["", "Amélie", "last"])})
+    columns, built_at = load_columns(path, ["ids", "titles"], ["titles"])
+    assert built_at == 123.5
+    assert columns["ids"].tolist() == [1, 2, 3]
+    assert [columns["titles"][i] for i in range(3)] == ["", "Amélie", "last"]
+    assert load_columns(str(tmp_path / "missing.npz"), ["ids"], []) is None
@@ -0,0 +1,47 @@
+import uuid
+
+from firepulse.crud import badge as badge_crud
+from firepulse.models.trivia import Badge, user_badge_association
+from firepulse.models.user import User as UserModel
+from firepulse.services import gamification
+
+
+def add_user(db):
+    user = UserModel(email=f"badges-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    return user
+
+
+def badge_rows(db, user_id):
+    query = db.query(user_badge_association.c.badge_id).filter(user_badge_association.c.user_id == user_id)
+    return sorted(badge_id for badge_id, in query)
+
+
+def test_awarding_a_held_badge_again_is_a_no_op(db):
+    user = add_user(db)
+    badges = [Badge(name=f"Test badge {uuid.uuid4().hex}", description="") for _ in range(2)]
+    db.add_all(badges)
+    db.flush()
+    first, second = (badge.id for badge in badges)
+
+    assert badge_crud.award_badges(db, user_id=user.id, badge_ids=[first]) == {first}
+    # A second request racing the first one: only the badge it actually adds is reported.
+    assert badge_crud.award_badges(db, user_id=user.id, badge_ids=[first, second]) == {second}
+    assert badge_rows(db, user.id) == sorted([first, second])
+    assert badge_crud.award_badges(db, user_id=user.id, badge_ids=[]) == set()
+
+
+def test_check_and_award_badges_announces_only_new_badges(db, monkeypatch):
+    user = add_user(db)
+    badge = Badge(name=f"Test badge {uuid.uuid4().hex}", description="")
+    db.add(badge)
+    db.flush()
+    monkeypatch.setattr(gamification, "BADGE_RULES", [gamification.BadgeRule(badge.name, "", "correct_total", 1)])
+    monkeypatch.setattr(gamification, "get_badge_catalog", lambda db: {badge.name: badge.id})
+
+    # Another worker awards the badge after this request has loaded user.badges.
+    assert user.badges == []
+    badge_crud.award_badges(db, user_id=user.id, badge_ids=[badge.id])
+    assert gamification.check_and_award_badges(db, user=user, stats={"correct_total": 1}) == []
+    assert badge_rows(db, user.id) == [badge.id]
@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import io
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from firepulse.api import history_routes
+from firepulse.api.history_routes import read_movie_names_from_csv
+from firepulse.models.history import MovieHistory
+from firepulse.models.user import User as UserModel
+
+
+def csv_upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="history.csv")
+
+
+def app_request():
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(upstream=None)))
+
+
+def test_csv_uses_a_named_title_column():
+    content = "year,Title,rating\n1995,Heat,5\n2010,Inception,4\n".encode()
+    assert read_movie_names_from_csv(content) == ["Heat", "Inception"]
+
+
+def test_csv_first_column_fallback_skips_the_header():
+    assert read_movie_names_from_csv(b"Film,Year\nHeat,1995\n\nInception,2010\n") == ["Heat", "Inception"]
+
+
+def test_csv_with_a_byte_order_mark_and_no_rows():
+    assert read_movie_names_from_csv("﻿title\nAmélie\n".encode("utf-8")) == ["Amélie"]
+    assert read_movie_names_from_csv(b"") == []
+    assert read_movie_names_from_csv(b"title\n") == []
+
+
+def test_oversized_csv_upload_is_rejected_before_parsing(monkeypatch):
+    monkeypatch.setattr(history_routes, "read_movie_names_from_csv", lambda content: pytest.fail("parsed an oversized upload"))
+    content = b"title\n" + b"x" * history_routes.HISTORY_IMPORT_MAX_CSV_BYTES
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(history_routes.import_watch_history_csv(app_request(), csv_upload(content), db=None, current_user=SimpleNamespace(id=1)))
+    assert error.value.status_code == 413
+
+
+def test_csv_upload_at_the_limit_is_imported(monkeypatch):
+    imported = []
+
+    async def fake_import(client, db, user_id, movie_names):
+        imported.append(movie_names)
+        return {"logged": len(movie_names)}
+
+    monkeypatch.setattr(history_routes, "import_watch_history", fake_import)
+    content = b"title\n" + b"Heat\n" * ((history_routes.HISTORY_IMPORT_MAX_CSV_BYTES - 6) // 5)
+    content += b" " * (history_routes.HISTORY_IMPORT_MAX_CSV_BYTES - len(content))
+    assert len(content) == history_routes.HISTORY_IMPORT_MAX_CSV_BYTES
+    asyncio.run(history_routes.import_watch_history_csv(app_request(), csv_upload(content), db=None, current_user=SimpleNamespace(id=1)))
+    assert imported[0][0] == "Heat"
+
+
+def test_unreadable_csv_is_a_bad_request():
+    content = b"title\n" + b"x" * 200_000
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(history_routes.import_watch_history_csv(app_request(), csv_upload(content), db=None, current_user=SimpleNamespace(id=1)))
+    assert error.value.status_code == 400
+
+
+def test_non_utf8_csv_is_a_bad_request():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(history_routes.import_watch_history_csv(app_request(), csv_upload(b"title\n\xff\xfe\n"), db=None, current_user=SimpleNamespace(id=1)))
+    assert error.value.status_code == 400
+
+
+def encode_cursor(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    "abc",
+    encode_cursor("no-separator"),
+    encode_cursor("yesterday_12"),
+    encode_cursor("2026-01-01T10:00:00+00:00_twelve"),
+    base64.urlsafe_b64encode(b"\xff\xfe_1").decode(),
+])
+def test_malformed_history_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        history_routes.read_watch_history(limit=20, cursor=cursor, db=None, current_user=SimpleNamespace(id=1))
+    assert error.value.status_code == 400
+
+
+def read_page(db, user_id, limit, cursor=None):
+    response = history_routes.read_watch_history(limit=limit, cursor=cursor, db=db, current_user=SimpleNamespace(id=user_id))
+    return orjson.loads(response.body)
+
+
+def test_history_pages_do_not_skip_or_repeat_rows_sharing_watched_at(db):
+    user = UserModel(email=f"history-pages-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    newer = datetime(2026, 3, 1, 20, 30, 15, 123456, tzinfo=timezone.utc)
+    older = newer - timedelta(days=1)
+    # Three rows share `newer`, so the first page boundary (limit 2) falls between rows with equal watched_at.
+    rows = [MovieHistory(user_id=user.id, movie_title=f"Movie {n}", tmdb_id=1000 + n, genres=["Drama"], watched_at=watched_at)
+            for n, watched_at in enumerate([newer, newer, newer, older, older])]
+    db.add_all(rows)
+    db.flush()
+    expected = [row.tmdb_id for row in sorted(rows, key=lambda row: (row.watched_at, row.id), reverse=True)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = read_page(db, user.id, limit=2, cursor=cursor)
+        pages += 1
+        seen.extend(item["tmdb_id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert pages == 3
+
+
+def test_history_cursor_on_an_exact_last_page_returns_an_empty_page(db):
+    user = UserModel(email=f"history-pages-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    watched_at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    db.add_all([MovieHistory(user_id=user.id, movie_title="A", tmdb_id=1, watched_at=watched_at),
+                MovieHistory(user_id=user.id, movie_title="B", tmdb_id=2, watched_at=watched_at)])
+    db.flush()
+
+    first = read_page(db, user.id, limit=2)
+    assert [item["tmdb_id"] for item in first["items"]] == [2, 1]
+    assert read_page(db, user.id, limit=2, cursor=first["next_cursor"]) == {"items": [], "next_cursor": None}
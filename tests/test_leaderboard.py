@@ -0,0 +1,77 @@
+import pytest
+
+from firepulse.services import leaderboard
+from firepulse.services.leaderboard import Leaderboard
+
+
+@pytest.fixture
+def board():
+    board = Leaderboard()
+    board.load([(1, 30), (2, 20), (3, 20), (4, 10)])
+    return board
+
+
+def test_top_is_ordered_by_score_with_shared_ranks_for_ties(board):
+    assert board.top(10) == [
+        {"rank": 1, "user_id": 1, "score": 30},
+        {"rank": 2, "user_id": 2, "score": 20},
+        {"rank": 2, "user_id": 3, "score": 20},
+        {"rank": 4, "user_id": 4, "score": 10},
+    ]
+    assert [entry["user_id"] for entry in board.top(2)] == [1, 2]
+
+
+def test_rank_and_score(board):
+    assert board.rank(1) == 1
+    assert board.rank(3) == 2
+    assert board.rank(4) == 4
+    assert board.rank(99) is None
+    assert board.score(99) == 0
+    assert len(board) == 4
+
+
+def test_update_moves_a_user_and_adds_new_ones(board):
+    board.update(4, 40)
+    board.update(5, 20)
+    assert board.rank(4) == 1
+    assert board.rank(1) == 2
+    assert board.rank(5) == 3
+    assert board.score(4) == 40
+    assert len(board) == 5
+
+
+@pytest.fixture
+def scores(monkeypatch):
+    """Replaces the database with {category_key or None: [(user_id, correct_count)]}."""
+    data = {}
+    monkeypatch.setattr(leaderboard.trivia_crud, "get_leaderboard_scores", lambda db, category_key=None: data.get(category_key, []))
+    monkeypatch.setattr(leaderboard, "_global_board", None)
+    monkeypatch.setattr(leaderboard, "_category_boards", leaderboard.OrderedDict())
+    return data
+
+
+def test_unknown_categories_are_not_kept(scores):
+    board = leaderboard.get_leaderboard(None, "no such category")
+    assert len(board) == 0
+    assert not leaderboard._category_boards
+
+
+def test_category_boards_are_bounded(scores, monkeypatch):
+    monkeypatch.setattr(leaderboard, "MAX_CATEGORY_BOARDS", 2)
+    for name in ("movies", "music", "tv"):
+        scores[leaderboard.trivia_crud.normalize_category(name)] = [(1, 1)]
+        leaderboard.get_leaderboard(None, name)
+    assert len(leaderboard._category_boards) == 2
+    assert leaderboard.trivia_crud.normalize_category("movies") not in leaderboard._category_boards
+
+
+def test_correct_answers_update_loaded_boards(scores):
+    points = leaderboard.trivia_crud.POINTS_PER_CORRECT_ANSWER
+    scores[None] = [(1, 2)]
+    scores[leaderboard.trivia_crud.normalize_category("movies")] = [(1, 1)]
+    overall = leaderboard.get_leaderboard(None)
+    movies = leaderboard.get_leaderboard(None, "movies")
+
+    leaderboard.record_correct_answer(2, "Movies", correct_total=3)
+    assert overall.rank(2) == 1 and overall.score(2) == 3 * points
+    assert movies.score(2) == points
@@ -0,0 +1,63 @@
+import random
+from collections import defaultdict
+
+from firepulse.services.movie_graph import MovieGraph
+
+
+def build(edges):
+    nodes = {tmdb_id: (f"Movie {tmdb_id}", 0) for source, targets in edges.items() for tmdb_id in (source, *targets)}
+    return MovieGraph.from_edges(edges, nodes)
+
+
+def naive_recommend(edges, seed_ids, exclude_ids, limit):
+    scores = defaultdict(float)
+    for seed in seed_ids:
+        for target, weight in edges.get(seed, {}).items():
+            scores[target] += weight
+    for tmdb_id in set(seed_ids) | set(exclude_ids):
+        scores.pop(tmdb_id, None)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def test_scores_are_summed_across_seeds():
+    graph = build({
+        1: {10: 1.0, 11: 2.0},
+        2: {10: 2.5, 12: 0.5},
+        3: {},
+    })
+    result = graph.recommend([1, 2, 3])
+    assert [(movie.id, movie.score) for movie in result] == [(10, 3.5), (11, 2.0), (12, 0.5)]
+    assert result[0].title == "Movie 10"
+
+
+def test_seeds_and_excluded_ids_are_left_out():
+    graph = build({1: {2: 5.0, 10: 1.0, 11: 2.0}, 2: {1: 5.0, 12: 3.0}})
+    assert [movie.id for movie in graph.recommend([1, 2], exclude_ids=[12])] == [11, 10]
+
+
+def test_unknown_seeds_and_seeds_without_neighbors():
+    graph = build({1: {10: 1.0}, 2: {}})
+    assert graph.recommend([999]) == []
+    assert graph.recommend([2]) == []
+    assert [movie.id for movie in graph.recommend([999, 1])] == [10]
+
+
+def test_matches_a_per_seed_loop_on_a_random_graph():
+    rng = random.Random(7)
+    ids = list(range(1, 200))
+    edges = {
+        source: {target: round(rng.uniform(0.1, 5.0), 2) for target in rng.sample(ids, rng.randint(0, 12)) if target != source}
+        for source in ids
+    }
+    graph = build(edges)
+    for _ in range(20):
+        seeds = rng.sample(ids, rng.randint(1, 15))
+        exclude = rng.sample(ids, 5)
+        expected = naive_recommend(edges, seeds, exclude, limit=len(ids))
+        scores = dict(expected)
+        result = graph.recommend(seeds, exclude_ids=exclude, limit=10)
+        assert len(result) == min(10, len(expected))
+        # Weights are float32 in the graph, and ties may come back in either order, so compare scores.
+        for movie, (_, score) in zip(result, expected):
+            assert abs(movie.score - score) < 1e-3
+            assert abs(movie.score - scores[movie.id]) < 1e-3
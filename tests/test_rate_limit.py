@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+
+from firepulse.services.rate_limit import BACKGROUND, INTERACTIVE, RateLimit, RateLimitTimeout, TokenBucket
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_burst_goes_straight_through_then_waits_for_refill():
+    async def scenario():
+        bucket = TokenBucket("test", RateLimit(rate=20.0, burst=3))
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst_elapsed = time.monotonic() - started
+        await bucket.acquire()
+        return burst_elapsed, time.monotonic() - started, bucket.throttled
+
+    burst_elapsed, elapsed, throttled = run(scenario())
+    assert burst_elapsed < 0.02
+    # The fourth token refills at 20/s, i.e. after about 50 ms.
+    assert 0.04 <= elapsed < 0.5
+    assert throttled == 1
+
+
+def test_acquire_gives_up_at_its_deadline():
+    async def scenario():
+        bucket = TokenBucket("test", RateLimit(rate=0.5, burst=1))
+        await bucket.acquire()
+        started = time.monotonic()
+        with pytest.raises(RateLimitTimeout):
+            await bucket.acquire(timeout=0.05)
+        return time.monotonic() - started, bucket.timeouts, bucket.status()["queued"]
+
+    elapsed, timeouts, queued = run(scenario())
+    assert 0.04 <= elapsed < 0.5
+    assert timeouts == 1
+    assert queued == 0
+
+
+def test_interactive_waiters_are_served_before_background_ones():
+    async def scenario():
+        bucket = TokenBucket("test", RateLimit(rate=20.0, burst=1))
+        await bucket.acquire()
+        order = []
+
+        async def take(name, priority):
+            await bucket.acquire(priority=priority, timeout=5)
+            order.append(name)
+
+        background = [asyncio.create_task(take(f"background-{i}", BACKGROUND)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = [asyncio.create_task(take(f"interactive-{i}", INTERACTIVE)) for i in range(2)]
+        await asyncio.gather(*background, *interactive)
+        return order
+
+    assert run(scenario()) == ["interactive-0", "interactive-1", "background-0", "background-1"]
+
+
+def test_penalize_holds_tokens_back():
+    async def scenario():
+        bucket = TokenBucket("test", RateLimit(rate=100.0, burst=5))
+        await bucket.penalize(0.2)
+        with pytest.raises(RateLimitTimeout):
+            await bucket.acquire(timeout=0.05)
+        started = time.monotonic()
+        await bucket.acquire(timeout=1)
+        return time.monotonic() - started
+
+    assert run(scenario()) < 1.0
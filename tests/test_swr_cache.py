@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from firepulse.services.swr_cache import SWRCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def age(cache: SWRCache, key, seconds: float):
+    """Makes an entry look `seconds` old."""
+    value, _ = cache._entries[key]
+    cache._entries[key] = (value, time.time() - seconds)
+
+
+class Loader:
+    def __init__(self, *values, delay: float = 0.0):
+        self.values = list(values)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        value = self.values.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def test_fresh_entry_is_served_without_loading():
+    async def scenario():
+        cache = SWRCache("test", soft_ttl=10, hard_ttl=100)
+        loader = Loader(["a"], ["b"])
+        assert await cache.get("k", loader) == ["a"]
+        assert await cache.get("k", loader) == ["a"]
+        return loader.calls, cache.stats
+
+    calls, stats = run(scenario())
+    assert calls == 1
+    assert stats["miss"] == 1 and stats["fresh"] == 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    async def scenario():
+        cache = SWRCache("test", soft_ttl=10, hard_ttl=100)
+        loader = Loader(["old"], ["new"], delay=0.01)
+        await cache.get("k", loader)
+        age(cache, "k", 50)
+        served = [await cache.get("k", loader) for _ in range(3)]
+        await asyncio.gather(*cache._loads.values())
+        return served, await cache.get("k", loader), loader.calls
+
+    served, refreshed, calls = run(scenario())
+    assert served == [["old"]] * 3
+    assert refreshed == ["new"]
+    assert calls == 2
+
+
+def test_expired_entry_waits_for_the_load():
+    async def scenario():
+        cache = SWRCache("test", soft_ttl=10, hard_ttl=100)
+        loader = Loader(["old"], ["new"])
+        await cache.get("k", loader)
+        age(cache, "k", 150)
+        return await cache.get("k", loader)
+
+    assert run(scenario()) == ["new"]
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = SWRCache("test", soft_ttl=10, hard_ttl=100)
+        loader = Loader(["a"], delay=0.01)
+        results = await asyncio.gather(*(cache.get("k", loader) for _ in range(5)))
+        return results, loader.calls
+
+    results, calls = run(scenario())
+    assert results == [["a"]] * 5
+    assert calls == 1
+
+
+def test_stale_entry_is_served_when_the_load_fails():
+    async def scenario():
+        cache = SWRCache("test", soft_ttl=10, hard_ttl=100, stale_if_error_ttl=1000)
+        loader = Loader(["old"], RuntimeError("upstream down"), [])
+        await cache.get("k", loader)
+        age(cache, "k", 500)
+        on_error = await cache.get("k", loader)
+        on_invalid = await cache.get("k", loader)
+        return on_error, on_invalid, cache.stats["stale_on_error"]
+
+    on_error, on_invalid, stale_on_error = run(scenario())
+    assert on_error == ["old"]
+    assert on_invalid == ["old"]
+    assert stale_on_error == 2
+
+
+def test_load_failure_is_raised_past_stale_if_error_ttl():
+    async def scenario():
+        cache = SWRCache("test", soft_ttl=10, hard_ttl=100, stale_if_error_ttl=1000)
+        loader = Loader(["old"], RuntimeError("upstream down"))
+        await cache.get("k", loader)
+        age(cache, "k", 2000)
+        await cache.get("k", loader)
+
+    with pytest.raises(RuntimeError):
+        run(scenario())
+
+
+def test_invalid_values_are_not_cached():
+    async def scenario():
+        cache = SWRCache("test", soft_ttl=10, hard_ttl=100)
+        loader = Loader([], ["a"])
+        return await cache.get("k", loader), await cache.get("k", loader), loader.calls
+
+    assert run(scenario()) == ([], ["a"], 2)
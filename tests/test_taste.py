@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import orjson
+import pytest
+
+from firepulse.api import history_routes
+from firepulse.crud import history as history_crud
+from firepulse.models.history import MovieHistory
+from firepulse.models.user import User as UserModel
+from firepulse.services import catalog, movie_graph, taste
+from firepulse.services.tmdb import MovieRecord
+
+COMEDY, HORROR, DRAMA = 35, 27, 18
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+def weight(vector, genre_id):
+    return vector[taste.GENRE_INDEX[genre_id]]
+
+
+def test_a_watch_shares_one_unit_of_weight_between_its_known_genres():
+    vector = taste.genre_vector([COMEDY, DRAMA, 123456])
+    assert weight(vector, COMEDY) == weight(vector, DRAMA) == 0.5
+    assert vector.sum() == pytest.approx(1.0)
+    assert not taste.genre_vector([]).any()
+
+
+def test_an_empty_profile_starts_from_the_new_watches():
+    assert np.array_equal(taste.updated_taste(None, None, [[COMEDY]], NOW), taste.genre_vector([COMEDY]))
+    assert not taste.updated_taste(None, None, [], NOW).any()
+    # A stored vector of the wrong length (older genre list) is dropped rather than misread.
+    assert np.array_equal(taste.updated_taste([1.0, 2.0], NOW, [[COMEDY]], NOW), taste.genre_vector([COMEDY]))
+
+
+def test_older_watches_weigh_less():
+    half_life = timedelta(days=taste.TASTE_HALF_LIFE_DAYS)
+    rows = [
+        SimpleNamespace(genres=[COMEDY], watched_at=NOW),
+        SimpleNamespace(genres=[HORROR], watched_at=NOW - 2 * half_life),
+        SimpleNamespace(genres=[DRAMA], watched_at=NOW - half_life),
+    ]
+    vector = taste.taste_from_history(rows, NOW)
+    assert weight(vector, COMEDY) == pytest.approx(1.0)
+    assert weight(vector, DRAMA) == pytest.approx(0.5)
+    assert weight(vector, HORROR) == pytest.approx(0.25)
+    assert taste.top_genre_names(vector) == ["Comedy", "Drama"]
+
+
+def test_a_stored_profile_decays_before_new_watches_are_added():
+    stored = taste.genre_vector([HORROR]) * 4
+    vector = taste.updated_taste(stored, NOW - timedelta(days=taste.TASTE_HALF_LIFE_DAYS), [[COMEDY]], NOW)
+    assert weight(vector, HORROR) == pytest.approx(2.0)
+    assert weight(vector, COMEDY) == pytest.approx(1.0)
+
+
+def add_user(db):
+    user = UserModel(email=f"taste-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    return user
+
+
+def test_watches_do_not_create_an_empty_profile(db):
+    user = add_user(db)
+    taste.add_watches_to_profile(db, user_id=user.id, genre_lists=[[COMEDY]])
+    assert history_crud.get_taste_profile(db, user_id=user.id) is None
+
+
+def test_recommendations_bootstrap_the_profile_from_all_history(db, monkeypatch):
+    user = add_user(db)
+    now = taste.utcnow()
+    db.add_all([
+        MovieHistory(user_id=user.id, movie_title="New comedy", tmdb_id=1, genres=[COMEDY], watched_at=now),
+        MovieHistory(user_id=user.id, movie_title="Old horror", tmdb_id=2, genres=[HORROR],
+                     watched_at=now - timedelta(days=2 * taste.TASTE_HALF_LIFE_DAYS)),
+    ])
+    db.flush()
+    taste.add_watches_to_profile(db, user_id=user.id, genre_lists=[[COMEDY]])
+
+    candidates = [MovieRecord(id=10, title="Comedy pick", genre_ids=(COMEDY,), popularity=5.0),
+                  MovieRecord(id=1, title="Already watched", genre_ids=(COMEDY,), popularity=50.0)]
+
+    async def candidate_pool(client):
+        return candidates
+
+    monkeypatch.setattr(taste, "get_candidate_pool", candidate_pool)
+    monkeypatch.setattr(movie_graph, "_graph", None)
+    monkeypatch.setattr(catalog, "get_catalog", lambda: None)
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(upstream=None)))
+    response = asyncio.run(history_routes.get_history_based_recommendations(request, db=db, current_user=SimpleNamespace(id=user.id)))
+
+    body = orjson.loads(response.body)
+    assert [movie["id"] for movie in body["suggestions"]] == [10]
+    assert body["recommending_based_on"] == "your taste for Comedy and Horror movies"
+    profile = history_crud.get_taste_profile(db, user_id=user.id)
+    assert weight(profile.weights, COMEDY) == pytest.approx(1.0, abs=1e-3)
+    assert weight(profile.weights, HORROR) == pytest.approx(0.25, abs=1e-3)
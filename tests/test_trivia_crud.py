@@ -0,0 +1,103 @@
+import importlib.util
+import os
+import random
+import unicodedata
+import uuid
+from collections import Counter
+
+import pytest
+from sqlalchemy import func
+
+from firepulse.crud.trivia import build_question_row, get_unanswered_question, normalize_question_text, question_hash
+from firepulse.models.trivia import TriviaQuestion, UserAnswer
+from firepulse.models.user import User
+
+MIGRATION = os.path.join(os.path.dirname(__file__), "..", "alembic", "versions", "e1f7a6c3b820_add_trivia_question_hash.py")
+
+SAME_QUESTION = [
+    "Who directed Amélie?",
+    unicodedata.normalize("NFD", "Who directed Amélie?"),
+    "who   directed\tAMÉLIE",
+    "  Who directed Amélie ?!  ",
+    "Ｗｈｏ ｄｉｒｅｃｔｅｄ Ａｍéｌｉｅ？",
+]
+
+
+@pytest.mark.parametrize("variant", SAME_QUESTION[1:])
+def test_case_whitespace_and_unicode_variants_share_a_hash(variant):
+    assert question_hash(variant) == question_hash(SAME_QUESTION[0])
+
+
+def test_non_latin_scripts_are_kept():
+    # Devanagari vowel signs are combining marks; dropping them would merge different words.
+    assert normalize_question_text("शोले किसने बनाई?") == "शोले किसने बनाई"
+    assert question_hash("शोले किसने बनाई?") != question_hash("शल कसन बनई?")
+    assert normalize_question_text("「千と千尋の神隠し」の監督は？") == "千と千尋の神隠しの監督は"
+
+
+@pytest.mark.parametrize("other", [
+    "Who directed Amelie?",
+    "Who produced Amélie?",
+    "Who directed Amélie 2?",
+    "शोले किसने लिखी?",
+])
+def test_distinct_questions_have_distinct_hashes(other):
+    assert question_hash(other) != question_hash(SAME_QUESTION[0])
+
+
+def test_migration_normalizes_like_the_crud():
+    spec = importlib.util.spec_from_file_location("question_hash_migration", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    for text in SAME_QUESTION + ["शोले किसने बनाई?", "「千と千尋の神隠し」の監督は？"]:
+        assert migration._normalize_question_text(text) == normalize_question_text(text)
+
+
+def test_build_question_row_hashes_both_payload_formats():
+    gemini = build_question_row({
+        "question_text": "Who directed Amélie?",
+        "answers": [{"text": "Jeunet", "is_correct": True}, {"text": "Besson", "is_correct": False}],
+    }, category="Movies")
+    open_trivia = build_question_row({
+        "question": "who directed AMÉLIE",
+        "correct_answer": "Jeunet",
+        "incorrect_answers": ["Besson", "Ozon", "Audiard"],
+        "category": "movies ",
+    })
+    assert gemini["question_hash"] == open_trivia["question_hash"]
+    assert gemini["category_key"] == open_trivia["category_key"] == "movies"
+    assert gemini["incorrect_answer_3"] == "Generated incorrect answer"
+
+
+def add_questions(db, category, ids):
+    db.add_all([
+        TriviaQuestion(
+            id=id, category=category, category_key=category, question_text=f"{category} question {id}",
+            correct_answer="yes", incorrect_answer_1="no", incorrect_answer_2="maybe", incorrect_answer_3="never",
+        )
+        for id in ids
+    ])
+    db.flush()
+
+
+def test_unanswered_question_is_picked_uniformly_across_id_gaps(db):
+    category = f"gaps-{uuid.uuid4().hex}"
+    start = (db.query(func.max(TriviaQuestion.id)).scalar() or 0) + 1
+    # A random pivot over [min, max] id would land on the question after the gap almost every time.
+    ids = [start, start + 1, start + 1000]
+    add_questions(db, category, ids)
+    user = User(email=f"{category}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+
+    random.seed(0)
+    picks = Counter(get_unanswered_question(db, category, user.id).id for _ in range(300))
+    assert set(picks) == set(ids)
+    assert min(picks.values()) > 60
+
+    db.add_all([UserAnswer(user_id=user.id, question_id=id) for id in ids[1:]])
+    db.flush()
+    assert get_unanswered_question(db, category, user.id).id == ids[0]
+    db.add(UserAnswer(user_id=user.id, question_id=ids[0]))
+    db.flush()
+    assert get_unanswered_question(db, category, user.id) is None
@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+
+from firepulse.services.rate_limit import RateGovernor, RateLimit
+from firepulse.services.upstream import UpstreamClient, UpstreamPolicy
+
+HOST = "upstream.test"
+URL = f"https://{HOST}/items"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_client(handler, **policy) -> UpstreamClient:
+    policy = UpstreamPolicy(**{"max_attempts": 1, "failure_threshold": 2, **policy})
+    governor = RateGovernor(limits={HOST: RateLimit(rate=1000.0, burst=100)}, store_path=None)
+    return UpstreamClient(httpx.AsyncClient(transport=httpx.MockTransport(handler)), policies={HOST: policy}, governor=governor)
+
+
+def test_rate_limited_responses_do_not_open_the_circuit():
+    async def scenario():
+        upstream = make_client(lambda request: httpx.Response(429, headers={"Retry-After": "0"}))
+        statuses = [(await upstream.get(URL)).status_code for _ in range(5)]
+        await upstream.aclose()
+        return statuses, upstream.status()[HOST]
+
+    statuses, status = run(scenario())
+    assert statuses == [429] * 5
+    assert status["state"] == "closed"
+    assert status["consecutive_failures"] == 0
+
+
+def test_rate_limited_retry_waits_out_retry_after():
+    calls = []
+
+    def handler(request):
+        calls.append(asyncio.get_running_loop().time())
+        return httpx.Response(429, headers={"Retry-After": "0.1"}) if len(calls) == 1 else httpx.Response(200)
+
+    async def scenario():
+        upstream = make_client(handler, max_attempts=2)
+        response = await upstream.get(URL)
+        await upstream.aclose()
+        return response.status_code
+
+    assert run(scenario()) == 200
+    assert calls[1] - calls[0] >= 0.09
+
+
+def test_server_errors_still_open_the_circuit():
+    async def scenario():
+        upstream = make_client(lambda request: httpx.Response(503))
+        for _ in range(2):
+            await upstream.get(URL)
+        try:
+            await upstream.get(URL)
+        except httpx.RequestError as e:
+            error = e
+        await upstream.aclose()
+        return error, upstream.status()[HOST]
+
+    error, status = run(scenario())
+    assert "circuit open" in str(error)
+    assert status["state"] == "open"